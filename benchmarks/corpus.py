@@ -0,0 +1,151 @@
+"""
+Synthetic `data/` trees for benchmarks.
+
+Articles are written in exactly the format `save_article` produces (YAML-ish
+frontmatter, `# Title`, body), spread over VALID_CATEGORIES and dated over
+the last `days` days, so the index, dedup checks and the bundler see a
+realistic corpus without any network access. Bodies are random word
+sequences with a long-tailed length distribution; they never near-duplicate
+one another.
+
+Generation is deterministic for a given seed, and a corpus that already
+matches the requested parameters is reused.
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.article_index import state_dir
+from src.utils.llm_client import VALID_CATEGORIES
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "bench_corpus.json"
+
+# Articles are spread over this many made-up sites
+NUM_HOSTS = 50
+
+# Body length in words: log-normal, clamped to this range
+MIN_BODY_WORDS = 150
+MAX_BODY_WORDS = 6000
+
+SYLLABLES = [
+    "ka", "lo", "mi", "ne", "ru", "ta", "vi", "so", "de", "pa", "qu", "ze",
+    "ba", "fo", "gi", "hu", "jo", "ly", "mo", "ni", "or", "pe", "ri", "su",
+]
+
+
+def vocabulary(size: int = 4000, seed: int = 0) -> List[str]:
+    """Return `size` distinct pseudo-words."""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def article_url(i: int) -> str:
+    """The URL of synthetic article `i` (stable across runs)."""
+    return f"https://site{i % NUM_HOSTS}.bench.example/posts/{i}"
+
+
+def article_text(rng: random.Random, words: List[str], num_words: int) -> str:
+    """Random paragraphs of roughly `num_words` words."""
+    paragraphs = []
+    remaining = num_words
+    while remaining > 0:
+        length = min(remaining, rng.randint(40, 120))
+        paragraphs.append(" ".join(rng.choice(words) for _ in range(length)).capitalize() + ".")
+        remaining -= length
+    return "\n\n".join(paragraphs)
+
+
+def _manifest(data_dir: Path) -> Path:
+    return state_dir(str(data_dir)) / MANIFEST_FILENAME
+
+
+def generate_corpus(data_dir: str, articles: int, days: int = 90, seed: int = 0) -> Dict:
+    """
+    Write a synthetic corpus of `articles` articles into `data_dir`.
+
+    Reuses an existing corpus generated with the same parameters; any other
+    content of `data_dir` is left alone, so use an empty directory.
+
+    Returns:
+        The corpus parameters (articles, days, seed).
+    """
+    root = Path(data_dir)
+    params = {"articles": articles, "days": days, "seed": seed}
+    manifest = _manifest(root)
+    if manifest.exists() and json.loads(manifest.read_text()) == params:
+        logger.info(f"Reusing synthetic corpus of {articles} articles in {root}")
+        return params
+
+    rng = random.Random(seed)
+    words = vocabulary(seed=seed)
+    today = date.today()
+    categories = list(VALID_CATEGORIES)
+    # Some categories are much busier than others
+    weights = [rng.uniform(0.2, 1.0) for _ in categories]
+
+    logger.info(f"Generating {articles} synthetic articles in {root}...")
+    for category in categories:
+        (root / category).mkdir(parents=True, exist_ok=True)
+
+    for i in range(articles):
+        category = rng.choices(categories, weights)[0]
+        published = (today - timedelta(days=rng.randrange(days))).isoformat()
+        title = f"Bench-{i}-" + "-".join(w.capitalize() for w in rng.sample(words, 3))
+        summary = " ".join(rng.sample(words, 12)).capitalize() + "."
+        num_words = int(min(MAX_BODY_WORDS, max(MIN_BODY_WORDS, rng.lognormvariate(6.5, 0.7))))
+        url = article_url(i)
+
+        file_path = root / category / f"{published}_{title}.md"
+        file_path.write_text(f"""---
+title: "{title}"
+url: "{url}"
+canonical_url: "{url}"
+date: {published}
+category: {category}
+summary: "{summary}"
+---
+
+# {title}
+
+{article_text(rng, words, num_words)}
+""", encoding='utf-8')
+
+        if (i + 1) % 10000 == 0:
+            logger.info(f"  {i + 1}/{articles} articles written")
+
+    manifest.parent.mkdir(parents=True, exist_ok=True)
+    manifest.write_text(json.dumps(params))
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic data/ tree for benchmarks.")
+    parser.add_argument("--data-dir", required=True, help="Directory to write the corpus into (should be empty)")
+    parser.add_argument("--articles", type=int, default=1000, help="Number of articles")
+    parser.add_argument("--days", type=int, default=90, help="Spread article dates over the last N days")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    args = parser.parse_args()
+    generate_corpus(args.data_dir, args.articles, args.days, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""
+Offline benchmark suites.
+
+Generates synthetic corpora (see benchmarks/corpus.py), starts the local
+Jina, OpenAI, RSS and IMAP stand-ins (benchmarks/stubs.py and
+benchmarks/stub_imap.py) and times the hot paths against them:
+
+- index_rebuild: cold article index build (frontmatter and fingerprints)
+- get_ingested_urls: the RSS poller's dedup set from a warm index
+- url_already_ingested: canonical URL lookups, half hits and half misses
+- bundle_category: a week's digest of the busiest category
+- poll_feeds: polling stub feeds into the work queue
+- process_inbox: reading stub emails over IMAP into the work queue
+- ingest_batch: end-to-end fetch -> categorize -> save of new URLs
+- backfill: `python -m src.backfill` end to end against the stub Batch API
+
+Each suite runs `--repeat` times per corpus size and reports the min, median
+and mean wall time. `--output` saves the results as JSON; `--baseline`
+compares against a saved run and exits with status 1 when any median got
+more than `--max-regression` slower.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks import stub_imap
+from benchmarks.corpus import NUM_HOSTS, article_url, generate_corpus
+from benchmarks.stubs import jina_stub, openai_stub, rss_stub
+from src.backfill import main as backfill_main
+from src.bundle import bundle_category
+from src.email_ingestion import process_inbox, url_already_ingested
+from src.ingest import ingest_batch
+from src.poll_rss import get_ingested_urls, poll_feeds
+from src.utils import cache, jina_client, metrics
+from src.utils.article_index import get_index
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# A cold index build fingerprints every article, so larger corpora take minutes
+DEFAULT_SIZES = [1000]
+DEFAULT_REPEAT = 3
+
+# Workload sizes
+LOOKUPS = 1000
+FEEDS = 20
+ENTRIES_PER_FEED = 25
+EMAILS = 50
+INGEST_ARTICLES = 100
+
+# Quotas high enough that the client-side rate limiters never wait on the stubs
+UNLIMITED_RPM = "1000000"
+UNLIMITED_TPM = "1000000000"
+
+
+class Benchmark(NamedTuple):
+    """A timed callable, an untimed `before` hook run ahead of every repeat, and the operations per run."""
+    run: Callable[[], object]
+    before: Optional[Callable[[], None]] = None
+    ops: int = 1
+
+
+class BenchEnv:
+    """Stub servers and working directories shared by all suites."""
+
+    def __init__(self, work_dir: Path, latency: Dict[str, float]):
+        self.work_dir = work_dir
+        self.jina = jina_stub(latency["jina"])
+        self.openai = openai_stub(latency["openai"])
+        self.feeds: Dict[int, List[tuple]] = {}
+        self.rss = rss_stub(self.feeds, latency["rss"])
+        self.imap_server, self.mailbox = stub_imap.serve(latency=latency["imap"])
+        self.runs = 0
+
+        jina_client.JINA_BASE_URL = self.jina.url
+        os.environ.update(
+            OPENAI_BASE_URL=f"{self.openai.url}v1",
+            OPENAI_API_KEY="sk-bench",
+            JINA_RPM=UNLIMITED_RPM,
+            OPENAI_RPM=UNLIMITED_RPM,
+            OPENAI_TPM=UNLIMITED_TPM,
+            AIRLOCK_CACHE_DIR=str(work_dir / ".cache"),
+        )
+        # Every fetch and categorization should reach the stubs
+        cache.set_enabled(False)
+
+    def corpus(self, articles: int) -> str:
+        data_dir = self.work_dir / f"corpus-{articles}"
+        generate_corpus(str(data_dir), articles)
+        return str(data_dir)
+
+    def scratch(self, name: str) -> str:
+        """A fresh, empty directory."""
+        self.runs += 1
+        path = self.work_dir / "scratch" / f"{name}-{self.runs}"
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True)
+        return str(path)
+
+    def close(self) -> None:
+        self.jina.close()
+        self.openai.close()
+        self.rss.close()
+        self.imap_server.shutdown()
+        self.imap_server.server_close()
+
+
+def known_url(i: int) -> str:
+    """A corpus URL as it might arrive in the wild (tracking params, www.)."""
+    return article_url(i).replace("https://", "http://www.") + "?utm_source=bench&utm_medium=rss"
+
+
+def new_url(i: int) -> str:
+    return f"https://new{i % NUM_HOSTS}.bench.example/fresh/{i}"
+
+
+def bench_index_rebuild(env: BenchEnv, data_dir: str, articles: int) -> Benchmark:
+    return Benchmark(lambda: get_index(data_dir).rebuild(), ops=articles)
+
+
+def bench_get_ingested_urls(env: BenchEnv, data_dir: str, articles: int) -> Benchmark:
+    get_index(data_dir)
+    return Benchmark(lambda: get_ingested_urls(data_dir))
+
+
+def bench_url_already_ingested(env: BenchEnv, data_dir: str, articles: int) -> Benchmark:
+    urls = [known_url(i * 7 % articles) if i % 2 else new_url(i) for i in range(LOOKUPS)]
+
+    def run():
+        for url in urls:
+            url_already_ingested(url, data_dir)
+
+    get_index(data_dir)
+    return Benchmark(run, ops=LOOKUPS)
+
+
+def bench_bundle_category(env: BenchEnv, data_dir: str, articles: int) -> Benchmark:
+    index = get_index(data_dir)
+    busiest = max(index.categories(), key=lambda c: len(index.articles_since(c, "0000-00-00")))
+    output_dir = Path(env.scratch("digests"))
+    return Benchmark(lambda: bundle_category(Path(data_dir) / busiest, 7, output_dir))
+
+
+def bench_poll_feeds(env: BenchEnv, data_dir: str, articles: int) -> Benchmark:
+    now = time.time()
+    env.feeds.clear()
+    for feed in range(FEEDS):
+        env.feeds[feed] = [
+            (known_url((feed * ENTRIES_PER_FEED + i) % articles) if i % 2 else new_url(feed * ENTRIES_PER_FEED + i),
+             f"Entry {i} of feed {feed}", now - i * 600)
+            for i in range(ENTRIES_PER_FEED)
+        ]
+    sources = Path(env.scratch("sources")) / "sources.json"
+    sources.write_text(json.dumps({"feeds": [
+        {"name": f"Stub {feed}", "url": f"{env.rss.url}feeds/{feed}.xml"} for feed in range(FEEDS)
+    ]}))
+
+    get_index(data_dir)
+    return Benchmark(
+        lambda: poll_feeds(str(sources), data_dir, hours=24, conditional=False, enqueue=True),
+        ops=FEEDS * ENTRIES_PER_FEED
+    )
+
+
+def bench_process_inbox(env: BenchEnv, data_dir: str, articles: int) -> Benchmark:
+    box = env.mailbox
+    with box.changed:
+        box.messages.clear()
+    for i in range(EMAILS):
+        body = f"Worth reading:\n{known_url(i * 13 % articles)}\n{new_url(10**6 + i)}\n"
+        box.add(stub_imap.make_message("reader@example.com", f"Links {i}", body))
+
+    def before():
+        # Mark everything unread again
+        with box.changed:
+            for message in box.messages:
+                message["flags"].clear()
+
+    port = env.imap_server.server_address[1]
+    get_index(data_dir)
+    return Benchmark(
+        lambda: process_inbox("bench@example.com", "secret", "127.0.0.1", data_dir=data_dir,
+                              port=port, use_ssl=False, enqueue=True),
+        before=before,
+        ops=EMAILS
+    )
+
+
+def bench_ingest_batch(env: BenchEnv, data_dir: str, articles: int) -> Benchmark:
+    # Fresh output and URLs for every repeat, so nothing is skipped as already ingested
+    state = {}
+
+    def before():
+        state["output"] = env.scratch("ingest")
+        state["urls"] = [f"{new_url(i)}?run={env.runs}" for i in range(INGEST_ARTICLES)]
+
+    def run():
+        results = ingest_batch(state["urls"], output_root=state["output"])
+        saved = sum(1 for path in results.values() if path)
+        if saved != INGEST_ARTICLES:
+            logger.warning(f"ingest_batch saved {saved} of {INGEST_ARTICLES} articles")
+
+    return Benchmark(run, before=before, ops=INGEST_ARTICLES)
+
+
+def bench_backfill(env: BenchEnv, data_dir: str, articles: int) -> Benchmark:
+    # Drives the CLI through the stub's Files and Batches endpoints:
+    # upload -> create -> poll -> download output -> save
+    state = {}
+
+    def before():
+        state["output"] = env.scratch("backfill")
+        urls_file = Path(state["output"]) / "urls.txt"
+        urls_file.write_text("\n".join(f"{new_url(i)}?backfill={env.runs}" for i in range(INGEST_ARTICLES)))
+        state["argv"] = [str(urls_file), "--data-dir", state["output"], "--poll-interval", "0"]
+
+    def run():
+        backfill_main(state["argv"])
+        saved = sum(1 for _ in Path(state["output"]).glob("*/*.md"))
+        if saved != INGEST_ARTICLES:
+            logger.warning(f"backfill saved {saved} of {INGEST_ARTICLES} articles")
+
+    return Benchmark(run, before=before, ops=INGEST_ARTICLES)
+
+
+SUITES = {
+    "index_rebuild": bench_index_rebuild,
+    "get_ingested_urls": bench_get_ingested_urls,
+    "url_already_ingested": bench_url_already_ingested,
+    "bundle_category": bench_bundle_category,
+    "poll_feeds": bench_poll_feeds,
+    "process_inbox": bench_process_inbox,
+    "ingest_batch": bench_ingest_batch,
+    "backfill": bench_backfill,
+}
+
+# Suites whose cost does not depend on the corpus size run once, on the smallest corpus
+SIZE_INDEPENDENT = {"ingest_batch", "backfill"}
+
+
+def time_benchmark(benchmark: Benchmark, repeat: int) -> Dict:
+    """Run a benchmark `repeat` times and summarize the wall times."""
+    timings = []
+    for _ in range(repeat):
+        if benchmark.before:
+            benchmark.before()
+        metrics.reset()
+        started = time.perf_counter()
+        benchmark.run()
+        timings.append(time.perf_counter() - started)
+
+    median = statistics.median(timings)
+    return {
+        "ops": benchmark.ops,
+        "repeats": repeat,
+        "min_seconds": round(min(timings), 6),
+        "median_seconds": round(median, 6),
+        "mean_seconds": round(statistics.mean(timings), 6),
+        "median_ms_per_op": round(median / benchmark.ops * 1000, 4),
+        # Stage breakdown of the last repeat (see src/utils/metrics.py)
+        "stages": {stage: stats["total_seconds"] for stage, stats in metrics.report()["stages"].items()},
+    }
+
+
+def run_suites(env: BenchEnv, sizes: List[int], suites: List[str], repeat: int) -> List[Dict]:
+    results = []
+    for size in sizes:
+        data_dir = env.corpus(size)
+        for name in suites:
+            if name in SIZE_INDEPENDENT and size != min(sizes):
+                continue
+            logger.info(f"Running {name} on {size} articles...")
+            result = time_benchmark(SUITES[name](env, data_dir, size), repeat)
+            result.update(suite=name, articles=size)
+            results.append(result)
+            logger.info(f"  median {result['median_seconds']:.4f}s ({result['median_ms_per_op']} ms/op)")
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict], max_regression: float) -> List[str]:
+    """Return a description of every result whose median regressed beyond `max_regression`."""
+    previous = {(r["suite"], r["articles"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["suite"], result["articles"]))
+        if not before or not before["median_seconds"]:
+            continue
+        change = result["median_seconds"] / before["median_seconds"] - 1
+        if change > max_regression:
+            regressions.append(
+                f"{result['suite']} ({result['articles']} articles): "
+                f"{before['median_seconds']:.4f}s -> {result['median_seconds']:.4f}s (+{change:.0%})"
+            )
+    return regressions
+
+
+def log_summary(results: List[Dict]) -> None:
+    logger.info("Benchmark summary:")
+    logger.info(f"  {'Suite':<22} {'Articles':>9} {'Ops':>6} {'Median s':>10} {'Min s':>10} {'ms/op':>10}")
+    for r in results:
+        logger.info(f"  {r['suite']:<22} {r['articles']:>9} {r['ops']:>6} {r['median_seconds']:>10.4f} "
+                    f"{r['min_seconds']:>10.4f} {r['median_ms_per_op']:>10.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suites.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated corpus sizes in articles (e.g. 1000,10000,100000)")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES),
+                        help="Suite to run (repeatable; default: all)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per suite and size")
+    parser.add_argument("--work-dir", help="Keep corpora here and reuse them across runs (default: a temp dir)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every stub response")
+    parser.add_argument("--jina-latency", type=float, help="Jina stub latency (default: --latency)")
+    parser.add_argument("--openai-latency", type=float, help="OpenAI stub latency (default: --latency)")
+    parser.add_argument("--rss-latency", type=float, help="RSS stub latency (default: --latency)")
+    parser.add_argument("--imap-latency", type=float, help="IMAP stub latency per command (default: --latency)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results saved with --output")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Fail when a median is this fraction slower than the baseline")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own INFO logs")
+
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    latency = {
+        name: args.latency if value is None else value
+        for name, value in (("jina", args.jina_latency), ("openai", args.openai_latency),
+                            ("rss", args.rss_latency), ("imap", args.imap_latency))
+    }
+
+    temp_dir = None if args.work_dir else tempfile.mkdtemp(prefix="airlock-bench-")
+    work_dir = Path(args.work_dir or temp_dir)
+    env = BenchEnv(work_dir, latency)
+    try:
+        results = run_suites(env, sizes, args.suite or list(SUITES), args.repeat)
+    finally:
+        env.close()
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    log_summary(results)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": latency,
+            "results": results,
+        }, indent=2) + "\n")
+        logger.info(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        regressions = compare(results, baseline, args.max_regression)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        logger.info(f"No regressions beyond {args.max_regression:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
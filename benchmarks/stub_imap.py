@@ -0,0 +1,240 @@
+"""
+Minimal in-memory IMAP4rev1 server for exercising email ingestion offline.
+
+Supports LOGIN, SELECT, UID SEARCH/FETCH/STORE/COPY/MOVE, EXPUNGE, IDLE,
+NOOP, CLOSE and LOGOUT against a single mailbox. Every command received is
+counted so round trips can be compared between runs, and `latency` adds a
+fixed delay to each command to model a remote server.
+"""
+
+import argparse
+import re
+import socketserver
+import threading
+import time
+from email.message import EmailMessage
+from typing import Dict, List
+
+
+def make_message(sender: str, subject: str, body: str, attachment_bytes: int = 0) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "airlock@example.com"
+    msg["Subject"] = subject
+    msg.set_content(body)
+    if attachment_bytes:
+        msg.add_attachment(b"\0" * attachment_bytes, maintype="application",
+                           subtype="octet-stream", filename="attachment.bin")
+    return msg.as_bytes()
+
+
+class Mailbox:
+    def __init__(self):
+        self.messages: List[Dict] = []
+        self.next_uid = 1
+        self.commands: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.changed = threading.Condition()
+        self.connections = set()
+        self.refuse = False
+
+    def disconnect_all(self) -> None:
+        """Drop every client connection, as a flaky server would."""
+        for sock in list(self.connections):
+            try:
+                sock.shutdown(2)
+            except OSError:
+                pass
+
+    def add(self, raw: bytes) -> int:
+        with self.changed:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.messages.append({"uid": uid, "flags": set(), "raw": raw})
+            self.changed.notify_all()
+        return uid
+
+    def count(self, command: str) -> None:
+        with self.changed:
+            self.commands[command] = self.commands.get(command, 0) + 1
+
+
+def parse_set(spec: str, uids: List[int]) -> List[int]:
+    wanted = set()
+    top = max(uids) if uids else 0
+    for part in spec.split(","):
+        if ":" in part:
+            lo, hi = part.split(":")
+            lo = top if lo == "*" else int(lo)
+            hi = top if hi == "*" else int(hi)
+            lo, hi = min(lo, hi), max(lo, hi)
+            wanted.update(u for u in uids if lo <= u <= hi)
+        else:
+            u = top if part == "*" else int(part)
+            if u in uids:
+                wanted.add(u)
+    return sorted(wanted)
+
+
+def split_message(raw: bytes):
+    sep = raw.find(b"\r\n\r\n")
+    if sep == -1:
+        raw = raw.replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+        sep = raw.find(b"\r\n\r\n")
+    return raw[:sep + 4], raw[sep + 4:]
+
+
+class Handler(socketserver.StreamRequestHandler):
+    mailbox: Mailbox = None
+    latency = 0.0
+
+    def send(self, data: bytes) -> None:
+        self.mailbox.bytes_sent += len(data)
+        self.wfile.write(data)
+
+    def line(self, text: str) -> None:
+        self.send(text.encode() + b"\r\n")
+
+    def handle(self):
+        if self.mailbox.refuse:
+            return
+        self.mailbox.connections.add(self.request)
+        try:
+            self._serve()
+        finally:
+            self.mailbox.connections.discard(self.request)
+
+    def _serve(self):
+        self.line("* OK [CAPABILITY IMAP4rev1 IDLE MOVE UIDPLUS] stub ready")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            parts = raw.decode().rstrip("\r\n").split(" ", 2)
+            if len(parts) < 2:
+                continue
+            tag, command = parts[0], parts[1].upper()
+            args = parts[2] if len(parts) > 2 else ""
+            if command == "UID":
+                sub, _, args = args.partition(" ")
+                command = f"UID {sub.upper()}"
+            self.mailbox.count(command)
+            if self.latency:
+                time.sleep(self.latency)
+            if not self.dispatch(tag, command, args):
+                return
+
+    def dispatch(self, tag: str, command: str, args: str) -> bool:
+        box = self.mailbox
+        uids = [m["uid"] for m in box.messages]
+        if command == "CAPABILITY":
+            self.line("* CAPABILITY IMAP4rev1 IDLE MOVE UIDPLUS")
+        elif command in ("LOGIN", "NOOP", "CHECK"):
+            pass
+        elif command in ("SELECT", "EXAMINE"):
+            self.line(f"* {len(box.messages)} EXISTS")
+            self.line("* 0 RECENT")
+            self.line("* OK [UIDVALIDITY 1] UIDs valid")
+            self.line(f"{tag} OK [READ-WRITE] SELECT completed")
+            return True
+        elif command == "UID SEARCH":
+            unseen = "UNSEEN" in args.upper()
+            found = [str(m["uid"]) for m in box.messages if not (unseen and "\\Seen" in m["flags"])]
+            self.line("* SEARCH " + " ".join(found) if found else "* SEARCH")
+        elif command == "UID FETCH":
+            spec, _, items = args.partition(" ")
+            partial = re.search(r"BODY\.PEEK\[TEXT\]<0\.(\d+)>", items)
+            for uid in parse_set(spec, uids):
+                seq = uids.index(uid) + 1
+                msg = box.messages[seq - 1]
+                header, text = split_message(msg["raw"])
+                if "RFC822" in items.upper():
+                    self.send(f"* {seq} FETCH (UID {uid} RFC822 {{{len(msg['raw'])}}}\r\n".encode() + msg["raw"] + b")\r\n")
+                    continue
+                if partial:
+                    text = text[:int(partial.group(1))]
+                self.send(f"* {seq} FETCH (UID {uid} BODY[HEADER] {{{len(header)}}}\r\n".encode() + header)
+                self.send(f" BODY[TEXT]<0> {{{len(text)}}}\r\n".encode() + text + b")\r\n")
+        elif command == "UID STORE":
+            spec, _, rest = args.partition(" ")
+            flags = set(re.findall(r"\\\w+", rest))
+            for uid in parse_set(spec, uids):
+                msg = box.messages[uids.index(uid)]
+                if rest.startswith("-"):
+                    msg["flags"] -= flags
+                else:
+                    msg["flags"] |= flags
+        elif command == "UID COPY":
+            pass
+        elif command == "UID MOVE":
+            spec = args.split(" ", 1)[0]
+            self.expunge([u for u in parse_set(spec, uids)])
+        elif command == "EXPUNGE":
+            self.expunge([m["uid"] for m in box.messages if "\\Deleted" in m["flags"]])
+        elif command == "IDLE":
+            self.idle()
+        elif command == "CLOSE":
+            with box.changed:
+                box.messages = [m for m in box.messages if "\\Deleted" not in m["flags"]]
+        elif command == "LOGOUT":
+            self.line("* BYE logging out")
+            self.line(f"{tag} OK LOGOUT completed")
+            return False
+        else:
+            self.line(f"{tag} BAD unknown command {command}")
+            return True
+        self.line(f"{tag} OK {command} completed")
+        return True
+
+    def expunge(self, doomed: List[int]) -> None:
+        box = self.mailbox
+        with box.changed:
+            for uid in doomed:
+                uids = [m["uid"] for m in box.messages]
+                if uid in uids:
+                    seq = uids.index(uid) + 1
+                    del box.messages[seq - 1]
+                    self.line(f"* {seq} EXPUNGE")
+
+    def idle(self) -> None:
+        box = self.mailbox
+        self.line("+ idling")
+        seen = len(box.messages)
+        self.request.settimeout(0.1)
+        buffer = b""
+        while True:
+            with box.changed:
+                if len(box.messages) > seen:
+                    seen = len(box.messages)
+                    self.line(f"* {seen} EXISTS")
+            try:
+                chunk = self.request.recv(64)
+            except TimeoutError:
+                continue
+            if not chunk:
+                return
+            buffer += chunk
+            if b"DONE" in buffer.upper():
+                break
+        self.request.settimeout(None)
+
+
+def serve(port: int = 0, latency: float = 0.0):
+    """Start the stub in a background thread. Returns (server, mailbox)."""
+    mailbox = Mailbox()
+    handler = type("BoundHandler", (Handler,), {"mailbox": mailbox, "latency": latency})
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, mailbox
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local IMAP stand-in.")
+    parser.add_argument("--port", type=int, default=1143)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every command")
+    args = parser.parse_args()
+    server, mailbox = serve(args.port, args.latency)
+    print(f"Stub IMAP server on 127.0.0.1:{server.server_address[1]}")
+    threading.Event().wait()
@@ -0,0 +1,314 @@
+"""
+Local stand-ins for Jina Reader, the OpenAI chat API and RSS feeds.
+
+Each stub is a threaded HTTP server on 127.0.0.1 that answers instantly
+apart from a configurable `latency` per request, so benchmarks measure the
+pipeline rather than the network. Answers are deterministic per URL:
+
+- Jina: `GET /<article url>` returns synthetic markdown for that URL (never a
+  near-duplicate of another URL's page).
+- OpenAI: `POST /v1/chat/completions` returns a JSON categorization for
+  every article in the prompt (single and batched prompts), with usage.
+  `/v1/files` and `/v1/batches` run Batch API jobs the same way.
+- RSS: `GET /feeds/<n>.xml` returns an RSS 2.0 feed whose entries are given
+  to `RSSStub` up front.
+
+`python -m benchmarks.stubs` runs all three for manual testing; point
+`jina_client.JINA_BASE_URL` and OPENAI_BASE_URL at them.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.corpus import article_text, vocabulary
+from src.utils.llm_client import VALID_CATEGORIES
+
+ARTICLE_WORDS = 1200
+WORDS = vocabulary(seed=1)
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+def synthetic_markdown(url: str, words: int = ARTICLE_WORDS) -> str:
+    """The page Jina would return for `url`."""
+    rng = random.Random(_seed(url))
+    title = " ".join(w.capitalize() for w in rng.sample(WORDS, 4))
+    return f"Title: {title}\n\nURL Source: {url}\n\nMarkdown Content:\n# {title}\n\n{article_text(rng, WORDS, words)}\n"
+
+
+def synthetic_categorization(content: str) -> Dict[str, str]:
+    """A stable answer for one article, spread over VALID_CATEGORIES."""
+    seed = _seed(content)
+    return {
+        "title": f"Stub-Article-{seed % 10**10}",
+        "category": VALID_CATEGORIES[seed % len(VALID_CATEGORIES)],
+        "summary": "A synthetic article served by the benchmark stubs.",
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status: int, body: bytes, content_type: str, headers: Dict[str, str] = None) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class JinaHandler(StubHandler):
+    def do_GET(self):
+        url = self.path.lstrip("/")
+        self.reply(200, synthetic_markdown(url).encode("utf-8"), "text/plain; charset=utf-8")
+
+
+def chat_completion(request: Dict) -> Dict:
+    """The chat completion the stub answers `request` with."""
+    prompt = request["messages"][-1]["content"]
+
+    articles = re.split(r"^### Article \d+\n", prompt, flags=re.MULTILINE)[1:]
+    if articles:
+        answer = {"articles": [
+            dict(synthetic_categorization(text), index=i) for i, text in enumerate(articles)
+        ]}
+    else:
+        answer = synthetic_categorization(prompt.rpartition("Article Content:")[2])
+    content = json.dumps(answer)
+
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-4o-mini"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": len(prompt) // 4 + len(content) // 4,
+        },
+    }
+
+
+class OpenAIHandler(StubHandler):
+    """
+    Chat completions plus the Files and Batches endpoints used by src.backfill.
+
+    A batch reports `in_progress` on its first retrieve and `completed` after
+    that, with an output file answering every request in its input file.
+    """
+    # File ID -> {"filename", "purpose", "content"}; batch ID -> batch object
+    files: Dict[str, Dict] = {}
+    batches: Dict[str, Dict] = {}
+    lock = threading.Lock()
+
+    def reply_json(self, data: Dict, status: int = 200) -> None:
+        self.reply(status, json.dumps(data).encode("utf-8"), "application/json")
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        if self.path == "/v1/chat/completions":
+            self.reply_json(chat_completion(json.loads(self.read_body())))
+        elif self.path == "/v1/files":
+            self.upload_file()
+        elif self.path == "/v1/batches":
+            self.create_batch(json.loads(self.read_body()))
+        else:
+            self.reply_json({"error": {"message": f"Unknown endpoint {self.path}"}}, 404)
+
+    def do_GET(self):
+        match = re.fullmatch(r"/v1/(files|batches)/([\w-]+)(/content)?", self.path)
+        if match and match.group(1) == "files" and match.group(2) in self.files:
+            stored = self.files[match.group(2)]
+            if match.group(3):
+                self.reply(200, stored["content"], "application/octet-stream")
+            else:
+                self.reply_json(self.file_object(match.group(2)))
+        elif match and match.group(1) == "batches" and match.group(2) in self.batches:
+            self.reply_json(self.retrieve_batch(match.group(2)))
+        else:
+            self.reply_json({"error": {"message": f"Not found: {self.path}"}}, 404)
+
+    def file_object(self, file_id: str) -> Dict:
+        stored = self.files[file_id]
+        return {
+            "id": file_id, "object": "file", "bytes": len(stored["content"]), "created_at": int(time.time()),
+            "filename": stored["filename"], "purpose": stored["purpose"], "status": "processed",
+        }
+
+    def store_file(self, content: bytes, filename: str, purpose: str) -> str:
+        with self.lock:
+            file_id = f"file-stub{len(self.files)}"
+            self.files[file_id] = {"filename": filename, "purpose": purpose, "content": content}
+        return file_id
+
+    def upload_file(self) -> None:
+        # Parse the multipart/form-data upload with the email package
+        message = BytesParser(policy=default).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self.read_body()
+        )
+        fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+        upload = fields["file"]
+        file_id = self.store_file(
+            upload.get_payload(decode=True), upload.get_filename() or "upload.jsonl",
+            fields["purpose"].get_content().strip()
+        )
+        self.reply_json(self.file_object(file_id))
+
+    def create_batch(self, request: Dict) -> None:
+        if request.get("input_file_id") not in self.files:
+            self.reply_json({"error": {"message": "Unknown input_file_id"}}, 400)
+            return
+        with self.lock:
+            batch_id = f"batch-stub{len(self.batches)}"
+            self.batches[batch_id] = {
+                "id": batch_id, "object": "batch", "endpoint": request["endpoint"],
+                "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+                "created_at": int(time.time()), "status": "validating", "output_file_id": None,
+                "error_file_id": None, "request_counts": {"completed": 0, "failed": 0, "total": 0},
+            }
+        self.reply_json(self.batches[batch_id])
+
+    def retrieve_batch(self, batch_id: str) -> Dict:
+        with self.lock:
+            batch = self.batches[batch_id]
+            if batch["status"] == "validating":
+                batch["status"] = "in_progress"
+            elif batch["status"] == "in_progress":
+                self.run_batch(batch)
+            return dict(batch)
+
+    def run_batch(self, batch: Dict) -> None:
+        lines = self.files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+        output = []
+        for line in lines:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            output.append(json.dumps({
+                "id": f"batch-req-{len(output)}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "request_id": "stub", "body": chat_completion(request["body"])},
+                "error": None,
+            }))
+        file_id = f"file-stub{len(self.files)}"
+        self.files[file_id] = {"filename": "output.jsonl", "purpose": "batch_output",
+                               "content": ("\n".join(output) + "\n").encode("utf-8")}
+        batch.update(status="completed", output_file_id=file_id,
+                     request_counts={"completed": len(output), "failed": 0, "total": len(output)})
+
+
+class RSSHandler(StubHandler):
+    # Feed number -> list of (link, title, published timestamp)
+    feeds: Dict[int, List[tuple]] = {}
+
+    def do_GET(self):
+        match = re.fullmatch(r"/feeds/(\d+)\.xml", self.path)
+        if not match or int(match.group(1)) not in self.feeds:
+            self.reply(404, b"not found", "text/plain")
+            return
+
+        items = "".join(
+            f"<item><title>{escape(title)}</title><link>{escape(link)}</link>"
+            f"<guid>{escape(link)}</guid><pubDate>{formatdate(published)}</pubDate></item>"
+            for link, title, published in self.feeds[int(match.group(1))]
+        )
+        body = (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f"<title>Stub feed {match.group(1)}</title><link>http://127.0.0.1/</link>"
+                f"<description>Benchmark feed</description>{items}</channel></rss>")
+        self.reply(200, body.encode("utf-8"), "application/rss+xml")
+
+
+class StubServer:
+    """A stub running in a background thread. Use as a context manager or call close()."""
+
+    def __init__(self, handler: type, latency: float = 0.0, port: int = 0, **attrs):
+        bound = type(f"Bound{handler.__name__}", (handler,), dict(attrs, latency=latency))
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), bound)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def jina_stub(latency: float = 0.0, port: int = 0) -> StubServer:
+    return StubServer(JinaHandler, latency, port)
+
+
+def openai_stub(latency: float = 0.0, port: int = 0) -> StubServer:
+    """Point OPENAI_BASE_URL at `stub.url + "v1"`."""
+    return StubServer(OpenAIHandler, latency, port, files={}, batches={}, lock=threading.Lock())
+
+
+def rss_stub(feeds: Dict[int, List[tuple]], latency: float = 0.0, port: int = 0) -> StubServer:
+    """Serve `feeds` ({n: [(link, title, published timestamp), ...]}) at /feeds/<n>.xml."""
+    return StubServer(RSSHandler, latency, port, feeds=feeds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Jina, OpenAI and RSS stand-ins.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jina-port", type=int, default=8101)
+    parser.add_argument("--openai-port", type=int, default=8102)
+    parser.add_argument("--rss-port", type=int, default=8103)
+    parser.add_argument("--feed-entries", type=int, default=20, help="Entries in the single stub feed")
+
+    args = parser.parse_args()
+    now = time.time()
+    feeds = {0: [(f"https://stub.bench.example/posts/{i}", f"Stub post {i}", now - i * 60)
+                 for i in range(args.feed_entries)]}
+
+    jina = jina_stub(args.latency, args.jina_port)
+    openai = openai_stub(args.latency, args.openai_port)
+    rss = rss_stub(feeds, args.latency, args.rss_port)
+    print(f"Jina:   {jina.url}")
+    print(f"OpenAI: {openai.url}v1")
+    print(f"RSS:    {rss.url}feeds/0.xml")
+    threading.Event().wait()
+
+if __name__ == "__main__":
+    main()
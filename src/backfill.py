@@ -0,0 +1,505 @@
+"""
+Bulk backfill through the OpenAI Batch API.
+
+For historical backfills of many URLs, categorizing one article at a time is
+slow and billed at the full synchronous price. This module fetches markdown
+for a URL list, writes the exact requests `categorize_article` would send to
+a JSONL batch file, submits it through the Batch API, polls until the batch
+finishes and then saves every result with `save_article`.
+
+Fetched pages are streamed into batch files split under the Batch API's
+request and size limits, and every submitted batch is recorded under
+`<data_dir>/.airlock/batches/`, so `--resume` can finish a run that crashed
+or was interrupted while waiting.
+
+Point OPENAI_BASE_URL at a local stand-in server to exercise the flow offline.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.ingest import (save_article, read_url_list, find_duplicate, find_ingested,
+                        link_duplicate, DEFAULT_FETCH_WORKERS)
+from src.utils.article_index import get_index, state_dir
+from src.utils.fingerprint import signature, similarity, duplicate_threshold
+from src.utils.jina_client import fetch_markdown
+from src.utils.llm_client import get_client, build_request, parse_categorization
+from src.utils.urls import normalize_url, resolve_redirects
+from src.utils import fingerprint, metrics
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# The Batch API accepts at most 50,000 requests and 200 MB per input file
+MAX_BATCH_REQUESTS = 50000
+MAX_BATCH_BYTES = 200 * 1000 * 1000
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+RUNS_DIRNAME = "batches"
+STATE_FILENAME = "state.json"
+
+
+class BackfillRun:
+    """
+    On-disk state of one backfill, so a crash never loses a paid batch.
+
+    Lives in `<data_dir>/.airlock/batches/<run name>/`: `state.json` records
+    every chunk's request file, pages file, custom_id -> URL manifest and
+    batch ID as soon as they exist. Fetched pages are kept in the pages file
+    (one JSON line per article) until their results are saved.
+    """
+
+    def __init__(self, path: Path, state: Dict[str, Any]):
+        self.path = path
+        self.state = state
+
+    @classmethod
+    def create(cls, data_dir: str, model: str) -> "BackfillRun":
+        name = time.strftime("backfill-%Y%m%d-%H%M%S")
+        path = state_dir(data_dir) / RUNS_DIRNAME / name
+        path.mkdir(parents=True, exist_ok=True)
+        run = cls(path, {"model": model, "complete": False, "chunks": []})
+        run.save()
+        return run
+
+    @classmethod
+    def load(cls, data_dir: str, name: Optional[str] = None) -> Optional["BackfillRun"]:
+        """Load the named run, or the most recent one that is not complete."""
+        runs_dir = state_dir(data_dir) / RUNS_DIRNAME
+        if name:
+            candidates = [runs_dir / name]
+        else:
+            candidates = sorted(runs_dir.glob("backfill-*"), reverse=True) if runs_dir.exists() else []
+
+        for path in candidates:
+            state_file = path / STATE_FILENAME
+            if not state_file.exists():
+                continue
+            run = cls(path, json.loads(state_file.read_text(encoding="utf-8")))
+            if name or not run.state["complete"]:
+                return run
+        return None
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @property
+    def chunks(self) -> List[Dict[str, Any]]:
+        return self.state["chunks"]
+
+    def save(self) -> None:
+        # Write then rename, so a crash never leaves a half-written state file
+        tmp = self.path / f".{STATE_FILENAME}.tmp"
+        tmp.write_text(json.dumps(self.state), encoding="utf-8")
+        os.replace(tmp, self.path / STATE_FILENAME)
+
+
+class ChunkWriter:
+    """
+    Streams requests and fetched pages into Batch API sized chunk files.
+
+    A chunk is closed (and handed to `on_chunk`, e.g. to submit it) before
+    it would exceed MAX_BATCH_REQUESTS requests or MAX_BATCH_BYTES bytes.
+    Thread-safe, so fetch workers can add pages as they arrive.
+    """
+
+    def __init__(self, run: BackfillRun, on_chunk: Callable[[Dict[str, Any]], None]):
+        self.run = run
+        self.on_chunk = on_chunk
+        self.written = 0
+        self._lock = threading.Lock()
+        self._chunk: Optional[Dict[str, Any]] = None
+        self._requests = None
+        self._pages = None
+        self._bytes = 0
+
+    def _open(self) -> None:
+        n = len(self.run.chunks)
+        self._chunk = {"requests": f"requests-{n}.jsonl", "pages": f"pages-{n}.jsonl",
+                       "urls": {}, "batch_id": None, "saved": False}
+        self._requests = open(self.run.path / self._chunk["requests"], 'w', encoding='utf-8')
+        self._pages = open(self.run.path / self._chunk["pages"], 'w', encoding='utf-8')
+        self._bytes = 0
+
+    def _close(self) -> None:
+        self._requests.close()
+        self._pages.close()
+        chunk, self._chunk = self._chunk, None
+        self.run.chunks.append(chunk)
+        self.run.save()
+        self.on_chunk(chunk)
+
+    def add(self, url: str, markdown: str, sig: Optional[List[int]] = None) -> None:
+        with self._lock:
+            custom_id = f"article-{self.written}"
+            line = json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": build_request(markdown, self.run.state["model"]),
+            }) + "\n"
+            size = len(line.encode('utf-8'))
+            if size > MAX_BATCH_BYTES:
+                logger.error(f"Request for {url} exceeds the batch file size limit, skipping")
+                return
+
+            if self._chunk and (len(self._chunk["urls"]) >= MAX_BATCH_REQUESTS
+                                or self._bytes + size > MAX_BATCH_BYTES):
+                self._close()
+            if self._chunk is None:
+                self._open()
+
+            self._requests.write(line)
+            self._pages.write(json.dumps({"custom_id": custom_id, "url": url, "markdown": markdown,
+                                          "sig": sig}) + "\n")
+            self._chunk["urls"][custom_id] = url
+            self._bytes += size
+            self.written += 1
+
+    def add_alias(self, url: str, original_url: str) -> None:
+        """Record `url` as a copy of `original_url`, to be linked once that is saved."""
+        with self._lock:
+            self.run.state.setdefault("aliases", {})[url] = original_url
+
+    def close(self) -> None:
+        with self._lock:
+            if self._chunk:
+                self._close()
+            self.run.save()
+
+
+def fetch_all(
+    urls: List[str],
+    writer: ChunkWriter,
+    data_dir: str = "data",
+    max_workers: int = DEFAULT_FETCH_WORKERS
+) -> int:
+    """
+    Fetch markdown for every URL concurrently, streaming each page into
+    `writer` as it arrives. Failures are logged and dropped.
+
+    Each worker resolves redirector links first, and skips URLs already
+    ingested and pages that near-duplicate a saved article (linked as
+    aliases right away) or another page in this run (linked once the run is
+    saved), so no duplicate is ever sent to the Batch API.
+
+    Returns the number of articles fetched.
+    """
+    lock = threading.Lock()
+    threshold = duplicate_threshold()
+    # Canonical URL -> the URL in this run that claimed it
+    run_urls: Dict[str, str] = {}
+    # (signature, fetched URL) of every page written to the batch files
+    run_signatures: List[tuple] = []
+
+    def is_known(url: str, canonical_url: str) -> bool:
+        existing = find_ingested(url, canonical_url, data_dir)
+        if existing:
+            link_duplicate(url, existing, data_dir)
+            return True
+        with lock:
+            if canonical_url in run_urls:
+                logger.info(f"Same canonical URL as {run_urls[canonical_url]} in this run, skipping: {url}")
+                writer.add_alias(url, canonical_url)
+                return True
+            run_urls[canonical_url] = url
+        return False
+
+    def is_duplicate(url: str, fetch_url: str, sig: Optional[List[int]]) -> bool:
+        duplicate = find_duplicate(url, sig, data_dir)
+        if duplicate:
+            link_duplicate(url, duplicate, data_dir)
+            return True
+        if sig is None:
+            return False
+        with lock:
+            for other_sig, other_url in run_signatures:
+                if similarity(sig, other_sig) >= threshold:
+                    logger.info(f"Near-duplicate of {other_url} in this run, skipping: {url}")
+                    metrics.incr("articles.duplicates")
+                    writer.add_alias(url, other_url)
+                    return True
+            run_signatures.append((sig, fetch_url))
+        return False
+
+    def fetch(url: str) -> None:
+        try:
+            fetch_url = resolve_redirects(url)
+            if is_known(url, normalize_url(fetch_url)):
+                return
+            markdown = fetch_markdown(fetch_url)
+            if not markdown:
+                return
+            sig = None
+            if fingerprint.is_enabled():
+                with metrics.timer("fingerprint"):
+                    sig = signature(markdown)
+                if is_duplicate(url, fetch_url, sig):
+                    return
+        except Exception as e:
+            logger.error(f"Failed to fetch {url}: {e}")
+            return
+        writer.add(fetch_url, markdown, sig)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for _ in executor.map(fetch, urls):
+            pass
+    writer.close()
+
+    logger.info(f"Fetched {writer.written}/{len(urls)} articles")
+    return writer.written
+
+
+def submit_batch(path: Path) -> str:
+    """Upload a JSONL batch file and create a batch. Returns the batch ID."""
+    client = get_client()
+    with open(path, 'rb') as f:
+        input_file = client.files.create(file=f, purpose="batch")
+
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h"
+    )
+    logger.info(f"Submitted batch {batch.id} ({path.name})")
+    return batch.id
+
+
+def submit_chunk(run: BackfillRun, chunk: Dict[str, Any]) -> None:
+    """Submit a chunk and record its batch ID at once."""
+    chunk["batch_id"] = submit_batch(run.path / chunk["requests"])
+    run.save()
+
+
+def wait_for_batch(batch_id: str, poll_interval: int = 60):
+    """Poll a batch until it reaches a terminal status and return it."""
+    client = get_client()
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        if counts:
+            logger.info(f"Batch {batch_id}: {batch.status} "
+                        f"({counts.completed}/{counts.total} done, {counts.failed} failed)")
+        else:
+            logger.info(f"Batch {batch_id}: {batch.status}")
+
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+
+def save_batch_results(batch, run: BackfillRun, chunk: Dict[str, Any], data_dir: str) -> int:
+    """Parse batch output and save every successfully categorized article."""
+    if not batch.output_file_id:
+        logger.error(f"Batch {batch.id} produced no output ({batch.status})")
+        return 0
+
+    client = get_client()
+    manifest = chunk["urls"]
+
+    # custom_id -> metadata; pages are streamed from disk below
+    categorized = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        custom_id = result.get("custom_id")
+        url = manifest.get(custom_id)
+        if url is None:
+            logger.warning(f"Unknown custom_id in batch output: {custom_id}")
+            continue
+
+        try:
+            if result.get("error"):
+                raise ValueError(result["error"])
+            response = result["response"]
+            if response.get("status_code") != 200:
+                raise ValueError(f"HTTP {response.get('status_code')}: {response.get('body')}")
+            categorized[custom_id] = parse_categorization(response["body"]["choices"][0]["message"]["content"])
+            usage = response["body"].get("usage") or {}
+            metrics.incr("llm.articles")
+            metrics.incr("llm.prompt_tokens", usage.get("prompt_tokens", 0))
+            metrics.incr("llm.completion_tokens", usage.get("completion_tokens", 0))
+        except Exception as e:
+            logger.error(f"Failed to categorize {url}: {e}")
+
+    saved = 0
+    with open(run.path / chunk["pages"], 'r', encoding='utf-8') as f:
+        for line in f:
+            page = json.loads(line)
+            metadata = categorized.get(page["custom_id"])
+            if metadata is None:
+                continue
+            try:
+                sig = page.get("sig")
+                if sig is None and fingerprint.is_enabled():
+                    with metrics.timer("fingerprint"):
+                        sig = signature(page["markdown"])
+                saved_path = save_article(page["url"], page["markdown"], metadata, data_dir, sig=sig)
+                logger.info(f"Saved [{metadata['category']}] {page['url']} -> {saved_path}")
+                saved += 1
+            except Exception as e:
+                logger.error(f"Failed to save {page['url']}: {e}")
+
+    if batch.error_file_id:
+        errors = client.files.content(batch.error_file_id).text
+        for line in errors.splitlines():
+            if line.strip():
+                result = json.loads(line)
+                logger.error(f"Batch request failed for {manifest.get(result.get('custom_id'))}: {result.get('error')}")
+
+    return saved
+
+
+def finish_run(run: BackfillRun, data_dir: str, poll_interval: int = 60) -> int:
+    """
+    Submit any chunk not submitted yet, then wait for each batch and save
+    its results. Chunks already saved are skipped, so this is safe to
+    repeat after a crash. Returns the number of articles saved.
+    """
+    for chunk in run.chunks:
+        if not chunk["batch_id"]:
+            submit_chunk(run, chunk)
+
+    saved = 0
+    for chunk in run.chunks:
+        if chunk["saved"]:
+            continue
+        batch = wait_for_batch(chunk["batch_id"], poll_interval)
+        saved += save_batch_results(batch, run, chunk, data_dir)
+        # Results are on disk now; the request and page files are no longer needed
+        chunk["saved"] = True
+        run.save()
+        for name in (chunk["requests"], chunk["pages"]):
+            (run.path / name).unlink(missing_ok=True)
+
+    link_aliases(run, data_dir)
+    run.state["complete"] = True
+    run.save()
+    return saved
+
+
+def link_aliases(run: BackfillRun, data_dir: str) -> None:
+    """Link the in-run near-duplicates to the articles they copy, once those are saved."""
+    index = get_index(data_dir)
+    for url, original_url in run.state.get("aliases", {}).items():
+        original = index.find_url(original_url)
+        if original is None:
+            logger.warning(f"{original_url} was not saved; not linking its duplicate {url}")
+            continue
+        try:
+            link_duplicate(url, original, data_dir)
+        except Exception as e:
+            logger.error(f"Failed to link duplicate {url}: {e}")
+
+
+def backfill(
+    urls: List[str],
+    data_dir: str = "data",
+    model: str = "gpt-4o-mini",
+    fetch_workers: int = DEFAULT_FETCH_WORKERS,
+    poll_interval: int = 60
+) -> int:
+    """
+    Categorize and save many URLs through the Batch API.
+
+    Pages are streamed into batch files as they are fetched, and each file
+    is submitted as soon as it is full. Progress is recorded on disk (see
+    BackfillRun); after a crash or Ctrl-C, `resume` picks up the batches.
+
+    Returns the number of articles saved.
+    """
+    index = get_index(data_dir)
+    # Cheap pre-filter; redirector links are resolved and checked by the fetch workers
+    urls = list(dict.fromkeys(url for url in urls if not index.contains(normalize_url(url))))
+    if not urls:
+        logger.info("Nothing to backfill: every URL is already ingested")
+        return 0
+
+    run = BackfillRun.create(data_dir, model)
+    logger.info(f"Started backfill run {run.name}")
+    # Submit each chunk as soon as it is full, before waiting on any of them
+    writer = ChunkWriter(run, lambda chunk: submit_chunk(run, chunk))
+    if not fetch_all(urls, writer, data_dir, fetch_workers):
+        run.state["complete"] = True
+        run.save()
+        return 0
+
+    saved = finish_run(run, data_dir, poll_interval)
+    logger.info(f"Backfill complete: saved {saved}/{len(urls)} articles")
+    return saved
+
+
+def resume(data_dir: str = "data", name: Optional[str] = None, poll_interval: int = 60) -> int:
+    """
+    Finish an interrupted backfill run (by default the latest incomplete one).
+
+    URLs that were never fetched before the interruption are not in the run;
+    backfill the URL list again to pick them up (saved ones are skipped).
+    """
+    run = BackfillRun.load(data_dir, name)
+    if run is None:
+        logger.info("No interrupted backfill run to resume")
+        return 0
+    if run.state["complete"]:
+        logger.info(f"Backfill run {run.name} is already complete")
+        return 0
+
+    logger.info(f"Resuming backfill run {run.name} ({len(run.chunks)} batches)")
+    saved = finish_run(run, data_dir, poll_interval)
+    logger.info(f"Backfill run {run.name} complete: saved {saved} articles")
+    return saved
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Backfill many URLs through the OpenAI Batch API.")
+    parser.add_argument("urls_file", nargs="?", help="File with one URL per line")
+    parser.add_argument("--data-dir", default="data", help="Root directory for storing data")
+    parser.add_argument("--model", default="gpt-4o-mini", help="OpenAI model to use")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS, help="Concurrent Jina fetches")
+    parser.add_argument("--poll-interval", type=int, default=60, help="Seconds between batch status checks")
+    parser.add_argument("--resume", nargs="?", const="", metavar="RUN",
+                        help="Finish an interrupted run (default: the latest incomplete one) instead of starting one")
+    parser.add_argument("--metrics-json", metavar="FILE", help="Write a JSON run report (stage timings, counters, tokens) to FILE")
+    parser.add_argument("--metrics-prom", metavar="FILE", help="Write run metrics to FILE in Prometheus text format")
+
+    args = parser.parse_args(argv)
+    metrics.export_on_exit(args.metrics_json, args.metrics_prom)
+
+    if args.resume is not None:
+        resume(args.data_dir, args.resume or None, args.poll_interval)
+        return
+
+    if not args.urls_file:
+        parser.error("urls_file is required unless --resume is given")
+
+    backfill(
+        read_url_list(args.urls_file),
+        data_dir=args.data_dir,
+        model=args.model,
+        fetch_workers=args.fetch_workers,
+        poll_interval=args.poll_interval
+    )
+
+
+if __name__ == "__main__":
+    main()
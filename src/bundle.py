@@ -1,10 +1,18 @@
 import argparse
 import logging
 import os
-import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, date
 from pathlib import Path
-from typing import List, Dict
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils import metrics
+from src.utils.article_index import get_index
 
 # Configure logging
 logging.basicConfig(
@@ -13,106 +21,268 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_frontmatter_value(content: str, key: str) -> str:
-    """Extract value from key: value line in yaml frontmatter."""
-    match = re.search(f'^{key}:\\s*["\']?([^"\']+)["\']?', content, re.MULTILINE)
-    return match.group(1).strip() if match else "Untitled"
+# Article bodies are copied into digests in chunks of this size
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Allowance for a digest's heading and section titles when packing parts
+PART_OVERHEAD_BYTES = 256
+PART_OVERHEAD_WORDS = 32
+
+def body_span(f: BinaryIO, body_offset: int) -> Tuple[int, int]:
+    """
+    Return the (start, end) byte range of an article body with trailing
+    whitespace trimmed, scanning back from the end of the file.
+    """
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    while end > body_offset:
+        start = max(body_offset, end - COPY_CHUNK_SIZE)
+        f.seek(start)
+        trimmed = f.read(end - start).rstrip()
+        if trimmed:
+            return body_offset, start + len(trimmed)
+        end = start
+    return body_offset, body_offset
+
+def copy_body(file_path: Path, body_offset: int, out: BinaryIO) -> int:
+    """Stream an article body from disk into `out` in fixed-size chunks."""
+    copied = 0
+    with open(file_path, 'rb') as f:
+        start, end = body_span(f, body_offset)
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            out.write(chunk)
+            copied += len(chunk)
+            remaining -= len(chunk)
+    return copied
+
+def write_digest(digest_path: Path, heading: str, articles: List[Dict], index) -> int:
+    """
+    Write a digest file without holding it in memory.
+
+    The table of contents and sources are built from index metadata first;
+    article bodies are then copied into the file chunk by chunk, so peak
+    memory stays flat however large the digest grows. Returns bytes written.
+    """
+    toc_lines = []
+    url_list = []
+    for i, article in enumerate(articles):
+        title = article['title'] or "Untitled"
+        toc_lines.append(f"{i+1}. [{title}](#article-{i})")
+        url_list.append(article['url'] or "Untitled")
+
+    sources_section = "## Sources\n" + "\n".join(f"- {url}" for url in url_list)
+
+    with open(digest_path, 'wb') as out:
+        out.write(f"""# {heading}
+
+## Table of Contents
+{chr(10).join(toc_lines)}
+
+{sources_section}
+
+""".encode('utf-8'))
+
+        for i, article in enumerate(articles):
+            title = article['title'] or "Untitled"
+            url = article['url'] or "Untitled"
+            summary = article['summary'] or "Untitled"
+
+            block_header = f"""
+---
+<a id="article-{i}"></a>
+## {title}
+**Source:** {url}  
+**Summary:** {summary}
+
+"""
+            if i > 0:
+                out.write(b"\n")
+            out.write(block_header.encode('utf-8'))
+            copy_body(index.absolute_path(article['path']), article['body_offset'], out)
+            out.write(b"\n")
+
+        out.write(b"\n")
+        return out.tell()
+
+def article_cost(position: int, article: Dict) -> Tuple[int, int]:
+    """
+    Estimate the (bytes, words) an article adds to a digest from index
+    metadata alone: its block header and body, TOC line and sources line.
+    """
+    title = article['title'] or "Untitled"
+    url = article['url'] or "Untitled"
+    summary = article['summary'] or "Untitled"
+    header = f"\n---\n<a id=\"article-{position}\"></a>\n## {title}\n**Source:** {url}  \n**Summary:** {summary}\n\n"
+    toc_line = f"{position+1}. [{title}](#article-{position})\n"
+    source_line = f"- {url}\n"
+
+    extra = header + toc_line + source_line
+    cost_bytes = len(extra.encode('utf-8')) + article['body_bytes'] + 2
+    cost_words = len(extra.split()) + article['body_words']
+    return cost_bytes, cost_words
+
+def pack_articles(
+    articles: List[Dict],
+    max_bytes: Optional[int] = None,
+    max_words: Optional[int] = None
+) -> List[List[Dict]]:
+    """
+    Split articles into as few digest parts as possible under the size caps.
 
-def bundle_category(category_path: Path, days: int, output_dir: Path):
+    Uses first-fit decreasing bin packing on the sizes stored in the index,
+    so no body is read. Within each part articles keep their original
+    (newest first) order, and parts are ordered by their newest article. An
+    article larger than a cap on its own gets a part to itself.
+    """
+    if not max_bytes and not max_words:
+        return [articles] if articles else []
+
+    byte_cap = max_bytes or float('inf')
+    word_cap = max_words or float('inf')
+    # Positions in a part are not known yet; size anchors as if it were the largest
+    costs = [article_cost(len(articles), article) for article in articles]
+
+    def weight(i: int) -> float:
+        return max(costs[i][0] / byte_cap, costs[i][1] / word_cap)
+
+    parts = []  # [bytes_used, words_used, [article positions]]
+    for i in sorted(range(len(articles)), key=weight, reverse=True):
+        cost_bytes, cost_words = costs[i]
+        for part in parts:
+            if part[0] + cost_bytes <= byte_cap and part[1] + cost_words <= word_cap:
+                part[0] += cost_bytes
+                part[1] += cost_words
+                part[2].append(i)
+                break
+        else:
+            if cost_bytes + PART_OVERHEAD_BYTES > byte_cap or cost_words + PART_OVERHEAD_WORDS > word_cap:
+                logger.warning(f"Article exceeds digest size cap on its own: {articles[i]['path']}")
+            parts.append([PART_OVERHEAD_BYTES + cost_bytes, PART_OVERHEAD_WORDS + cost_words, [i]])
+
+    ordered = sorted(sorted(part[2]) for part in parts)
+    return [[articles[i] for i in positions] for positions in ordered]
+
+def bundle_category(
+    category_path: Path,
+    days: int,
+    output_dir: Path,
+    max_bytes: Optional[int] = None,
+    max_words: Optional[int] = None,
+    sync_index: bool = True
+) -> Dict:
     """
     Bundle recent files in a category directory into a digest.
+
+    Articles are selected through the article index by date, so only the
+    bodies of the articles being bundled are read. With `max_bytes` and/or
+    `max_words` the digest is split into numbered parts that each stay under
+    the cap (e.g. NotebookLM's per-source limit), each with its own table of
+    contents and sources. Pass `sync_index=False` when the caller has already
+    synced the index (e.g. from a worker process), to skip rescanning the corpus.
+
+    Returns:
+        Stats for the summary report: category, files, bytes, seconds, paths.
     """
+    started = time.perf_counter()
     category = category_path.name
     cutoff = datetime.now() - timedelta(days=days)
-    
-    # Find relevant files
-    files_to_bundle = []
+    stats = {"category": category, "files": 0, "bytes": 0, "seconds": 0.0, "paths": []}
     
     if not category_path.exists():
         logger.warning(f"Category directory not found: {category_path}")
-        return
+        return stats
 
-    for md_file in category_path.glob("*.md"):
-        # Check date in filename YYYY-MM-DD_...
-        try:
-            date_str = md_file.name[:10]
-            file_date = datetime.strptime(date_str, "%Y-%m-%d")
-            
-            if file_date > cutoff:
-                files_to_bundle.append(md_file)
-        except ValueError:
-            logger.warning(f"Skipping file with invalid date format: {md_file.name}")
-            continue
+    # Find relevant files (dated by their YYYY-MM-DD_ filename prefix), newest first
+    index = get_index(str(category_path.parent), sync=sync_index)
+    files_to_bundle = index.articles_since(category, cutoff.date().isoformat())
             
     if not files_to_bundle:
         logger.info(f"No recent files found for category: {category}")
-        return
+        stats["seconds"] = time.perf_counter() - started
+        return stats
         
     logger.info(f"Bundling {len(files_to_bundle)} files for {category}...")
     
-    # Sort by date (newest first)
-    files_to_bundle.sort(key=lambda x: x.name, reverse=True)
-    
-    # Create valid filename
-    today_str = date.today().isoformat()
-    digest_filename = f"Weekly_Digest_{category}_{today_str}.md"
-
     # Create date-based subfolder
+    today_str = date.today().isoformat()
     date_folder = output_dir / today_str
     date_folder.mkdir(parents=True, exist_ok=True)
-    digest_path = date_folder / digest_filename
 
-    # Build Content
-    toc_lines = []
-    content_blocks = []
-    url_list = []
-    
-    for i, file_path in enumerate(files_to_bundle):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            raw_content = f.read()
-            
-        # Parse simplified
-        title = get_frontmatter_value(raw_content, "title")
-        url = get_frontmatter_value(raw_content, "url")
-        summary = get_frontmatter_value(raw_content, "summary")
-        url_list.append(url)
-
-        # Remove frontmatter for inclusion
-        # Assume frontmatter ends at second ---
-        parts = raw_content.split('---', 2)
-        body = parts[2].strip() if len(parts) > 2 else raw_content
-        
-        anchor = f"article-{i}"
-        toc_lines.append(f"{i+1}. [{title}](#{anchor})")
-        
-        block = f"""
----
-<a id="{anchor}"></a>
-## {title}
-**Source:** {url}  
-**Summary:** {summary}
+    parts = pack_articles(files_to_bundle, max_bytes, max_words)
+    written = 0
+    paths = []
+    for n, part in enumerate(parts, start=1):
+        heading = f"Weekly Digest: {category} - {today_str}"
+        digest_filename = f"Weekly_Digest_{category}_{today_str}.md"
+        if len(parts) > 1:
+            heading += f" (Part {n} of {len(parts)})"
+            digest_filename = f"Weekly_Digest_{category}_{today_str}_part{n}.md"
 
-{body}
-"""
-        content_blocks.append(block)
+        digest_path = date_folder / digest_filename
+        written += write_digest(digest_path, heading, part, index)
+        paths.append(str(digest_path))
+        logger.info(f"Created digest: {digest_path}")
 
-    # Assemble Final Markdown
-    sources_section = "## Sources\n" + "\n".join(f"- {url}" for url in url_list)
+    stats.update(
+        files=len(files_to_bundle),
+        bytes=written,
+        seconds=time.perf_counter() - started,
+        paths=paths
+    )
+    return stats
 
-    full_content = f"""# Weekly Digest: {category} - {today_str}
+def bundle_all(
+    category_dirs: List[Path],
+    days: int,
+    output_dir: Path,
+    workers: int = 1,
+    max_bytes: Optional[int] = None,
+    max_words: Optional[int] = None
+) -> List[Dict]:
+    """
+    Bundle several categories, in a process pool when `workers` > 1.
 
-## Table of Contents
-{chr(10).join(toc_lines)}
+    Each category writes its own digest file, so the output is the same as a
+    sequential run; stats are returned in the order of `category_dirs`.
+    """
+    if workers <= 1 or len(category_dirs) <= 1:
+        return [bundle_category(cat_dir, days, output_dir, max_bytes, max_words) for cat_dir in category_dirs]
 
-{sources_section}
+    # Sync each index once here, so worker processes only read it
+    for data_root in {cat_dir.parent for cat_dir in category_dirs}:
+        get_index(str(data_root))
 
-{chr(10).join(content_blocks)}
-"""
+    with ProcessPoolExecutor(max_workers=min(workers, len(category_dirs))) as executor:
+        futures = [
+            executor.submit(bundle_category, cat_dir, days, output_dir, max_bytes, max_words, False)
+            for cat_dir in category_dirs
+        ]
+        return [future.result() for future in futures]
 
-    with open(digest_path, 'w', encoding='utf-8') as f:
-        f.write(full_content)
-        
-    logger.info(f"Created digest: {digest_path}")
+def record_metrics(all_stats: List[Dict]) -> None:
+    """Add bundle stats to the run metrics (workers run in other processes, so their stats are used)."""
+    for stats in all_stats:
+        metrics.observe("bundle", stats['seconds'])
+        metrics.incr("bundle.files", stats['files'])
+        metrics.incr("bundle.bytes", stats['bytes'])
+        metrics.incr("bundle.parts", len(stats['paths']))
+
+def log_summary(all_stats: List[Dict], elapsed: float) -> None:
+    """Log a per-category report of files, bytes and time."""
+    logger.info("Bundle summary:")
+    logger.info(f"  {'Category':<22} {'Files':>6} {'Parts':>6} {'Bytes':>12} {'Seconds':>8}")
+    for stats in all_stats:
+        logger.info(f"  {stats['category']:<22} {stats['files']:>6} {len(stats['paths']):>6} "
+                    f"{stats['bytes']:>12} {stats['seconds']:>8.2f}")
+    total_files = sum(s['files'] for s in all_stats)
+    total_bytes = sum(s['bytes'] for s in all_stats)
+    total_parts = sum(len(s['paths']) for s in all_stats)
+    logger.info(f"  {'TOTAL':<22} {total_files:>6} {total_parts:>6} {total_bytes:>12} {elapsed:>8.2f}")
 
 def main():
     parser = argparse.ArgumentParser(description="Bundle recent articles into digests.")
@@ -120,8 +290,14 @@ def main():
     parser.add_argument("--category", help="Specific category to bundle (default: all)")
     parser.add_argument("--data-dir", default="data", help="Root data directory")
     parser.add_argument("--output-dir", default="Digests", help="Output directory for digests")
+    parser.add_argument("--workers", type=int, default=1, help="Bundle categories in N parallel processes")
+    parser.add_argument("--max-bytes", type=int, help="Split digests into parts of at most this many bytes")
+    parser.add_argument("--max-words", type=int, help="Split digests into parts of at most this many words")
+    parser.add_argument("--metrics-json", metavar="FILE", help="Write a JSON run report (stage timings, counters) to FILE")
+    parser.add_argument("--metrics-prom", metavar="FILE", help="Write run metrics to FILE in Prometheus text format")
     
     args = parser.parse_args()
+    metrics.export_on_exit(args.metrics_json, args.metrics_prom)
     
     data_root = Path(args.data_dir)
     output_root = Path(args.output_dir)
@@ -129,13 +305,21 @@ def main():
     
     if args.category:
         # Bundle specific category
-        bundle_category(data_root / args.category, args.days, output_root)
+        stats = bundle_category(data_root / args.category, args.days, output_root, args.max_bytes, args.max_words)
+        record_metrics([stats])
     else:
         # Bundle all found categories
         if data_root.exists():
-            for cat_dir in data_root.iterdir():
-                if cat_dir.is_dir():
-                    bundle_category(cat_dir, args.days, output_root)
+            started = time.perf_counter()
+            category_dirs = sorted(
+                cat_dir for cat_dir in data_root.iterdir()
+                if cat_dir.is_dir() and not cat_dir.name.startswith('.')
+            )
+            all_stats = bundle_all(
+                category_dirs, args.days, output_root, args.workers, args.max_bytes, args.max_words
+            )
+            record_metrics(all_stats)
+            log_summary(all_stats, time.perf_counter() - started)
         else:
             logger.error(f"Data directory not found: {data_root}")
 
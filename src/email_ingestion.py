@@ -18,16 +18,24 @@ from email.header import decode_header
 import re
 import logging
 import os
+import select
 import sys
+import threading
+import time
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Iterator, Optional
 from dotenv import load_dotenv
 
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.ingest import ingest_url
+from src.utils.article_index import get_index
+from src.utils.job_queue import JobQueue
+from src.utils.urls import canonicalize, normalize_url
+from src.utils import cache, classifier, fingerprint, metrics
+from src.worker import process_jobs, DEFAULT_CLAIM_SIZE, DEFAULT_POLL_INTERVAL
 
 # Configure logging
 logging.basicConfig(
@@ -50,6 +58,31 @@ IMAP_SERVERS = {
     'yahoo.com': 'imap.mail.yahoo.com',
 }
 
+# Messages fetched per UID FETCH command
+FETCH_CHUNK_SIZE = 100
+
+# Only the first 64 KB of each message body is downloaded; shared links are
+# near the top, and attachments after that point are never transferred
+BODY_PEEK_BYTES = 65536
+
+# Pieces of a FETCH response: "<seq> (" starts a message, then UID and sections
+FETCH_START_PATTERN = re.compile(r'^\d+ \(')
+FETCH_UID_PATTERN = re.compile(r'\bUID (\d+)')
+FETCH_SECTION_PATTERN = re.compile(r'BODY\[(HEADER|TEXT)\]', re.IGNORECASE)
+
+# UIDs per STORE / MOVE / COPY command when post-processing
+STORE_CHUNK_SIZE = 500
+
+# IDLE is re-issued well within the 29 minutes after which servers may drop it
+IDLE_TIMEOUT = 25 * 60
+
+# Reconnect backoff for the IDLE daemon (seconds)
+RECONNECT_MIN_DELAY = 5
+RECONNECT_MAX_DELAY = 300
+
+# Concurrent fetches and LLM calls while the IDLE daemon ingests queued URLs
+DEFAULT_INGEST_WORKERS = 4
+
 # URL extraction pattern
 URL_PATTERN = re.compile(
     r'https?://[^\s<>\[\]\"\']+',
@@ -150,7 +183,11 @@ def extract_urls_from_text(text: str) -> list[str]:
             
         valid_urls.append(url)
     
-    return list(set(valid_urls))  # Remove duplicates
+    # Remove duplicates, including other spellings of the same URL
+    unique_urls = {}
+    for url in valid_urls:
+        unique_urls.setdefault(normalize_url(url), url)
+    return list(unique_urls.values())
 
 
 def get_email_body(msg: email.message.Message) -> str:
@@ -183,106 +220,330 @@ def get_email_body(msg: email.message.Message) -> str:
 def connect_to_inbox(
     email_address: str,
     password: str,
-    imap_server: Optional[str] = None
-) -> imaplib.IMAP4_SSL:
-    """Connect to email inbox via IMAP."""
+    imap_server: Optional[str] = None,
+    port: Optional[int] = None,
+    use_ssl: bool = True
+) -> imaplib.IMAP4:
+    """
+    Connect to email inbox via IMAP.
+
+    `port` and `use_ssl=False` allow pointing at a local plain-text IMAP
+    stand-in for testing.
+    """
     server = imap_server or get_imap_server(email_address)
     
     logger.info(f"Connecting to {server}...")
     
-    mail = imaplib.IMAP4_SSL(server)
+    if use_ssl:
+        mail = imaplib.IMAP4_SSL(server, port or imaplib.IMAP4_SSL_PORT)
+    else:
+        mail = imaplib.IMAP4(server, port or imaplib.IMAP4_PORT)
     mail.login(email_address, password)
+    refresh_capabilities(mail)
     
     logger.info("Successfully connected to inbox")
     return mail
 
 
-def fetch_unread_emails(
-    mail: imaplib.IMAP4_SSL,
-    folder: str = "INBOX",
+def refresh_capabilities(mail: imaplib.IMAP4) -> None:
+    """
+    Re-query CAPABILITY after login and cache it on `mail.capabilities`.
+
+    imaplib only records the capabilities announced before authentication,
+    and many servers advertise extensions such as MOVE only after login.
+    """
+    typ, data = mail.capability()
+    if typ == 'OK' and data and data[-1]:
+        mail.capabilities = tuple(data[-1].decode().upper().split())
+
+
+def chunked(items: list, size: int) -> Iterator[list]:
+    """Yield successive slices of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def search_messages(
+    mail: imaplib.IMAP4,
+    unread_only: bool = True,
     max_age_days: int = 7
-) -> list[tuple[str, email.message.Message]]:
-    """Fetch unread emails from specified folder."""
-    mail.select(folder)
-    
-    # Search for unread emails
-    # We also filter by date to avoid processing very old emails
+) -> list[str]:
+    """Return the UIDs of recent (optionally only unread) messages in the selected folder."""
+    # We filter by date to avoid processing very old emails
     since_date = (datetime.now() - timedelta(days=max_age_days)).strftime("%d-%b-%Y")
-    
-    # Search criteria: UNSEEN (unread) and SINCE date
-    status, messages = mail.search(None, f'(UNSEEN SINCE {since_date})')
-    
+    criteria = f'(UNSEEN SINCE {since_date})' if unread_only else f'(SINCE {since_date})'
+
+    status, messages = mail.uid('SEARCH', None, criteria)
     if status != 'OK':
         logger.warning("Failed to search emails")
         return []
-    
-    email_ids = messages[0].split()
-    logger.info(f"Found {len(email_ids)} unread emails")
-    
+    return [uid.decode() for uid in messages[0].split()]
+
+
+def parse_fetch_response(data: list) -> dict[str, dict[str, bytes]]:
+    """
+    Group a UID FETCH response by message.
+
+    imaplib returns each literal as a (prefix, payload) tuple and the rest of
+    the response as plain bytes; servers may put the UID before or after the
+    literals. Returns {uid: {"HEADER": bytes, "TEXT": bytes}}.
+    """
+    messages = {}
+    current: Optional[dict] = None
+    uid: Optional[str] = None
+
+    def flush():
+        if current is not None and uid is not None:
+            messages[uid] = current
+
+    for item in data:
+        prefix = item[0] if isinstance(item, tuple) else item
+        if not isinstance(prefix, bytes):
+            continue
+        prefix_text = prefix.decode('ascii', errors='ignore')
+
+        if FETCH_START_PATTERN.match(prefix_text):
+            flush()
+            current, uid = {}, None
+        if current is None:
+            continue
+
+        match = FETCH_UID_PATTERN.search(prefix_text)
+        if match:
+            uid = match.group(1)
+        if isinstance(item, tuple):
+            sections = FETCH_SECTION_PATTERN.findall(prefix_text)
+            if sections:
+                current[sections[-1].upper()] = item[1]
+    flush()
+    return messages
+
+
+def fetch_messages(
+    mail: imaplib.IMAP4,
+    uids: list[str],
+    chunk_size: int = FETCH_CHUNK_SIZE
+) -> list[tuple[str, email.message.Message]]:
+    """
+    Fetch messages by UID in batches of `chunk_size` per FETCH command.
+
+    Only the headers and the first BODY_PEEK_BYTES of the body are
+    downloaded (attachments past that point are never transferred), and
+    BODY.PEEK leaves the \\Seen flag untouched until post-processing.
+    """
     emails = []
-    for email_id in email_ids:
-        status, msg_data = mail.fetch(email_id, '(RFC822)')
-        if status == 'OK':
-            raw_email = msg_data[0][1]
-            msg = email.message_from_bytes(raw_email)
-            emails.append((email_id.decode(), msg))
-    
+    for chunk in chunked(uids, chunk_size):
+        status, data = mail.uid(
+            'FETCH', ','.join(chunk), f'(UID BODY.PEEK[HEADER] BODY.PEEK[TEXT]<0.{BODY_PEEK_BYTES}>)'
+        )
+        if status != 'OK':
+            logger.warning(f"Failed to fetch {len(chunk)} emails")
+            continue
+
+        parts = parse_fetch_response(data)
+        for uid in chunk:
+            if uid in parts:
+                raw_email = parts[uid].get("HEADER", b"") + parts[uid].get("TEXT", b"")
+                emails.append((uid, email.message_from_bytes(raw_email)))
     return emails
 
 
-def mark_as_read(mail: imaplib.IMAP4_SSL, email_id: str) -> None:
+def fetch_unread_emails(
+    mail: imaplib.IMAP4,
+    folder: str = "INBOX",
+    max_age_days: int = 7,
+    unread_only: bool = True
+) -> list[tuple[str, email.message.Message]]:
+    """Fetch recent (by default unread) emails from a folder, keyed by UID."""
+    mail.select(folder)
+
+    uids = search_messages(mail, unread_only, max_age_days)
+    logger.info(f"Found {len(uids)} {'unread ' if unread_only else ''}emails")
+
+    return fetch_messages(mail, uids)
+
+
+def uid_set(uids: list[str]) -> str:
+    """Compress UIDs into an IMAP message set, e.g. ['1', '2', '3', '7'] -> '1:3,7'."""
+    numbers = sorted({int(uid) for uid in uids})
+    ranges = []
+    for number in numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ",".join(str(lo) if lo == hi else f"{lo}:{hi}" for lo, hi in ranges)
+
+
+def add_flag(mail: imaplib.IMAP4, email_ids: list[str], flag: str) -> None:
+    """Set a flag on many emails with one UID STORE per chunk."""
+    for chunk in chunked(email_ids, STORE_CHUNK_SIZE):
+        mail.uid('STORE', uid_set(chunk), '+FLAGS.SILENT', f'({flag})')
+
+
+def move_emails(mail: imaplib.IMAP4, email_ids: list[str], destination: str) -> None:
+    """
+    Move emails to a different folder.
+
+    Uses UID MOVE (RFC 6851) when the server supports it, otherwise UID COPY
+    followed by flagging the originals \\Deleted for the caller's EXPUNGE.
+    """
+    for chunk in chunked(email_ids, STORE_CHUNK_SIZE):
+        message_set = uid_set(chunk)
+        if 'MOVE' in mail.capabilities:
+            mail.uid('MOVE', message_set, destination)
+            continue
+        result = mail.uid('COPY', message_set, destination)
+        if result[0] == 'OK':
+            mail.uid('STORE', message_set, '+FLAGS.SILENT', '(\\Deleted)')
+
+
+def mark_as_read(mail: imaplib.IMAP4, email_id: str) -> None:
     """Mark an email as read."""
-    mail.store(email_id, '+FLAGS', '\\Seen')
+    add_flag(mail, [email_id], '\\Seen')
 
 
-def delete_email(mail: imaplib.IMAP4_SSL, email_id: str) -> None:
+def delete_email(mail: imaplib.IMAP4, email_id: str) -> None:
     """Move email to Trash/Deleted folder."""
     # Most modern IMAP servers (Gmail, iCloud) support the \Deleted flag
     # which moves it to Trash or hides it until EXPUNGE
-    mail.store(email_id, '+FLAGS', '\\Deleted')
+    add_flag(mail, [email_id], '\\Deleted')
 
 
-def move_email(mail: imaplib.IMAP4_SSL, email_id: str, destination: str) -> None:
+def move_email(mail: imaplib.IMAP4, email_id: str, destination: str) -> None:
     """Move email to a different folder."""
-    result = mail.copy(email_id, destination)
-    if result[0] == 'OK':
-        mail.store(email_id, '+FLAGS', '\\Deleted')
+    move_emails(mail, [email_id], destination)
 
 
 def url_already_ingested(url: str, data_dir: str = "data") -> bool:
     """
-    Check if a URL has already been ingested by scanning markdown files.
+    Check if a URL has already been ingested using the persistent URL index.
     
     Args:
         url: URL to check
         data_dir: Root data directory containing category folders
     
     Returns:
-        True if URL found in any existing markdown file, False otherwise
+        True if the URL's canonical form is recorded in the index, False otherwise
     """
-    data_path = Path(data_dir)
-    if not data_path.exists():
+    if not Path(data_dir).exists():
         return False
     
-    # Normalize URL for comparison (remove trailing slashes, query params can vary)
-    normalized_url = url.rstrip('/')
+    # Compare canonical forms (tracking parameters, www., redirects, ...)
+    with metrics.timer("dedup_scan"):
+        return get_index(data_dir).contains(canonicalize(url))
+
+
+def apply_action(mail: imaplib.IMAP4, email_ids: list[str], post_process_action: str) -> None:
+    """Apply the configured post-processing action to many emails at once."""
+    if not email_ids:
+        return
+    if post_process_action == "delete":
+        add_flag(mail, email_ids, '\\Deleted')
+        logger.info(f"Deleted {len(email_ids)} email(s) (moved to trash)")
+    elif post_process_action == "archive":
+        # For Gmail, 'archive' is usually moving to '[Gmail]/All Mail' 
+        # but simple solution is to move to an 'Airlock-Archive' folder
+        move_emails(mail, email_ids, "Archive")
+        logger.info(f"Archived {len(email_ids)} email(s)")
+    else:
+        add_flag(mail, email_ids, '\\Seen')
+        logger.info(f"Marked {len(email_ids)} email(s) as read")
+
+
+def read_message(msg: email.message.Message) -> tuple[str, str, list[str]]:
+    """Return an email's subject, sender and the URLs in its subject and body."""
+    subject = decode_email_subject(msg.get('Subject', ''))
+    sender = msg.get('From', 'Unknown')
+    body = get_email_body(msg)
+    return subject, sender, extract_urls_from_text(f"{subject}\n{body}")
+
+
+def process_messages(
+    mail: imaplib.IMAP4,
+    ingest: Callable[[str], bool],
+    folder: str = "INBOX",
+    data_dir: str = "data",
+    allowed_senders: Optional[list[str]] = None,
+    unread_only: bool = True,
+    post_process_action: str = "read",
+    dry_run: bool = False
+) -> int:
+    """
+    Process pending emails on an already authenticated connection.
+
+    URLs found in allowed emails are handed to `ingest`, which returns True
+    if the URL was ingested (or queued for ingestion), False if it was
+    already pending, and raises if it could not be handled. Emails whose
+    URLs were all ingested (or already known) are collected by UID and
+    post-processed in bulk at the end; the single EXPUNGE is left to the
+    caller. An email with a failed URL is left untouched, so it is picked up
+    again on the next run instead of its link being lost.
+
+    Returns:
+        Number of URLs passed to `ingest` successfully
+    """
+    ingested_count = 0
+    allowed_senders = allowed_senders or []
+    # UIDs to post-process, and UIDs without URLs that are only marked read
+    processed: list[str] = []
+    no_urls: list[str] = []
+
+    # Unread (or, with unread_only=False, all) emails from the last 7 days
+    emails = fetch_unread_emails(mail, folder, unread_only=unread_only)
     
-    # Search all markdown files in all category subdirectories
-    for md_file in data_path.rglob("*.md"):
+    for email_id, msg in emails:
         try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # Look for URL in frontmatter
-                if f'url: "{url}"' in content or f"url: '{url}'" in content:
-                    return True
-                # Also check normalized version
-                if f'url: "{normalized_url}"' in content or f"url: '{normalized_url}'" in content:
-                    return True
+            subject, sender, urls = read_message(msg)
         except Exception as e:
-            logger.warning(f"Error reading {md_file}: {e}")
+            # A malformed email must not stop the others (or the IDLE daemon)
+            logger.error(f"Skipping email {email_id} that could not be parsed: {e}")
             continue
-    
-    return False
+
+        # Check if sender is allowed
+        if not is_sender_allowed(sender, allowed_senders):
+            logger.warning(f"Skipping email from unauthorized sender: {sender}")
+            # Still apply post-process action so we don't keep seeing it
+            processed.append(email_id)
+            continue
+        
+        logger.info(f"Processing email: '{subject}' from {sender}")
+        
+        if not urls:
+            logger.info("No valid URLs found in email, skipping")
+            no_urls.append(email_id)
+            continue
+        
+        logger.info(f"Found {len(urls)} URL(s): {urls}")
+        
+        # Process each URL
+        failed = False
+        for url in urls:
+            try:
+                # Check if URL already ingested (to save LLM costs)
+                if url_already_ingested(url, data_dir):
+                    logger.info(f"Skipping already ingested URL: {url}")
+                    continue
+                
+                if dry_run:
+                    logger.info(f"[DRY RUN] Would ingest: {url}")
+                elif ingest(url):
+                    ingested_count += 1
+            except Exception as e:
+                logger.error(f"Failed to ingest {url}: {e}")
+                failed = True
+
+        if failed:
+            logger.warning(f"Leaving email '{subject}' for the next run, not all of its URLs were ingested")
+            continue
+        processed.append(email_id)
+
+    # Post-process all handled emails in a few bulk commands
+    if not dry_run:
+        apply_action(mail, no_urls, "read")
+        apply_action(mail, processed, post_process_action)
+
+    return ingested_count
 
 
 def process_inbox(
@@ -294,7 +555,10 @@ def process_inbox(
     allowed_senders: Optional[list[str]] = None,
     unread_only: bool = True,
     post_process_action: str = "read",  # "read", "delete", "archive"
-    dry_run: bool = False
+    dry_run: bool = False,
+    port: Optional[int] = None,
+    use_ssl: bool = True,
+    enqueue: bool = False
 ) -> int:
     """
     Main function to process inbox and ingest URLs.
@@ -309,100 +573,36 @@ def process_inbox(
         unread_only: If True, only process UNSEEN emails.
         post_process_action: What to do after processing: 'read', 'delete', or 'archive'
         dry_run: If True, don't actually ingest
+        port: Optional IMAP port override
+        use_ssl: Connect over SSL (disable only for a local IMAP stand-in)
+        enqueue: Add URLs to the work queue for src.worker instead of ingesting
     
     Returns:
-        Number of URLs successfully ingested
+        Number of URLs successfully ingested (or queued)
     """
-    ingested_count = 0
-    skipped_senders = 0
     allowed_senders = allowed_senders or []
     
     if allowed_senders:
         logger.info(f"Sender allowlist active: {allowed_senders}")
     else:
         logger.info("No sender allowlist configured - processing all emails")
+
+    job_queue = JobQueue(data_dir) if enqueue else None
+
+    def ingest(url: str) -> bool:
+        if job_queue:
+            logger.info(f"Queueing: {url}")
+            return job_queue.enqueue(url, source="email")
+        logger.info(f"Ingesting: {url}")
+        if ingest_url(url, output_root=data_dir) is None:
+            raise ValueError("Jina returned no content")
+        return True
     
     try:
-        mail = connect_to_inbox(email_address, password, imap_server)
-        
-        # Determine search criteria
-        if unread_only:
-            emails = fetch_unread_emails(mail, folder)
-        else:
-            # Fetch ALL emails in folder from last 7 days
-            mail.select(folder)
-            since_date = (datetime.now() - timedelta(days=7)).strftime("%d-%b-%Y")
-            status, messages = mail.search(None, f'(SINCE {since_date})')
-            emails = []
-            if status == 'OK':
-                for email_id in messages[0].split():
-                    status, msg_data = mail.fetch(email_id, '(RFC822)')
-                    if status == 'OK':
-                        emails.append((email_id.decode(), email.message_from_bytes(msg_data[0][1])))
-        
-        for email_id, msg in emails:
-            subject = decode_email_subject(msg.get('Subject', ''))
-            sender = msg.get('From', 'Unknown')
-            
-            # Check if sender is allowed
-            if not is_sender_allowed(sender, allowed_senders):
-                logger.warning(f"Skipping email from unauthorized sender: {sender}")
-                skipped_senders += 1
-                # Still apply post-process action so we don't keep seeing it
-                if not dry_run:
-                    if post_process_action == "delete":
-                        delete_email(mail, email_id)
-                    elif post_process_action == "archive":
-                        move_email(mail, email_id, "Archive")
-                    else:
-                        mark_as_read(mail, email_id)
-                continue
-            
-            logger.info(f"Processing email: '{subject}' from {sender}")
-            
-            # Extract URLs from subject and body
-            body = get_email_body(msg)
-            all_text = f"{subject}\n{body}"
-            urls = extract_urls_from_text(all_text)
-            
-            if not urls:
-                logger.info("No valid URLs found in email, skipping")
-                if not dry_run:
-                    mark_as_read(mail, email_id)
-                continue
-            
-            logger.info(f"Found {len(urls)} URL(s): {urls}")
-            
-            # Process each URL
-            for url in urls:
-                try:
-                    # Check if URL already ingested (to save LLM costs)
-                    if url_already_ingested(url, data_dir):
-                        logger.info(f"Skipping already ingested URL: {url}")
-                        continue
-                    
-                    if dry_run:
-                        logger.info(f"[DRY RUN] Would ingest: {url}")
-                    else:
-                        logger.info(f"Ingesting: {url}")
-                        ingest_url(url, output_root=data_dir)
-                        ingested_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to ingest {url}: {e}")
-            
-            # Post-process email
-            if not dry_run:
-                if post_process_action == "delete":
-                    delete_email(mail, email_id)
-                    logger.info(f"Deleted email (moved to trash)")
-                elif post_process_action == "archive":
-                    # For Gmail, 'archive' is usually moving to '[Gmail]/All Mail' 
-                    # but simple solution is to move to an 'Airlock-Archive' folder
-                    move_email(mail, email_id, "Archive")
-                    logger.info(f"Archived email")
-                else:
-                    mark_as_read(mail, email_id)
-                    logger.info(f"Marked email as read")
+        mail = connect_to_inbox(email_address, password, imap_server, port, use_ssl)
+        ingested_count = process_messages(
+            mail, ingest, folder, data_dir, allowed_senders, unread_only, post_process_action, dry_run
+        )
         
         # Clean up deleted messages if any
         mail.expunge()
@@ -417,6 +617,180 @@ def process_inbox(
     return ingested_count
 
 
+def idle_wait(mail: imaplib.IMAP4, timeout: float = IDLE_TIMEOUT) -> bool:
+    """
+    Block in IMAP IDLE (RFC 2177) until the server reports new mail or
+    `timeout` seconds pass, then end the IDLE.
+
+    Uses imaplib's own IDLE support where it exists (Python 3.14+), and
+    `_idle_legacy` on older versions.
+
+    Returns:
+        True if new mail arrived, False on timeout.
+    """
+    if hasattr(mail, 'idle'):
+        with mail.idle(duration=timeout) as idler:
+            # Leaving the block early ends the IDLE with DONE
+            return any(response_type == 'EXISTS' for response_type, _ in idler)
+    return _idle_legacy(mail, timeout)
+
+
+def _idle_legacy(mail: imaplib.IMAP4, timeout: float) -> bool:
+    """
+    IDLE for imaplib before Python 3.14, which has no IDLE command.
+
+    imaplib offers no public way to send a tagged command and then wait on
+    its continuation, so this is the one place that borrows its internals:
+    `_new_tag()` for the command tag, then raw `send`/`readline`. Raises
+    IMAP4.error if the server does not answer with the `+ idling`
+    continuation, and IMAP4.abort if the connection drops.
+    """
+    tag = mail._new_tag().decode()
+    mail.send(f"{tag} IDLE\r\n".encode())
+    response = mail.readline()
+    if not response.startswith(b'+'):
+        raise imaplib.IMAP4.error(
+            f"Server did not start IDLE (expected a '+' continuation): "
+            f"{response.decode(errors='ignore').strip()}"
+        )
+
+    new_mail = False
+    deadline = time.monotonic() + timeout
+    while not new_mail:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # SSL sockets may hold decrypted bytes that select() cannot see
+        pending = getattr(mail.sock, 'pending', lambda: 0)()
+        if not pending and not select.select([mail.sock], [], [], min(remaining, 1.0))[0]:
+            continue
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("connection closed during IDLE")
+        new_mail = line.rstrip().upper().endswith(b'EXISTS')
+
+    mail.send(b"DONE\r\n")
+    while True:
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("connection closed ending IDLE")
+        if line.startswith(tag.encode()):
+            if b' OK' not in line:
+                raise imaplib.IMAP4.error(f"IDLE failed: {line.decode(errors='ignore').strip()}")
+            return new_mail
+
+
+def run_idle(
+    email_address: str,
+    password: str,
+    imap_server: Optional[str] = None,
+    folder: str = "INBOX",
+    data_dir: str = "data",
+    allowed_senders: Optional[list[str]] = None,
+    post_process_action: str = "read",
+    dry_run: bool = False,
+    port: Optional[int] = None,
+    use_ssl: bool = True,
+    ingest_workers: int = DEFAULT_INGEST_WORKERS,
+    idle_timeout: float = IDLE_TIMEOUT,
+    stop: Optional[threading.Event] = None,
+    enqueue: bool = False
+) -> None:
+    """
+    Run as a long-lived daemon that ingests shared links as they arrive.
+
+    Holds one authenticated connection and waits in IMAP IDLE for new mail
+    (polling with NOOP if the server lacks IDLE). Pending unread emails are
+    processed on every wake-up. Their URLs are added to the durable work
+    queue before the email is post-processed, so a link is never lost, and
+    a background thread ingests queued URLs (with `ingest_workers` fetches
+    and LLM calls at a time) while the connection keeps listening. Failed
+    URLs are retried with backoff as in src.worker. With `enqueue`, URLs are
+    only queued and left to a separate src.worker.
+    Dropped connections are re-established with exponential backoff. Runs
+    until interrupted or until `stop` is set.
+    """
+    stop = stop or threading.Event()
+    job_queue = JobQueue(data_dir)
+    queued = threading.Event()
+    finished = threading.Event()
+
+    def drain_queue() -> None:
+        while not finished.is_set():
+            jobs = job_queue.claim(DEFAULT_CLAIM_SIZE)
+            if not jobs:
+                queued.wait(DEFAULT_POLL_INTERVAL)
+                queued.clear()
+                continue
+            try:
+                process_jobs(job_queue, jobs, data_dir, fetch_workers=ingest_workers, llm_workers=ingest_workers)
+            except Exception as e:
+                logger.error(f"Failed to ingest {len(jobs)} queued URL(s): {e}")
+                for job in jobs:
+                    job_queue.fail(job['id'], str(e))
+            metrics.flush()
+
+    def ingest(url: str) -> bool:
+        logger.info(f"Queueing: {url}")
+        added = job_queue.enqueue(url, source="email")
+        queued.set()
+        return added
+
+    ingester = None
+    if not enqueue:
+        ingester = threading.Thread(target=drain_queue, name="ingest", daemon=True)
+        ingester.start()
+
+    try:
+        delay = RECONNECT_MIN_DELAY
+        while not stop.is_set():
+            mail = None
+            try:
+                mail = connect_to_inbox(email_address, password, imap_server, port, use_ssl)
+                supports_idle = 'IDLE' in mail.capabilities
+                if not supports_idle:
+                    logger.warning("Server does not support IDLE, polling instead")
+                logger.info(f"Watching {folder} for new mail")
+
+                while not stop.is_set():
+                    process_messages(
+                        mail, ingest, folder, data_dir, allowed_senders, True, post_process_action, dry_run
+                    )
+                    mail.expunge()
+                    metrics.flush()
+                    delay = RECONNECT_MIN_DELAY
+                    if supports_idle:
+                        idle_wait(mail, idle_timeout)
+                    else:
+                        stop.wait(idle_timeout)
+                        mail.noop()
+
+            except KeyboardInterrupt:
+                logger.info("Stopping IDLE daemon")
+                break
+            except (imaplib.IMAP4.error, OSError) as e:
+                # IMAP4.abort (dropped connection) is a subclass of IMAP4.error
+                logger.warning(f"IMAP connection failed: {e}; reconnecting in {delay:.0f}s")
+                stop.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+            except Exception as e:
+                # Keep the daemon alive; unprocessed emails are retried after reconnecting
+                logger.exception(f"Unexpected error: {e}; reconnecting in {delay:.0f}s")
+                stop.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+            finally:
+                if mail is not None:
+                    try:
+                        mail.logout()
+                    except Exception:
+                        pass
+    finally:
+        finished.set()
+        queued.set()
+        if ingester is not None:
+            ingester.join()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Poll email inbox for URLs to ingest into Content Airlock."
@@ -436,6 +810,17 @@ def main():
         default=os.getenv("AIRLOCK_IMAP_SERVER"),
         help="IMAP server (auto-detected if not specified)"
     )
+    parser.add_argument(
+        "--imap-port",
+        type=int,
+        default=int(os.getenv("AIRLOCK_IMAP_PORT", "0")) or None,
+        help="IMAP port (default: 993, or 143 with --no-ssl)"
+    )
+    parser.add_argument(
+        "--no-ssl",
+        action="store_true",
+        help="Connect without SSL (only for a local IMAP stand-in)"
+    )
     parser.add_argument(
         "--folder",
         default=os.getenv("AIRLOCK_EMAIL_FOLDER", "INBOX"),
@@ -463,6 +848,27 @@ def main():
         default=os.getenv("AIRLOCK_EMAIL_ACTION", "read"),
         help="Action after processing: read, delete, or archive (default: read)"
     )
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local fetch and LLM caches")
+    parser.add_argument("--llm-only", action="store_true", help="Categorize every article with the LLM, skipping the local classifier")
+    parser.add_argument("--allow-duplicates", action="store_true", help="Ingest near-duplicates of saved articles instead of skipping them")
+    parser.add_argument("--metrics-json", metavar="FILE", help="Write a JSON run report (stage timings, counters, tokens) to FILE")
+    parser.add_argument("--metrics-prom", metavar="FILE", help="Write run metrics to FILE in Prometheus text format")
+    parser.add_argument(
+        "--idle",
+        action="store_true",
+        help="Run as a daemon that waits for new mail with IMAP IDLE"
+    )
+    parser.add_argument(
+        "--ingest-workers",
+        type=int,
+        default=DEFAULT_INGEST_WORKERS,
+        help="Concurrent fetches and LLM calls when ingesting in --idle mode"
+    )
+    parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="Add URLs to the work queue for src.worker instead of ingesting now"
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -470,6 +876,14 @@ def main():
     )
     
     args = parser.parse_args()
+
+    if args.no_cache:
+        cache.set_enabled(False)
+    if args.llm_only:
+        classifier.set_enabled(False)
+    if args.allow_duplicates:
+        fingerprint.set_enabled(False)
+    metrics.export_on_exit(args.metrics_json, args.metrics_prom)
     
     if not args.email or not args.password:
         logger.error("Email and password are required!")
@@ -479,6 +893,23 @@ def main():
     
     # Parse allowed senders
     allowed_senders = parse_allowed_senders(args.allowed_senders)
+
+    if args.idle:
+        run_idle(
+            email_address=args.email,
+            password=args.password,
+            imap_server=args.imap_server,
+            folder=args.folder,
+            data_dir=args.data_dir,
+            allowed_senders=allowed_senders,
+            post_process_action=args.action,
+            dry_run=args.dry_run,
+            port=args.imap_port,
+            use_ssl=not args.no_ssl,
+            ingest_workers=args.ingest_workers,
+            enqueue=args.enqueue
+        )
+        return
     
     process_inbox(
         email_address=args.email,
@@ -489,7 +920,10 @@ def main():
         allowed_senders=allowed_senders,
         unread_only=args.unread_only,
         post_process_action=args.action,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        port=args.imap_port,
+        use_ssl=not args.no_ssl,
+        enqueue=args.enqueue
     )
 
 
@@ -2,17 +2,26 @@ import argparse
 import sys
 import logging
 import os
+import queue
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
 from dotenv import load_dotenv
 
 # Add project root to path so we can import src
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.utils.jina_client import fetch_markdown
-from src.utils.llm_client import categorize_article, VALID_CATEGORIES
+from src.utils.llm_client import categorize_article, categorize_articles, VALID_CATEGORIES
+from src.utils.article_index import get_index
+from src.utils.classifier import classify_locally
+from src.utils.fingerprint import signature, similarity, duplicate_threshold
+from src.utils.job_queue import JobQueue
+from src.utils.urls import normalize_url, resolve_redirects
+from src.utils import cache, classifier, fingerprint, metrics
 
 # Configure logging
 logging.basicConfig(
@@ -24,6 +33,11 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Default pool sizes for batch ingestion. Fetches are I/O bound on Jina,
+# LLM calls are bounded by the OpenAI rate limit, so they are sized separately.
+DEFAULT_FETCH_WORKERS = 8
+DEFAULT_LLM_WORKERS = 4
+
 def slugify(text: str) -> str:
     """
     Convert text to a filesystem-safe slug.
@@ -34,9 +48,21 @@ def slugify(text: str) -> str:
     text = re.sub(r'\s+', '-', text)          # Replace spaces with hyphens
     return text.strip('-')
 
-def save_article(url: str, content: str, metadata: dict, output_root: str = "data") -> str:
+def save_article(
+    url: str,
+    content: str,
+    metadata: dict,
+    output_root: str = "data",
+    canonical_url: Optional[str] = None,
+    sig: Optional[List[int]] = None
+) -> str:
     """
     Save article to disk with frontmatter.
+
+    `canonical_url` (default: the normalized `url`) is the key every dedup
+    check compares against. `sig` is the content's MinHash signature, if it
+    was computed for the near-duplicate check; it is stored in the index so
+    later near-duplicates of this article are caught.
     
     Returns:
         Path to the saved file
@@ -59,6 +85,7 @@ def save_article(url: str, content: str, metadata: dict, output_root: str = "dat
     file_content = f"""---
 title: "{title}"
 url: "{url}"
+canonical_url: "{canonical_url or normalize_url(url)}"
 date: {today}
 category: {category}
 summary: "{summary}"
@@ -69,51 +96,393 @@ summary: "{summary}"
 {content}
 """
     
-    # Write to file
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(file_content)
+    with metrics.timer("save"):
+        # Write to file
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(file_content)
+
+        # Keep the article index in sync so dedup checks and bundling never rescan the corpus
+        get_index(output_root).add_file(str(file_path), sig)
+    metrics.incr("articles.saved")
         
     return str(file_path)
 
-def ingest_url(url: str, output_root: str = "data", category_hint: Optional[str] = None) -> None:
+def find_duplicate(url: str, sig: Optional[List[int]], output_root: str = "data") -> Optional[dict]:
+    """
+    Return index metadata for a saved article that the fetched content (with
+    MinHash signature `sig`) near-duplicates, or None.
+    """
+    with metrics.timer("dedup_scan"):
+        duplicate = get_index(output_root).find_near_duplicate(sig)
+    if duplicate:
+        logger.info(f"Near-duplicate of {duplicate['url'] or duplicate['path']} "
+                    f"({duplicate['similarity']:.0%} similar), skipping: {url}")
+        metrics.incr("articles.duplicates")
+    return duplicate
+
+def find_ingested(url: str, canonical_url: str, output_root: str = "data") -> Optional[dict]:
+    """
+    Return index metadata for the article already saved under `canonical_url`
+    (e.g. found only once a feed-proxy link was resolved), or None.
+    """
+    with metrics.timer("dedup_scan"):
+        existing = get_index(output_root).find_url(canonical_url)
+    if existing:
+        logger.info(f"Already ingested as {existing['path']}, skipping: {url}")
+        metrics.incr("articles.already_ingested")
+    return existing
+
+def link_duplicate(url: str, duplicate: dict, output_root: str = "data") -> str:
+    """Record `url` as an alias of an already saved article and return that article's path."""
+    index = get_index(output_root)
+    index.add_alias(url, duplicate['path'])
+    return str(index.absolute_path(duplicate['path']))
+
+def ingest_url(url: str, output_root: str = "data", category_hint: Optional[str] = None) -> Optional[str]:
     """
     Main orchestration function to ingest a single URL.
+
+    Returns:
+        Path to the saved file (or to the article it near-duplicates), or
+        None if Jina returned no content
+
+    Raises:
+        Exception: whatever fetching, categorizing or saving raised, so
+        callers can retry or skip the URL instead of exiting.
     """
     logger.info(f"Starting ingestion for: {url}")
     
     try:
-        # 1. Fetch content
-        markdown_content = fetch_markdown(url)
+        # 1. Resolve feed-proxy/shortener links and check the canonical URL
+        fetch_url = resolve_redirects(url)
+        canonical_url = normalize_url(fetch_url)
+        existing = find_ingested(url, canonical_url, output_root)
+        if existing:
+            return link_duplicate(url, existing, output_root)
+
+        # 2. Fetch content
+        markdown_content = fetch_markdown(fetch_url)
         if not markdown_content:
             logger.error("Received empty content from Jina Reader")
-            return
+            return None
 
-        # 2. Analyze with LLM
-        metadata = categorize_article(markdown_content)
-        
-        # If we have a hint and the AI didn't find one (or we want to override), 
-        # we can use the hint here. For now, we'll just log it.
+        # 3. Skip mirrors and syndicated copies of articles we already have
+        sig = None
+        if fingerprint.is_enabled():
+            with metrics.timer("fingerprint"):
+                sig = signature(markdown_content)
+            duplicate = find_duplicate(url, sig, output_root)
+            if duplicate:
+                return link_duplicate(url, duplicate, output_root)
+
+        # 4. Analyze locally, falling back to the LLM when unsure
         if category_hint:
             logger.info(f"Source hinted category: {category_hint}")
+        metadata = classify_locally(markdown_content, output_root, category_hint)
+        if metadata is None:
+            metadata = categorize_article(markdown_content)
             
         logger.info(f"Categorized as: {metadata['category']}")
         
-        # 3. Save to disk
-        saved_path = save_article(url, markdown_content, metadata, output_root)
+        # 5. Save to disk
+        saved_path = save_article(fetch_url, markdown_content, metadata, output_root, canonical_url, sig)
         logger.info(f"Successfully saved article to: {saved_path}")
+        return saved_path
         
     except Exception as e:
         logger.error(f"Ingestion failed: {e}")
-        sys.exit(1)
+        raise
+
+def ingest_batch(
+    urls: Iterable[str],
+    output_root: str = "data",
+    category_hints: Optional[Dict[str, str]] = None,
+    fetch_workers: int = DEFAULT_FETCH_WORKERS,
+    llm_workers: int = DEFAULT_LLM_WORKERS,
+    llm_batch_size: int = 1,
+    errors: Optional[Dict[str, str]] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Ingest many URLs through a pipelined fetch -> categorize -> save flow.
+
+    Fetches and LLM calls run in separate bounded thread pools, so a slow Jina
+    fetch never blocks categorization of articles that are already fetched,
+    and vice versa. Categorized articles are streamed to the writer (the
+    calling thread) as soon as they are ready. A failure only affects its own
+    URL. With `llm_batch_size` > 1, fetched articles are grouped and each
+    group is categorized in a single LLM request. Articles the local
+    classifier is confident about skip the LLM entirely, and near-duplicates
+    of saved articles (or of another URL in the batch) are not categorized or
+    saved at all; their URL is linked to the existing article instead. URLs
+    are compared in canonical form (see `src.utils.urls`), so spellings of
+    one URL in the batch, or of one already ingested, are fetched at most once.
+
+    Args:
+        urls: URLs to ingest. Duplicates (by canonical URL) are ingested once.
+        output_root: Root data directory.
+        category_hints: Optional mapping of URL -> hinted category.
+        fetch_workers: Maximum concurrent Jina fetches.
+        llm_workers: Maximum concurrent LLM categorization calls.
+        llm_batch_size: Articles per LLM request (1 = one request per article).
+        errors: If given, filled with URL -> error message for failed URLs.
+
+    Returns:
+        Dict mapping each URL to its saved path (or the path of the article
+        it duplicates), or None if it failed.
+    """
+    urls = list(dict.fromkeys(urls))
+    category_hints = category_hints or {}
+    errors = errors if errors is not None else {}
+    results: Dict[str, Optional[str]] = {}
+    if not urls:
+        return results
+
+    logger.info(f"Starting batch ingestion of {len(urls)} URLs "
+                f"({fetch_workers} fetch workers, {llm_workers} LLM workers)")
+
+    # Finished items flow back to the writer as (url, markdown, metadata, error);
+    # near-duplicates arrive with no markdown and are looked up in these maps
+    done: "queue.Queue[tuple]" = queue.Queue()
+    duplicates: Dict[str, dict] = {}
+    batch_duplicates: Dict[str, str] = {}
+    # URL -> (URL to fetch after resolving redirects, canonical URL)
+    targets: Dict[str, tuple] = {}
+    # URL -> MinHash signature of its content, stored in the index on save
+    signatures: Dict[str, List[int]] = {}
+
+    with ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="fetch") as fetch_pool, \
+         ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="llm") as llm_pool:
+
+        # Fetched articles waiting to be grouped into a batched LLM request
+        pending: List[tuple] = []
+        pending_lock = threading.Lock()
+        fetches_left = [len(urls)]
+        # (signature, url) of every article in this batch that will be saved
+        batch_signatures: List[tuple] = []
+        threshold = duplicate_threshold()
+        # Canonical URL -> the URL in this batch that claimed it
+        batch_urls: Dict[str, str] = {}
+
+        def is_known(url: str) -> bool:
+            fetch_url = resolve_redirects(url)
+            canonical_url = normalize_url(fetch_url)
+            targets[url] = (fetch_url, canonical_url)
+            existing = find_ingested(url, canonical_url, output_root)
+            if existing:
+                duplicates[url] = existing
+                return True
+            with pending_lock:
+                if canonical_url in batch_urls:
+                    logger.info(f"Same canonical URL as {batch_urls[canonical_url]} in this batch, skipping: {url}")
+                    batch_duplicates[url] = batch_urls[canonical_url]
+                    return True
+                batch_urls[canonical_url] = url
+            return False
+
+        def is_duplicate(url: str, markdown_content: str) -> bool:
+            if not fingerprint.is_enabled():
+                return False
+            with metrics.timer("fingerprint"):
+                sig = signature(markdown_content)
+            duplicate = find_duplicate(url, sig, output_root)
+            if duplicate:
+                duplicates[url] = duplicate
+                return True
+            if sig is None:
+                return False
+            signatures[url] = sig
+            with pending_lock:
+                for other_sig, other_url in batch_signatures:
+                    if similarity(sig, other_sig) >= threshold:
+                        logger.info(f"Near-duplicate of {other_url} in this batch, skipping: {url}")
+                        metrics.incr("articles.duplicates")
+                        batch_duplicates[url] = other_url
+                        return True
+                batch_signatures.append((sig, url))
+            return False
+
+        def categorize(group: List[tuple]) -> None:
+            if len(group) == 1:
+                url, markdown_content = group[0]
+                try:
+                    done.put((url, markdown_content, categorize_article(markdown_content), None))
+                except Exception as e:
+                    done.put((url, None, None, e))
+                return
+
+            try:
+                all_metadata = categorize_articles([md for _, md in group], batch_size=len(group))
+            except Exception as e:
+                for url, _ in group:
+                    done.put((url, None, None, e))
+                return
+            for (url, markdown_content), metadata in zip(group, all_metadata):
+                done.put((url, markdown_content, metadata, None))
+
+        def fetched(url: str, markdown_content: Optional[str]) -> None:
+            with pending_lock:
+                if markdown_content:
+                    pending.append((url, markdown_content))
+                fetches_left[0] -= 1
+                # Flush a full group, or whatever is left once fetching is done
+                if pending and (len(pending) >= llm_batch_size or fetches_left[0] == 0):
+                    group = pending[:]
+                    pending.clear()
+                else:
+                    group = None
+            if group:
+                llm_pool.submit(categorize, group)
+
+        def fetch(url: str) -> None:
+            try:
+                if is_known(url):
+                    done.put((url, None, None, None))
+                    fetched(url, None)
+                    return
+                markdown_content = fetch_markdown(targets[url][0])
+                if not markdown_content:
+                    raise ValueError("Received empty content from Jina Reader")
+                if is_duplicate(url, markdown_content):
+                    done.put((url, None, None, None))
+                    fetched(url, None)
+                    return
+                metadata = classify_locally(markdown_content, output_root, category_hints.get(url))
+            except Exception as e:
+                done.put((url, None, None, e))
+                markdown_content = None
+                metadata = None
+
+            if metadata is not None:
+                # Confidently classified locally: straight to the writer
+                done.put((url, markdown_content, metadata, None))
+                markdown_content = None
+            fetched(url, markdown_content)
+
+        for url in urls:
+            fetch_pool.submit(fetch, url)
+
+        # Writer: save results in completion order
+        for _ in range(len(urls)):
+            url, markdown_content, metadata, error = done.get()
+            if error is not None:
+                logger.error(f"Ingestion failed for {url}: {error}")
+                metrics.incr("articles.failed")
+                results[url] = None
+                errors[url] = str(error)
+                continue
+
+            if markdown_content is None:
+                # Duplicates within this batch are linked once the original is saved
+                if url in duplicates:
+                    try:
+                        results[url] = link_duplicate(url, duplicates[url], output_root)
+                    except Exception as e:
+                        logger.error(f"Failed to link duplicate {url}: {e}")
+                        metrics.incr("articles.failed")
+                        results[url] = None
+                        errors[url] = str(e)
+                continue
+
+            if category_hints.get(url):
+                logger.info(f"Source hinted category for {url}: {category_hints[url]}")
+
+            try:
+                fetch_url, canonical_url = targets[url]
+                saved_path = save_article(
+                    fetch_url, markdown_content, metadata, output_root, canonical_url, signatures.get(url)
+                )
+                logger.info(f"Saved [{metadata['category']}] {url} -> {saved_path}")
+                results[url] = saved_path
+            except Exception as e:
+                logger.error(f"Failed to save {url}: {e}")
+                metrics.incr("articles.failed")
+                results[url] = None
+                errors[url] = str(e)
+
+    for url, original_url in batch_duplicates.items():
+        if results.get(original_url):
+            try:
+                get_index(output_root).add_alias(url, results[original_url])
+                results[url] = results[original_url]
+            except Exception as e:
+                logger.error(f"Failed to link duplicate {url}: {e}")
+                metrics.incr("articles.failed")
+                results[url] = None
+                errors[url] = str(e)
+        else:
+            results[url] = None
+            errors[url] = f"Duplicate of {original_url}, which failed"
+
+    succeeded = sum(1 for path in results.values() if path)
+    logger.info(f"Batch ingestion complete: {succeeded}/{len(urls)} succeeded")
+    return results
+
+def read_url_list(path: str) -> List[str]:
+    """Read one URL per line, ignoring blank lines and # comments."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [
+            line.strip() for line in f
+            if line.strip() and not line.strip().startswith('#')
+        ]
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest a technical article from a URL.")
-    parser.add_argument("url", help="URL of the article to ingest")
+    parser.add_argument("url", nargs="?", help="URL of the article to ingest")
     parser.add_argument("--data-dir", default="data", help="Root directory for storing data")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local fetch and LLM caches")
+    parser.add_argument("--llm-only", action="store_true", help="Categorize every article with the LLM, skipping the local classifier")
+    parser.add_argument("--allow-duplicates", action="store_true", help="Ingest near-duplicates of saved articles instead of skipping them")
+    parser.add_argument("--metrics-json", metavar="FILE", help="Write a JSON run report (stage timings, counters, tokens) to FILE")
+    parser.add_argument("--metrics-prom", metavar="FILE", help="Write run metrics to FILE in Prometheus text format")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the URL index from article frontmatter and fingerprint every article")
+    parser.add_argument("--batch", metavar="FILE", help="Ingest every URL listed in FILE (one per line)")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS, help="Concurrent Jina fetches in batch mode")
+    parser.add_argument("--llm-workers", type=int, default=DEFAULT_LLM_WORKERS, help="Concurrent LLM calls in batch mode")
+    parser.add_argument("--llm-batch-size", type=int, default=1, help="Articles per LLM request in batch mode")
+    parser.add_argument("--enqueue", action="store_true", help="Add the URL(s) to the work queue for src.worker instead of ingesting now")
     
     args = parser.parse_args()
+
+    if args.no_cache:
+        cache.set_enabled(False)
+    if args.llm_only:
+        classifier.set_enabled(False)
+    if args.allow_duplicates:
+        fingerprint.set_enabled(False)
+    metrics.export_on_exit(args.metrics_json, args.metrics_prom)
     
-    ingest_url(args.url, output_root=args.data_dir)
+    if args.reindex:
+        count = get_index(args.data_dir, sync=False).rebuild()
+        logger.info(f"Indexed {count} articles in {args.data_dir}")
+        return
+
+    if args.enqueue:
+        urls = read_url_list(args.batch) if args.batch else [args.url] if args.url else []
+        if not urls:
+            parser.error("url or --batch is required with --enqueue")
+        added = JobQueue(args.data_dir).enqueue_many(dict.fromkeys(urls), source="cli")
+        logger.info(f"Queued {added} URL(s) ({len(urls) - added} already queued)")
+        return
+
+    if args.batch:
+        results = ingest_batch(
+            read_url_list(args.batch),
+            output_root=args.data_dir,
+            fetch_workers=args.fetch_workers,
+            llm_workers=args.llm_workers,
+            llm_batch_size=args.llm_batch_size
+        )
+        if not all(results.values()):
+            sys.exit(1)
+        return
+
+    if not args.url:
+        parser.error("url is required unless --reindex or --batch is given")
+
+    try:
+        ingest_url(args.url, output_root=args.data_dir)
+    except Exception:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
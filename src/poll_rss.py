@@ -4,17 +4,24 @@ import logging
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Set, Optional
+from typing import Iterator, List, Set, Optional, Tuple
 import feedparser
+import requests
 import yaml
 from dateutil import parser as date_parser
 
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from src.ingest import ingest_url
+from src.ingest import ingest_batch, DEFAULT_FETCH_WORKERS, DEFAULT_LLM_WORKERS
+from src.utils.article_index import get_index
+from src.utils import cache, classifier, fingerprint, metrics
+from src.utils.feed_state import FeedStateStore
+from src.utils.job_queue import JobQueue
+from src.utils.urls import canonicalize
 
 # Configure logging
 logging.basicConfig(
@@ -23,6 +30,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Defaults for the concurrent feed fetch stage
+DEFAULT_FEED_WORKERS = 8
+DEFAULT_FEED_TIMEOUT = 30
+
 def load_sources(sources_path: str = "sources.json") -> List[dict]:
     with open(sources_path, 'r') as f:
         data = json.load(f)
@@ -30,33 +41,17 @@ def load_sources(sources_path: str = "sources.json") -> List[dict]:
 
 def get_ingested_urls(data_dir: str = "data") -> Set[str]:
     """
-    Scan all markdown files in data_dir to find already ingested URLs.
-    Returns a set of normalized URLs.
+    Return the canonical URLs of already ingested articles from the
+    persistent URL index (compare against `canonicalize`d links).
+
+    The index is synced with the files on disk first, so only articles it has
+    not seen yet have their frontmatter read.
     """
-    ingested = set()
-    root = Path(data_dir)
-    
-    if not root.exists():
-        return ingested
-        
-    for md_file in root.rglob("*.md"):
-        try:
-            # Quick and dirty frontmatter parse
-            # We only read the first few lines to find 'url: "..."'
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read(1000) # Read first 1kb only
-                
-            # Parse yaml frontmatter if possible, or regex
-            # Let's use basic regex for speed and robustness against malformed yaml
-            match = re.search(r'^url:\s*["\']?([^"\']+)["\']?', content, re.MULTILINE)
-            if match:
-                ingested.add(match.group(1).strip())
-        except Exception as e:
-            logger.warning(f"Error reading {md_file}: {e}")
-            
-    return ingested
+    if not Path(data_dir).exists():
+        return set()
 
-import re
+    with metrics.timer("dedup_scan"):
+        return get_index(data_dir).urls()
 
 def is_recent(entry, hours: int) -> bool:
     """Check if feed entry was published within the last N hours."""
@@ -76,57 +71,238 @@ def is_recent(entry, hours: int) -> bool:
     cutoff = now - timedelta(hours=hours)
     return published_time > cutoff
 
-def poll_feeds(sources_path: str, data_dir: str, hours: int):
+def fetch_feed(
+    url: str,
+    timeout: int = DEFAULT_FEED_TIMEOUT,
+    etag: Optional[str] = None,
+    modified: Optional[str] = None
+) -> feedparser.FeedParserDict:
+    """
+    Download and parse a single feed, conditionally if validators are given.
+
+    The body is fetched with requests so the timeout is enforced per feed;
+    feedparser's own URL handling has no timeout. `etag` and `modified` behave
+    like feedparser's arguments of the same name: they are sent as
+    If-None-Match / If-Modified-Since, and a 304 response comes back with
+    `status == 304` and no entries, without parsing anything.
+    """
+    headers = {"User-Agent": "ContentAirlock/1.0"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+
+    response = requests.get(url, timeout=timeout, headers=headers)
+    if response.status_code == 304:
+        return feedparser.FeedParserDict(status=304, entries=[], etag=etag, modified=modified)
+
+    response.raise_for_status()
+    feed = feedparser.parse(response.content, response_headers=dict(response.headers))
+    feed['status'] = response.status_code
+    feed['etag'] = response.headers.get('ETag')
+    feed['modified'] = response.headers.get('Last-Modified')
+    return feed
+
+def entry_id(entry) -> Optional[str]:
+    """Stable identifier for a feed entry (its guid, falling back to the link)."""
+    return entry.get('id') or entry.get('link')
+
+def fetch_feeds(
+    feeds: List[dict],
+    max_workers: int = DEFAULT_FEED_WORKERS,
+    timeout: int = DEFAULT_FEED_TIMEOUT,
+    state_store: Optional[FeedStateStore] = None
+) -> Iterator[Tuple[dict, Optional[feedparser.FeedParserDict]]]:
+    """
+    Fetch feeds concurrently and yield (feed_cfg, parsed_feed) as each finishes.
+
+    A feed that fails or times out is logged and yielded with None, so one bad
+    feed never holds up or aborts the others. With a state store, each request
+    carries the feed's stored ETag / Last-Modified.
+    """
+    if not feeds:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(feeds)))) as executor:
+        futures = {}
+        for feed_cfg in feeds:
+            state = state_store.get(feed_cfg['url']) if state_store else {}
+            future = executor.submit(
+                fetch_feed, feed_cfg['url'], timeout, state.get('etag'), state.get('modified')
+            )
+            futures[future] = feed_cfg
+
+        for future in as_completed(futures):
+            feed_cfg = futures[future]
+            try:
+                yield feed_cfg, future.result()
+            except Exception as e:
+                logger.error(f"Error fetching feed {feed_cfg['name']}: {e}")
+                yield feed_cfg, None
+
+def poll_feeds(
+    sources_path: str,
+    data_dir: str,
+    hours: int,
+    max_workers: int = DEFAULT_FEED_WORKERS,
+    timeout: int = DEFAULT_FEED_TIMEOUT,
+    conditional: bool = True,
+    fetch_workers: int = DEFAULT_FETCH_WORKERS,
+    llm_workers: int = DEFAULT_LLM_WORKERS,
+    llm_batch_size: int = 1,
+    enqueue: bool = False
+):
     feeds = load_sources(sources_path)
     existing_urls = get_ingested_urls(data_dir)
+    state_store = FeedStateStore(data_dir) if conditional else None
     
     logger.info(f"Found {len(existing_urls)} already ingested articles.")
+    logger.info(f"Fetching {len(feeds)} feeds with {max_workers} workers...")
     
-    new_articles_count = 0
+    unchanged_feeds = 0
+    # Per changed feed: (feed_cfg, parsed feed, handled entry ids, pending {link: entry id}, complete)
+    polled = []
+    to_ingest = {}
     
-    for feed_cfg in feeds:
-        url = feed_cfg['url']
+    for feed_cfg, feed in fetch_feeds(feeds, max_workers, timeout, state_store):
+        if feed is None:
+            continue
+
         name = feed_cfg['name']
+        url = feed_cfg['url']
+
+        if feed.get('status') == 304:
+            logger.info(f"Feed unchanged since last poll: {name}")
+            unchanged_feeds += 1
+            if state_store:
+                state_store.update(url, 304)
+            continue
+
         logger.info(f"Checking feed: {name} ({url})")
+        seen_ids = state_store.get(url)['entry_ids'] if state_store else set()
+        handled_ids = set()
+        pending = {}
+        complete = True
         
         try:
-            feed = feedparser.parse(url)
-            
             for entry in feed.entries:
+                eid = entry_id(entry)
+                if eid in seen_ids:
+                    handled_ids.add(eid)
+                    continue
+
                 link = entry.link.strip()
                 
                 # Check 1: Is it recent?
                 if not is_recent(entry, hours):
+                    handled_ids.add(eid)
                     continue
                     
-                # Check 2: already ingested?
-                if link in existing_urls:
+                # Check 2: already ingested (under any spelling of the URL)?
+                if canonicalize(link) in existing_urls:
+                    handled_ids.add(eid)
                     continue
                     
-                # Ingest
                 logger.info(f"Found new article: {entry.title}")
-                try:
-                    category_hint = feed_cfg.get('default_category')
-                    ingest_url(link, output_root=data_dir, category_hint=category_hint)
-                    existing_urls.add(link)
-                    new_articles_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to ingest {link}: {e}")
+                pending[link] = eid
+                to_ingest.setdefault(link, feed_cfg.get('default_category'))
                     
         except Exception as e:
             logger.error(f"Error parsing feed {name}: {e}")
+            complete = False
+
+        polled.append((feed_cfg, feed, handled_ids, pending, complete))
+
+    if enqueue:
+        # Queued entries are durable, so they count as handled for feed state
+        added = JobQueue(data_dir).enqueue_many(to_ingest, source="rss")
+        results = {link: "queued" for link in to_ingest}
+        logger.info(f"Queued {added} new articles for src.worker "
+                    f"({unchanged_feeds} feeds unchanged).")
+    else:
+        # Ingest everything found across all feeds in one pipelined batch
+        results = ingest_batch(
+            to_ingest,
+            output_root=data_dir,
+            category_hints=to_ingest,
+            fetch_workers=fetch_workers,
+            llm_workers=llm_workers,
+            llm_batch_size=llm_batch_size
+        )
+    new_articles_count = sum(1 for path in results.values() if path)
+
+    # Only remember entries we are done with, and drop the validators if
+    # anything failed, so the next poll downloads the feed and retries it
+    if state_store:
+        for feed_cfg, feed, handled_ids, pending, complete in polled:
+            for link, eid in pending.items():
+                if results.get(link):
+                    handled_ids.add(eid)
+                else:
+                    complete = False
+            handled_ids.discard(None)
+            etag, modified = (feed.get('etag'), feed.get('modified')) if complete else (None, None)
+            state_store.update(feed_cfg['url'], feed.get('status', 200), etag, modified, handled_ids)
 
-    logger.info(f"Polling complete. Ingested {new_articles_count} new articles.")
+    if not enqueue:
+        logger.info(f"Polling complete. Ingested {new_articles_count} new articles "
+                    f"({unchanged_feeds} feeds unchanged).")
+
+def show_feed_state(data_dir: str) -> None:
+    """Print the stored per-feed caching state as JSON."""
+    print(json.dumps(FeedStateStore(data_dir).all(), indent=2))
 
 def main():
     parser = argparse.ArgumentParser(description="Poll RSS feeds for new content.")
     parser.add_argument("--sources", default="sources.json", help="Path to sources.json")
     parser.add_argument("--data-dir", default="data", help="Root directory for data")
     parser.add_argument("--hours", type=int, default=24, help="Lookback window in hours")
+    parser.add_argument("--workers", type=int, default=DEFAULT_FEED_WORKERS, help="Number of feeds to fetch concurrently")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_FEED_TIMEOUT, help="Per-feed fetch timeout in seconds")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS, help="Concurrent article fetches")
+    parser.add_argument("--llm-workers", type=int, default=DEFAULT_LLM_WORKERS, help="Concurrent LLM categorization calls")
+    parser.add_argument("--llm-batch-size", type=int, default=1, help="Articles per LLM categorization request")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local fetch and LLM caches")
+    parser.add_argument("--llm-only", action="store_true", help="Categorize every article with the LLM, skipping the local classifier")
+    parser.add_argument("--allow-duplicates", action="store_true", help="Ingest near-duplicates of saved articles instead of skipping them")
+    parser.add_argument("--metrics-json", metavar="FILE", help="Write a JSON run report (stage timings, counters, tokens) to FILE")
+    parser.add_argument("--metrics-prom", metavar="FILE", help="Write run metrics to FILE in Prometheus text format")
+    parser.add_argument("--enqueue", action="store_true", help="Add new articles to the work queue for src.worker instead of ingesting now")
+    parser.add_argument("--no-conditional", action="store_true", help="Ignore stored ETag/Last-Modified and download every feed")
+    parser.add_argument("--show-state", action="store_true", help="Print stored per-feed caching state and exit")
+    parser.add_argument("--reset-state", action="store_true", help="Clear stored per-feed caching state and exit")
     
     args = parser.parse_args()
+
+    if args.no_cache:
+        cache.set_enabled(False)
+    if args.llm_only:
+        classifier.set_enabled(False)
+    if args.allow_duplicates:
+        fingerprint.set_enabled(False)
+    metrics.export_on_exit(args.metrics_json, args.metrics_prom)
     
-    poll_feeds(args.sources, args.data_dir, args.hours)
+    if args.show_state:
+        show_feed_state(args.data_dir)
+        return
+
+    if args.reset_state:
+        FeedStateStore(args.data_dir).clear()
+        logger.info("Cleared feed state")
+        return
+
+    poll_feeds(
+        args.sources,
+        args.data_dir,
+        args.hours,
+        max_workers=args.workers,
+        timeout=args.timeout,
+        conditional=not args.no_conditional,
+        fetch_workers=args.fetch_workers,
+        llm_workers=args.llm_workers,
+        llm_batch_size=args.llm_batch_size,
+        enqueue=args.enqueue
+    )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,119 @@
+"""
+Train and evaluate the local category pre-classifier.
+
+The corpus in `data/<category>/` was categorized by the LLM, so those labels
+are the reference: `--evaluate` holds out a deterministic slice of the
+corpus, trains on the rest and reports how often the local model agrees with
+the LLM, both overall and for the articles it is confident enough to
+classify on its own. Without `--evaluate-only` the model is then retrained
+on the whole corpus and saved for ingestion to use.
+"""
+
+import argparse
+import hashlib
+import logging
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+from dotenv import load_dotenv
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.classifier import (
+    CentroidClassifier, DEFAULT_MIN_MARGIN, MIN_SIMILARITY, get_min_margin, model_path, train, training_documents
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+
+def split_documents(
+    documents: List[Tuple[str, str, str]],
+    test_fraction: float
+) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
+    """Split into (train, test) by a hash of each path, so runs are repeatable."""
+    train_set, test_set = [], []
+    for document in documents:
+        bucket = int(hashlib.sha256(document[0].encode('utf-8')).hexdigest()[:8], 16) / 0xFFFFFFFF
+        (test_set if bucket < test_fraction else train_set).append(document)
+    return train_set, test_set
+
+
+def evaluate(data_dir: str, test_fraction: float = 0.2, min_margin: float = DEFAULT_MIN_MARGIN) -> Dict:
+    """
+    Train on part of the corpus and measure agreement with the LLM labels
+    on the held-out rest.
+
+    Returns:
+        Report with overall accuracy, coverage (share of articles the model
+        would classify without the LLM) and accuracy on that covered share.
+    """
+    train_set, test_set = split_documents(training_documents(data_dir), test_fraction)
+    if not train_set or not test_set:
+        raise ValueError("Not enough categorized articles to evaluate; ingest more first")
+
+    model = CentroidClassifier.fit((text, category) for _, text, category in train_set)
+
+    correct = covered = covered_correct = 0
+    per_category: Dict[str, Counter] = {}
+    for _, text, label in test_set:
+        predicted, similarity, margin = model.predict(text)
+        hit = predicted == label
+        confident = similarity >= MIN_SIMILARITY and margin >= min_margin
+        correct += hit
+        covered += confident
+        covered_correct += hit and confident
+        per_category.setdefault(label, Counter()).update(total=1, correct=int(hit))
+
+    return {
+        "train": len(train_set),
+        "test": len(test_set),
+        "accuracy": correct / len(test_set),
+        "coverage": covered / len(test_set),
+        "covered_accuracy": covered_correct / covered if covered else 0.0,
+        "per_category": per_category,
+    }
+
+
+def log_report(report: Dict, min_margin: float) -> None:
+    logger.info(f"Evaluated on {report['test']} held-out articles (trained on {report['train']}):")
+    logger.info(f"  Agreement with LLM labels: {report['accuracy']:.1%}")
+    logger.info(f"  Classified locally at margin >= {min_margin}: {report['coverage']:.1%} "
+                f"of articles, {report['covered_accuracy']:.1%} correct")
+    logger.info(f"  {'Category':<22} {'Articles':>8} {'Correct':>8}")
+    for category, counts in sorted(report['per_category'].items()):
+        logger.info(f"  {category:<22} {counts['total']:>8} {counts['correct'] / counts['total']:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local category classifier on the corpus.")
+    parser.add_argument("--data-dir", default="data", help="Root data directory")
+    parser.add_argument("--evaluate", action="store_true", help="Report accuracy on a held-out split before training")
+    parser.add_argument("--evaluate-only", action="store_true", help="Report accuracy without saving a model")
+    parser.add_argument("--test-fraction", type=float, default=0.2, help="Share of the corpus held out for evaluation")
+    parser.add_argument("--min-margin", type=float, default=get_min_margin(), help="Confidence margin to report coverage at")
+
+    args = parser.parse_args()
+
+    try:
+        if args.evaluate or args.evaluate_only:
+            log_report(evaluate(args.data_dir, args.test_fraction, args.min_margin), args.min_margin)
+        if not args.evaluate_only:
+            train(args.data_dir)
+            logger.info(f"Saved model to {model_path(args.data_dir)}")
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
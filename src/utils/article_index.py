@@ -0,0 +1,497 @@
+"""
+Persistent index of ingested articles.
+
+The index is a SQLite database stored inside the data directory
+(`<data_dir>/.airlock/index.db`). It mirrors the frontmatter of every saved
+article (title, url, canonical url, date, summary) plus the byte offset, size and word
+count of the body, so that dedup checks are a single indexed lookup and bundling can
+select articles by date and read bodies straight from disk, instead of
+scanning and parsing the whole corpus. Each body's MinHash signature is
+stored as well, with its LSH band hashes in an indexed table, for
+near-duplicate lookups. Signatures are the ones computed while ingesting;
+`sync()` only reads frontmatter, so articles it picks up are fingerprinted
+(and found by near-duplicate lookups) once the index is rebuilt.
+
+The index is derived data: `save_article` keeps it up to date on write, files
+added or removed by other means (e.g. a `git pull` of the storage repo) are
+picked up by `sync()`, and it can always be rebuilt from the frontmatter with
+`python -m src.ingest --reindex`. The one exception is the alias table,
+which links URLs found to be near-duplicates to the article already saved;
+losing it only means such a URL is fetched once more and matched again.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.utils import metrics
+from src.utils.fingerprint import (
+    band_hashes, duplicate_threshold, pack, signature, similarity, unpack
+)
+from src.utils.urls import normalize_url
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STATE_DIRNAME = ".airlock"
+INDEX_FILENAME = "index.db"
+
+# Bump whenever the table layout changes; a mismatch triggers a rebuild.
+SCHEMA_VERSION = 6
+
+# Frontmatter is small; never read more than this looking for it.
+FRONTMATTER_MAX_BYTES = 4096
+
+# Bodies are read in chunks of this size when counting words
+READ_CHUNK_SIZE = 64 * 1024
+
+# Only the head of a body is read to fingerprint it
+FINGERPRINT_MAX_BYTES = 256 * 1024
+
+
+def state_dir(data_dir: str = "data") -> Path:
+    """Return (and create) the directory holding local state for a data dir."""
+    path = Path(data_dir) / STATE_DIRNAME
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def parse_article_head(md_file: Path) -> Tuple[Dict[str, str], int]:
+    """
+    Parse the simple `key: value` frontmatter written by `save_article`.
+
+    Only the head of the file is read, never the article body. Returns the
+    frontmatter values and the byte offset at which the body starts (after
+    the closing `---` and any blank lines), or 0 if there is no frontmatter.
+    """
+    values = {}
+    with open(md_file, 'rb') as f:
+        head = f.read(FRONTMATTER_MAX_BYTES)
+
+    if not head.startswith(b'---'):
+        return values, 0
+
+    offset = head.find(b'\n') + 1
+    while offset:
+        end = head.find(b'\n', offset)
+        if end == -1:
+            # Frontmatter longer than we are willing to read
+            return values, 0
+
+        line = head[offset:end].decode('utf-8', errors='replace').strip()
+        offset = end + 1
+        if line == '---':
+            break
+
+        key, sep, value = line.partition(':')
+        if sep:
+            values[key.strip()] = value.strip().strip('"\'').strip()
+
+    # Skip blank lines between the frontmatter and the body
+    while offset < len(head) and head[offset:offset + 1] in (b'\n', b'\r', b' ', b'\t'):
+        offset += 1
+
+    return values, offset
+
+
+def read_frontmatter(md_file: Path) -> Dict[str, str]:
+    """Return just the frontmatter values of an article."""
+    return parse_article_head(md_file)[0]
+
+
+def scan_body(md_file: Path, body_offset: int) -> Tuple[int, str]:
+    """
+    Read an article body in chunks and return its whitespace-separated word
+    count and a hash of its bytes (to tell an edited body from a touched file).
+    """
+    words = 0
+    in_word = False
+    digest = hashlib.blake2b(digest_size=16)
+    with open(md_file, 'rb') as f:
+        f.seek(body_offset)
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            words += len(chunk.split())
+            # A word split across the chunk boundary was counted twice
+            if in_word and not chunk[:1].isspace():
+                words -= 1
+            in_word = not chunk[-1:].isspace()
+    return words, digest.hexdigest()
+
+
+def fingerprint_body(md_file: Path, body_offset: int) -> Optional[List[int]]:
+    """Return the MinHash signature of an article body, or None if it is too short."""
+    with open(md_file, 'rb') as f:
+        f.seek(body_offset)
+        body = f.read(FINGERPRINT_MAX_BYTES).decode('utf-8', errors='ignore')
+    # Skip the `# title` heading added by save_article; it is not part of the fetched content
+    if body.startswith('# '):
+        body = body.partition('\n')[2]
+    return signature(body)
+
+
+def date_from_filename(name: str) -> Optional[str]:
+    """Return the ISO date prefix of a `YYYY-MM-DD_slug.md` filename, if valid."""
+    try:
+        return datetime.strptime(name[:10], "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        return None
+
+
+# Columns returned by metadata queries, in order
+ARTICLE_COLUMNS = (
+    "path", "url", "title", "date", "category", "summary", "body_offset", "body_bytes", "body_words"
+)
+
+
+class ArticleIndex:
+    """SQLite-backed index of article metadata for one data directory."""
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = Path(data_dir)
+        self.db_path = state_dir(data_dir) / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._ensure_schema()
+
+    def _ensure_schema(self) -> None:
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            if version:
+                logger.info(f"Article index schema changed ({version} -> {SCHEMA_VERSION}), rebuilding")
+            self._conn.execute("DROP TABLE IF EXISTS articles")
+            self._conn.execute("DROP TABLE IF EXISTS signature_bands")
+
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                path TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                canonical_url TEXT NOT NULL,
+                title TEXT,
+                date TEXT,
+                category TEXT,
+                summary TEXT,
+                body_offset INTEGER NOT NULL DEFAULT 0,
+                body_bytes INTEGER NOT NULL DEFAULT 0,
+                body_words INTEGER NOT NULL DEFAULT 0,
+                mtime REAL NOT NULL DEFAULT 0,
+                body_hash TEXT,
+                signature BLOB
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_canonical_url ON articles (canonical_url)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_category_date ON articles (category, date)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signature_bands (band INTEGER NOT NULL, hash INTEGER NOT NULL, path TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_signature_bands ON signature_bands (band, hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_signature_bands_path ON signature_bands (path)")
+        # Canonical URLs of near-duplicates, pointing at the article that was kept
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS aliases (url TEXT PRIMARY KEY, path TEXT NOT NULL)"
+        )
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+
+    def _relative(self, path: Path) -> str:
+        path = Path(path)
+        try:
+            return path.relative_to(self.data_dir).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def _iter_article_files(self):
+        for md_file in self.data_dir.rglob("*.md"):
+            if STATE_DIRNAME in md_file.parts:
+                continue
+            yield md_file
+
+    def _index_file(
+        self, md_file: Path, sig: Optional[List[int]] = None, compute_signature: bool = False
+    ) -> bool:
+        md_file = Path(md_file)
+        rel_path = self._relative(md_file)
+        try:
+            values, body_offset = parse_article_head(md_file)
+            body_words, body_hash = scan_body(md_file, body_offset)
+            if sig is None and not compute_signature:
+                # A touched or checked-out file keeps its signature while the body
+                # is unchanged; an edited body that had one is fingerprinted again
+                row = self._conn.execute(
+                    "SELECT body_hash, signature FROM articles WHERE path = ?", (rel_path,)
+                ).fetchone()
+                if row and row[1] is not None:
+                    if row[0] == body_hash:
+                        sig = unpack(row[1])
+                    else:
+                        compute_signature = True
+            if compute_signature:
+                sig = fingerprint_body(md_file, body_offset)
+            stat = md_file.stat()
+        except Exception as e:
+            logger.warning(f"Error reading {md_file}: {e}")
+            return False
+
+        # Articles without a URL are still indexed so they can be bundled
+        url = values.get("url", "")
+        # Articles saved before canonical URLs were recorded get one derived here
+        canonical_url = values.get("canonical_url") or (normalize_url(url) if url else "")
+        # Bundles are grouped by directory and dated by filename, so index
+        # those rather than the frontmatter copies
+        category = rel_path.split("/")[0] if "/" in rel_path else values.get("category")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                rel_path,
+                url,
+                canonical_url,
+                values.get("title"),
+                date_from_filename(md_file.name),
+                category,
+                values.get("summary"),
+                body_offset,
+                max(stat.st_size - body_offset, 0),
+                body_words,
+                stat.st_mtime,
+                body_hash,
+                pack(sig) if sig else None,
+            )
+        )
+        self._conn.execute("DELETE FROM signature_bands WHERE path = ?", (rel_path,))
+        if sig:
+            self._conn.executemany(
+                "INSERT INTO signature_bands VALUES (?, ?, ?)",
+                [(band, value, rel_path) for band, value in enumerate(band_hashes(sig))]
+            )
+        return True
+
+    def add_file(self, path: str, sig: Optional[List[int]] = None) -> bool:
+        """
+        Index (or re-index) a single article file, e.g. right after saving it.
+
+        `sig` is the MinHash signature of the body, as computed for the
+        near-duplicate check before saving; the file is not fingerprinted
+        again here.
+        """
+        with self._lock:
+            indexed = self._index_file(Path(path), sig)
+            self._conn.commit()
+        return indexed
+
+    def contains(self, url: str) -> bool:
+        """
+        Return True if an article (or a near-duplicate alias) with this URL is
+        indexed. URLs are compared in canonical form (see `src.utils.urls`);
+        pass a `canonicalize`d URL for redirector links to be matched too.
+        """
+        if not url:
+            return False
+        canonical_url = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM articles WHERE canonical_url = ? UNION ALL SELECT 1 FROM aliases WHERE url = ? LIMIT 1",
+                (canonical_url, canonical_url)
+            ).fetchone()
+        return row is not None
+
+    def find_url(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return metadata for the article saved under this URL (or an alias of it), or None."""
+        if not url:
+            return None
+        canonical_url = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                f"""
+                SELECT {", ".join(ARTICLE_COLUMNS)} FROM articles WHERE canonical_url = ?
+                UNION ALL
+                SELECT {", ".join(f"articles.{column}" for column in ARTICLE_COLUMNS)} FROM aliases
+                JOIN articles ON articles.path = aliases.path WHERE aliases.url = ?
+                LIMIT 1
+                """,
+                (canonical_url, canonical_url)
+            ).fetchone()
+        return dict(zip(ARTICLE_COLUMNS, row)) if row else None
+
+    def urls(self) -> Set[str]:
+        """Return the canonical URL of every indexed article and near-duplicate alias."""
+        with self._lock:
+            return {
+                row[0] for row in self._conn.execute(
+                    "SELECT canonical_url FROM articles WHERE canonical_url != '' UNION SELECT url FROM aliases"
+                )
+            }
+
+    def find_near_duplicate(
+        self, sig: Optional[List[int]], threshold: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return metadata (plus `similarity`) for the most similar article whose
+        estimated similarity to the MinHash signature `sig` reaches `threshold`
+        (default: `duplicate_threshold()`), or None.
+        """
+        if not sig:
+            return None
+        if threshold is None:
+            threshold = duplicate_threshold()
+        hashes = band_hashes(sig)
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT signature, {", ".join(ARTICLE_COLUMNS)} FROM articles
+                WHERE path IN (
+                    SELECT path FROM signature_bands
+                    WHERE {" OR ".join(["(band = ? AND hash = ?)"] * len(hashes))}
+                )
+                """,
+                [value for band in enumerate(hashes) for value in band]
+            ).fetchall()
+
+        best = None
+        for row in rows:
+            score = similarity(sig, unpack(row[0]))
+            if score >= threshold and (best is None or score > best["similarity"]):
+                best = dict(zip(ARTICLE_COLUMNS, row[1:]), similarity=score)
+        return best
+
+    def add_alias(self, url: str, path: str) -> None:
+        """Record `url` as another address of the article at `path`."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO aliases VALUES (?, ?)", (normalize_url(url), self._relative(Path(path)))
+            )
+            self._conn.commit()
+
+    def categories(self) -> List[str]:
+        """Return every category (top-level directory) with indexed articles."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT category FROM articles WHERE category IS NOT NULL ORDER BY category"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def articles_since(self, category: str, since: str) -> List[Dict[str, Any]]:
+        """
+        Return metadata for articles in a category dated strictly after `since`
+        (an ISO date), newest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT {", ".join(ARTICLE_COLUMNS)} FROM articles
+                WHERE category = ? AND date > ?
+                ORDER BY path DESC
+                """,
+                (category, since)
+            ).fetchall()
+        return [dict(zip(ARTICLE_COLUMNS, row)) for row in rows]
+
+    def all_articles(self) -> List[Dict[str, Any]]:
+        """Return metadata for every indexed article, ordered by path."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(ARTICLE_COLUMNS)} FROM articles ORDER BY path"
+            ).fetchall()
+        return [dict(zip(ARTICLE_COLUMNS, row)) for row in rows]
+
+    def absolute_path(self, rel_path: str) -> Path:
+        return self.data_dir / rel_path
+
+    def sync(self) -> int:
+        """
+        Bring the index in line with the files on disk.
+
+        Only the directory listing and file mtimes are compared; frontmatter
+        is read just for files that are new or have changed since they were
+        indexed. New bodies are not fingerprinted here (that costs far more
+        than the rest of the sync), so new files only take part in
+        near-duplicate lookups after `rebuild()`. A changed file keeps its
+        signature while its body is unchanged (e.g. after `touch` or a
+        checkout) and is fingerprinted again if the body was edited.
+        Returns the number of changes.
+        """
+        with self._lock, metrics.timer("index_sync"):
+            known = dict(self._conn.execute("SELECT path, mtime FROM articles"))
+            on_disk = set()
+
+            changed = 0
+            for md_file in self._iter_article_files():
+                rel_path = self._relative(md_file)
+                on_disk.add(rel_path)
+                try:
+                    mtime = md_file.stat().st_mtime
+                except OSError:
+                    continue
+                if known.get(rel_path) != mtime and self._index_file(md_file):
+                    changed += 1
+
+            removed = known.keys() - on_disk
+            self._conn.executemany(
+                "DELETE FROM articles WHERE path = ?", [(p,) for p in removed]
+            )
+            self._conn.executemany(
+                "DELETE FROM signature_bands WHERE path = ?", [(p,) for p in removed]
+            )
+            self._conn.executemany(
+                "DELETE FROM aliases WHERE path = ?", [(p,) for p in removed]
+            )
+            self._conn.commit()
+
+        if changed or removed:
+            logger.info(f"Article index synced: {changed} added or updated, {len(removed)} removed")
+        if changed:
+            logger.info("Run `python -m src.ingest --reindex` to fingerprint new articles for near-duplicate checks")
+        return changed + len(removed)
+
+    def rebuild(self) -> int:
+        """
+        Drop the index and rebuild it from the frontmatter of every article,
+        fingerprinting every body for near-duplicate lookups.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM articles")
+            self._conn.execute("DELETE FROM signature_bands")
+            count = 0
+            for md_file in self._iter_article_files():
+                if self._index_file(md_file, compute_signature=True):
+                    count += 1
+            self._conn.commit()
+
+        logger.info(f"Rebuilt article index with {count} articles")
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_indexes: Dict[Tuple[int, str], ArticleIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(data_dir: str = "data", sync: bool = True) -> ArticleIndex:
+    """
+    Return the shared index for a data directory.
+
+    The first call per process syncs the index with the files on disk, so
+    articles added outside `save_article` are never missed. Connections are
+    never shared with forked child processes (e.g. the bundler's process pool).
+    """
+    key = (os.getpid(), str(Path(data_dir).resolve()))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = ArticleIndex(data_dir)
+            if sync:
+                index.sync()
+            _indexes[key] = index
+    return index
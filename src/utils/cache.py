@@ -0,0 +1,160 @@
+"""
+Local on-disk caches shared by the ingestion entry points.
+
+Each cache is a small SQLite key-value store under `AIRLOCK_CACHE_DIR`
+(default: `.cache/`) with age-based expiry and size-based LRU eviction.
+Unlike the state in `<data_dir>/.airlock/`, everything here is disposable and
+can be deleted at any time.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Evict at most once per this many writes
+EVICT_EVERY = 100
+
+_enabled = True
+
+
+def set_enabled(enabled: bool) -> None:
+    """Globally enable or disable cache reads and writes (e.g. for --no-cache)."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def cache_dir() -> Path:
+    """Return (and create) the directory holding the local caches."""
+    path = Path(os.getenv("AIRLOCK_CACHE_DIR", ".cache"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class SQLiteCache:
+    """
+    Thread-safe key-value cache with TTL and max-size LRU eviction.
+
+    Values are bytes. Entries older than `max_age` seconds are treated as
+    missing and purged; when the total stored size exceeds `max_bytes` the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, name: str, max_age: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.name = name
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.db_path = cache_dir() / f"{name}.db"
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value, or None if missing, expired or disabled."""
+        if not _enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if self.max_age is not None and now - created_at > self.max_age:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        """Store a value, evicting old entries periodically."""
+        if not _enabled:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now)
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 1:
+                self._evict_locked()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self) -> int:
+        """Drop expired entries, then LRU entries until under `max_bytes`."""
+        with self._lock:
+            return self._evict_locked()
+
+    def _evict_locked(self) -> int:
+        removed = 0
+        if self.max_age is not None:
+            cur = self._conn.execute(
+                "DELETE FROM entries WHERE created_at < ?", (time.time() - self.max_age,)
+            )
+            removed += cur.rowcount
+
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                doomed = []
+                for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                    if total <= self.max_bytes:
+                        break
+                    doomed.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+                removed += len(doomed)
+
+        self._conn.commit()
+        if removed:
+            logger.info(f"Evicted {removed} entries from {self.name} cache")
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"name": self.name, "entries": count, "bytes": size, "path": str(self.db_path)}
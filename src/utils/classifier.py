@@ -0,0 +1,357 @@
+"""
+Local category pre-classifier.
+
+A pure-Python TF-IDF nearest-centroid model trained on the existing corpus
+(`data/<category>/*.md`, whose categories were assigned by the LLM). It runs
+before `categorize_article`: when the best category wins by a clear margin
+and a title can be read from the Jina output, the article is saved with a
+lead-sentence summary and no LLM call is made. Otherwise the LLM is used as
+before.
+
+The model is stored in `<data_dir>/.airlock/classifier.json` and is
+(re)trained with `python -m src.train_classifier`. Until it has been trained,
+every article goes to the LLM.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils import metrics
+from src.utils.article_index import get_index, state_dir
+from src.utils.content_filter import strip_boilerplate
+from src.utils.llm_client import VALID_CATEGORIES
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MODEL_FILENAME = "classifier.json"
+
+# Bump whenever the features change; older models are ignored until retrained
+MODEL_VERSION = 1
+
+# Only this much of each document is used, for training and prediction alike
+DOCUMENT_MAX_CHARS = 20000
+
+# Terms must appear in at least this many training documents
+MIN_DOCUMENT_FREQUENCY = 2
+
+# Keep only the heaviest terms of each centroid to bound the model size
+CENTROID_TERMS = 4000
+
+# The top category must beat the runner-up by this fraction of its score
+# (override with CLASSIFIER_MIN_MARGIN)
+DEFAULT_MIN_MARGIN = 0.25
+
+# ...and be at least this similar to its centroid at all
+MIN_SIMILARITY = 0.05
+
+# Same limits the LLM prompt sets: titles are filesystem-safe (alphanumeric
+# and hyphens) up to 60 chars, summaries the lead sentences up to 150 chars
+TITLE_MAX_CHARS = 60
+SUMMARY_MAX_CHARS = 150
+TITLE_WORD_PATTERN = re.compile(r'[A-Za-z0-9]+')
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9+#-]*[a-z0-9+#]")
+LINK_PATTERN = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(])')
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers him his how i if in into is it its itself just me more
+most my no nor not now of off on once only or other our ours out over own same she should so
+some such than that the their theirs them then there these they this those through to too
+under until up very was we were what when where which while who whom why will with would you
+your yours one two new use using used like get make way http https www com
+""".split())
+
+_enabled = True
+
+
+def set_enabled(enabled: bool) -> None:
+    """Globally enable or disable the local classifier (e.g. for --llm-only)."""
+    global _enabled
+    _enabled = enabled
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, numbers or single characters."""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+def document_text(title: Optional[str], body: str) -> str:
+    """Text the model sees for an article: its title and cleaned-up body head."""
+    body = LINK_PATTERN.sub(r'\1', strip_boilerplate(body[:DOCUMENT_MAX_CHARS]))
+    return f"{title or ''}\n{body}"
+
+
+def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return {}
+    return {term: weight / norm for term, weight in vector.items()}
+
+
+class CentroidClassifier:
+    """TF-IDF nearest-centroid classifier over sparse term dictionaries."""
+
+    def __init__(self, idf: Dict[str, float], centroids: Dict[str, Dict[str, float]], trained_on: int = 0):
+        self.idf = idf
+        self.centroids = centroids
+        self.trained_on = trained_on
+
+    @classmethod
+    def fit(cls, documents: Iterable[Tuple[str, str]]) -> "CentroidClassifier":
+        """Train on (text, category) pairs."""
+        term_counts = []
+        labels = []
+        document_frequency: Counter = Counter()
+        for text, category in documents:
+            counts = Counter(tokenize(text))
+            term_counts.append(counts)
+            labels.append(category)
+            document_frequency.update(counts.keys())
+
+        n = len(term_counts)
+        idf = {
+            term: math.log((n + 1) / (df + 1)) + 1
+            for term, df in document_frequency.items()
+            if df >= MIN_DOCUMENT_FREQUENCY
+        }
+
+        model = cls(idf, {}, trained_on=n)
+        sums: Dict[str, Counter] = {}
+        for counts, category in zip(term_counts, labels):
+            sums.setdefault(category, Counter()).update(model._weigh(counts))
+
+        for category, total in sums.items():
+            heaviest = dict(total.most_common(CENTROID_TERMS))
+            model.centroids[category] = _normalize(heaviest)
+        return model
+
+    def _weigh(self, counts: Counter) -> Dict[str, float]:
+        """Sublinear TF-IDF weights of a document, L2-normalized."""
+        return _normalize({
+            term: (1 + math.log(count)) * self.idf[term]
+            for term, count in counts.items()
+            if term in self.idf
+        })
+
+    def vectorize(self, text: str) -> Dict[str, float]:
+        return self._weigh(Counter(tokenize(text)))
+
+    def scores(self, text: str) -> List[Tuple[str, float]]:
+        """Cosine similarity to every category centroid, best first."""
+        vector = self.vectorize(text)
+        scored = [
+            (category, sum(weight * centroid.get(term, 0.0) for term, weight in vector.items()))
+            for category, centroid in self.centroids.items()
+        ]
+        return sorted(scored, key=lambda item: item[1], reverse=True)
+
+    def predict(self, text: str) -> Tuple[Optional[str], float, float]:
+        """
+        Return (category, similarity, margin) for the best matching centroid.
+
+        The margin is how far the best score is ahead of the runner-up, as a
+        fraction of the best score (1.0 when there is no runner-up).
+        """
+        scored = self.scores(text)
+        if not scored or scored[0][1] <= 0:
+            return None, 0.0, 0.0
+        best, similarity = scored[0]
+        runner_up = scored[1][1] if len(scored) > 1 else 0.0
+        return best, similarity, (similarity - runner_up) / similarity
+
+    def save(self, path: Path) -> None:
+        model = {
+            "version": MODEL_VERSION,
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "trained_on": self.trained_on,
+            "idf": self.idf,
+            "centroids": self.centroids,
+        }
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(model, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["CentroidClassifier"]:
+        """Load a saved model, or return None if it is missing or outdated."""
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            model = json.load(f)
+        if model.get("version") != MODEL_VERSION:
+            logger.warning(f"Ignoring outdated classifier model {path}; retrain with python -m src.train_classifier")
+            return None
+        return cls(model["idf"], model["centroids"], model.get("trained_on", 0))
+
+
+def model_path(data_dir: str = "data") -> Path:
+    return state_dir(data_dir) / MODEL_FILENAME
+
+
+def training_documents(data_dir: str = "data") -> List[Tuple[str, str, str]]:
+    """
+    Read (path, text, category) for every indexed article in a valid category.
+
+    Only the head of each body is read (see DOCUMENT_MAX_CHARS).
+    """
+    index = get_index(data_dir)
+    documents = []
+    for article in index.all_articles():
+        if article['category'] not in VALID_CATEGORIES:
+            continue
+        try:
+            with open(index.absolute_path(article['path']), 'rb') as f:
+                f.seek(article['body_offset'])
+                body = f.read(DOCUMENT_MAX_CHARS * 2).decode('utf-8', errors='ignore')
+        except OSError as e:
+            logger.warning(f"Error reading {article['path']}: {e}")
+            continue
+        documents.append((article['path'], document_text(article['title'], body), article['category']))
+    return documents
+
+
+def train(data_dir: str = "data") -> CentroidClassifier:
+    """Train on the whole corpus and save the model into the data directory."""
+    documents = training_documents(data_dir)
+    if not documents:
+        raise ValueError(f"No categorized articles found in {data_dir}")
+
+    model = CentroidClassifier.fit((text, category) for _, text, category in documents)
+    model.save(model_path(data_dir))
+    with _classifiers_lock:
+        _classifiers.pop(str(Path(data_dir).resolve()), None)
+    logger.info(f"Trained classifier on {len(documents)} articles in {len(model.centroids)} categories")
+    return model
+
+
+_classifiers: Dict[str, Optional[CentroidClassifier]] = {}
+_classifiers_lock = threading.Lock()
+
+
+def get_classifier(data_dir: str = "data") -> Optional[CentroidClassifier]:
+    """Return the trained model for a data directory, loading it once per process."""
+    key = str(Path(data_dir).resolve())
+    with _classifiers_lock:
+        if key not in _classifiers:
+            try:
+                _classifiers[key] = CentroidClassifier.load(model_path(data_dir))
+            except Exception as e:
+                logger.warning(f"Could not load classifier model: {e}")
+                _classifiers[key] = None
+        return _classifiers[key]
+
+
+def compact_title(title: str) -> Optional[str]:
+    """Turn a page title into the LLM's title format: `Words-Joined-By-Hyphens`, at most 60 chars."""
+    compact = ""
+    for word in TITLE_WORD_PATTERN.findall(title):
+        candidate = f"{compact}-{word}" if compact else word
+        if len(candidate) > TITLE_MAX_CHARS:
+            break
+        compact = candidate
+    if not compact and title:
+        # A single word longer than the limit
+        compact = "".join(TITLE_WORD_PATTERN.findall(title))[:TITLE_MAX_CHARS]
+    return compact or None
+
+
+def extract_title(markdown: str) -> Optional[str]:
+    """Read the title from Jina's `Title:` line, or the first top-level heading."""
+    for line in markdown.splitlines()[:50]:
+        line = line.strip()
+        if line.startswith("Title:"):
+            title = line[len("Title:"):].strip()
+        elif line.startswith("# "):
+            title = line[2:].strip()
+        else:
+            continue
+        if title:
+            return title.replace('"', "'")
+    return None
+
+
+def lead_summary(markdown: str) -> Optional[str]:
+    """Summarize an article by its first sentences of running text."""
+    for block in re.split(r'\n\s*\n', strip_boilerplate(markdown)):
+        text = " ".join(LINK_PATTERN.sub(r'\1', block).split())
+        if text.startswith(("#", "Title:", "|", "```")) or len(text.split()) < 8:
+            continue
+
+        summary = ""
+        for sentence in SENTENCE_END.split(text):
+            if summary and len(summary) + len(sentence) + 1 > SUMMARY_MAX_CHARS:
+                break
+            summary = f"{summary} {sentence}".strip()
+        if len(summary) > SUMMARY_MAX_CHARS:
+            summary = summary[:SUMMARY_MAX_CHARS - 3].rsplit(" ", 1)[0] + "..."
+        return summary.replace('"', "'")
+    return None
+
+
+def get_min_margin() -> float:
+    """Return the confidence margin, read on use so CLASSIFIER_MIN_MARGIN from .env applies."""
+    return float(os.getenv("CLASSIFIER_MIN_MARGIN", str(DEFAULT_MIN_MARGIN)))
+
+
+def classify_locally(
+    content: str,
+    data_dir: str = "data",
+    category_hint: Optional[str] = None,
+    min_margin: Optional[float] = None
+) -> Optional[Dict[str, str]]:
+    """
+    Categorize an article without the LLM when the local model is confident.
+
+    The top category must reach MIN_SIMILARITY and beat the runner-up by
+    `min_margin` (default: `get_min_margin()`). A source's hinted category
+    (e.g. a feed's `default_category`) waives the margin when it is a valid
+    category and the model also ranks it first, but never the similarity
+    floor.
+
+    Returns:
+        Metadata like `categorize_article` (category, title, summary), or
+        None if the LLM should be asked instead.
+    """
+    if not _enabled:
+        return None
+    model = get_classifier(data_dir)
+    if model is None:
+        return None
+
+    if category_hint and category_hint not in VALID_CATEGORIES:
+        logger.warning(f"Ignoring invalid category hint: {category_hint}")
+        category_hint = None
+
+    title = extract_title(content)
+    summary = lead_summary(content)
+    if not title or not summary or not compact_title(title):
+        return None
+
+    if min_margin is None:
+        min_margin = get_min_margin()
+    category, similarity, margin = model.predict(document_text(title, content))
+    confident = similarity >= MIN_SIMILARITY and (margin >= min_margin or category == category_hint)
+    if category is None or not confident:
+        logger.info(f"Local classifier unsure ({category}, margin {margin:.2f}), using LLM")
+        metrics.incr("classifier.fallbacks")
+        return None
+
+    logger.info(f"Classified locally as {category} (similarity {similarity:.2f}, margin {margin:.2f})")
+    metrics.incr("classifier.hits")
+    return {"category": category, "title": compact_title(title), "summary": summary}
@@ -0,0 +1,194 @@
+"""
+Preprocessing of Jina Reader markdown before it is sent to the LLM.
+
+Jina leaves navigation menus, cookie banners, share buttons and link lists in
+its output. Sending the first N characters therefore often spends most of
+the prompt on noise. This module strips that boilerplate and then picks the
+most informative blocks (title, headings, lead paragraphs, abstract) under a
+token budget counted with the model's tokenizer.
+"""
+
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from src.utils import metrics
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character-based estimate
+    tiktoken = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Token budget for the article content in a single-article prompt
+# (override with LLM_TOKEN_BUDGET)
+DEFAULT_TOKEN_BUDGET = 3000
+
+# Leading paragraphs are the best summary of most articles; always prefer them
+LEAD_PARAGRAPHS = 3
+
+# Only cut a block to fill leftover budget if at least this much is left
+MIN_PARTIAL_TOKENS = 64
+
+# Jina's header lines that carry no meaning for categorization
+JINA_META_PREFIXES = ("URL Source:", "Published Time:", "Markdown Content:", "Warning:")
+
+BOILERPLATE_PATTERN = re.compile(
+    r'cookie|consent|subscribe|sign up|sign in|log in|newsletter|all rights reserved|'
+    r'privacy policy|terms of (use|service)|skip to (main )?content|share (this|on)|'
+    r'follow us|advertisement|accept all',
+    re.IGNORECASE
+)
+LINK_PATTERN = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+IMAGE_ONLY_PATTERN = re.compile(r'^\s*(!\[[^\]]*\]\([^)]*\)\s*)+$')
+HEADING_PATTERN = re.compile(r'^(#{1,6}\s+\S|Title:\s)')
+ABSTRACT_PATTERN = re.compile(r'^(#{1,6}\s*)?\**abstract\**\s*:?\s*$', re.IGNORECASE)
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    """Return the tokenizer for a model, or None if tiktoken is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use; work offline with an estimate
+        logger.warning(f"Could not load tokenizer for {model}, estimating tokens instead: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count tokens with the model's tokenizer (roughly 4 chars/token without tiktoken)."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Cut text to at most `max_tokens` tokens."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _is_boilerplate(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped:
+        return False
+    if stripped.startswith(JINA_META_PREFIXES):
+        return True
+    if IMAGE_ONLY_PATTERN.match(stripped):
+        return True
+
+    # Lines that are mostly links (menus, tag clouds, "related posts")
+    text_outside_links = LINK_PATTERN.sub('', stripped).strip(' \t*-|•·>')
+    if LINK_PATTERN.search(stripped) and len(text_outside_links.split()) <= 2:
+        return True
+
+    # Short lines mentioning cookies, newsletters, sign-in, etc.
+    return len(stripped.split()) <= 20 and bool(BOILERPLATE_PATTERN.search(stripped))
+
+
+def strip_boilerplate(markdown: str) -> str:
+    """Remove navigation, banners, image-only and link-only lines."""
+    kept = [line for line in markdown.splitlines() if not _is_boilerplate(line)]
+    # Collapse the blank runs left behind by removed lines
+    return re.sub(r'\n{3,}', '\n\n', "\n".join(kept)).strip()
+
+
+def _blocks(markdown: str) -> List[str]:
+    return [block.strip() for block in re.split(r'\n\s*\n', markdown) if block.strip()]
+
+
+def select_spans(markdown: str, token_budget: int, model: str = "gpt-4o-mini") -> str:
+    """
+    Keep the most informative blocks that fit in `token_budget` tokens.
+
+    Priority: title and headings, the abstract, the lead paragraphs, then
+    the remaining paragraphs in reading order. Selected blocks are emitted in
+    their original order. Blocks that do not fit are skipped, except that
+    the highest-priority one is cut to fill the remaining budget, so a single
+    huge paragraph never leaves the prompt empty.
+    """
+    blocks = _blocks(markdown)
+    costs = [count_tokens(block, model) + 1 for block in blocks]
+    if sum(costs) <= token_budget:
+        return "\n\n".join(blocks)
+
+    headings = [i for i, block in enumerate(blocks) if HEADING_PATTERN.match(block)]
+    abstract = [
+        i + 1 for i, block in enumerate(blocks[:-1])
+        if ABSTRACT_PATTERN.match(block) or block.lower().startswith("abstract")
+    ]
+    heading_set = set(headings)
+    paragraphs = [i for i in range(len(blocks)) if i not in heading_set]
+
+    # Ordered and de-duplicated (a dict keeps insertion order)
+    priority = list(dict.fromkeys(
+        headings + abstract + paragraphs[:LEAD_PARAGRAPHS] + paragraphs[LEAD_PARAGRAPHS:]
+    ))
+
+    selected = {}
+    used = 0
+    for i in priority:
+        if used + costs[i] <= token_budget:
+            selected[i] = blocks[i]
+            used += costs[i]
+
+    skipped = next((i for i in priority if i not in selected), None)
+    if skipped is not None and token_budget - used > MIN_PARTIAL_TOKENS:
+        selected[skipped] = truncate_tokens(blocks[skipped], token_budget - used - 1, model)
+
+    return "\n\n".join(selected[i] for i in sorted(selected))
+
+
+def get_token_budget() -> int:
+    """Return the single-article token budget, read on use so LLM_TOKEN_BUDGET from .env applies."""
+    return int(os.getenv("LLM_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET)))
+
+
+@lru_cache(maxsize=64)
+def prepare_content(
+    content: str,
+    token_budget: Optional[int] = None,
+    model: str = "gpt-4o-mini"
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Strip boilerplate and select the most informative spans of an article
+    under `token_budget` tokens (default: `get_token_budget()`).
+
+    Returns the prepared text and token stats
+    (original_tokens, kept_tokens, saved_tokens). Memoized so the cache key
+    and the prompt for the same article only pay for this once; pass the
+    stats of a prompt that is sent to `record_savings`.
+    """
+    token_budget = token_budget or get_token_budget()
+    original_tokens = count_tokens(content, model)
+    prepared = select_spans(strip_boilerplate(content), token_budget, model)
+    kept_tokens = count_tokens(prepared, model)
+
+    stats = {
+        "original_tokens": original_tokens,
+        "kept_tokens": kept_tokens,
+        "saved_tokens": max(original_tokens - kept_tokens, 0),
+    }
+    return prepared, stats
+
+
+def record_savings(stats: Dict[str, int]) -> None:
+    """Log and count the tokens saved for one article in a prompt that is sent."""
+    logger.info(f"Prepared article content: {stats['original_tokens']} -> {stats['kept_tokens']} tokens "
+                f"(saved {stats['saved_tokens']})")
+    metrics.incr("content.articles")
+    metrics.incr("content.tokens_original", stats["original_tokens"])
+    metrics.incr("content.tokens_saved", stats["saved_tokens"])
@@ -0,0 +1,127 @@
+"""
+Per-feed HTTP caching state for RSS polling.
+
+Stores the ETag, Last-Modified and last-seen entry IDs of every feed in
+`<data_dir>/.airlock/feeds.db`, so the next poll can send a conditional GET
+and skip entries it has already looked at. The state lives next to the data
+it describes: wiping the data directory also resets it.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, List, Optional
+
+from src.utils.article_index import state_dir
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STATE_FILENAME = "feeds.db"
+
+
+class FeedStateStore:
+    """SQLite-backed store of conditional GET validators per feed URL."""
+
+    def __init__(self, data_dir: str = "data"):
+        self.db_path = state_dir(data_dir) / STATE_FILENAME
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS feeds (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                modified TEXT,
+                entry_ids TEXT NOT NULL DEFAULT '[]',
+                last_status INTEGER,
+                last_checked TEXT
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Dict[str, Any]:
+        """Return the stored state for a feed, or an empty state if unseen."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, modified, entry_ids, last_status, last_checked FROM feeds WHERE url = ?",
+                (url,)
+            ).fetchone()
+
+        if row is None:
+            return {"url": url, "etag": None, "modified": None, "entry_ids": set(),
+                    "last_status": None, "last_checked": None}
+
+        etag, modified, entry_ids, last_status, last_checked = row
+        return {
+            "url": url,
+            "etag": etag,
+            "modified": modified,
+            "entry_ids": set(json.loads(entry_ids)),
+            "last_status": last_status,
+            "last_checked": last_checked,
+        }
+
+    def update(
+        self,
+        url: str,
+        status: int,
+        etag: Optional[str] = None,
+        modified: Optional[str] = None,
+        entry_ids: Optional[Iterable[str]] = None
+    ) -> None:
+        """
+        Record the outcome of a poll.
+
+        On a 304 only the status and timestamp change; the validators and the
+        seen entry IDs from the last full response are kept.
+        """
+        checked = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self._lock:
+            if status == 304:
+                self._conn.execute(
+                    """
+                    INSERT INTO feeds (url, last_status, last_checked) VALUES (?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET last_status = excluded.last_status,
+                                                   last_checked = excluded.last_checked
+                    """,
+                    (url, status, checked)
+                )
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO feeds VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, etag, modified, json.dumps(sorted(entry_ids or [])), status, checked)
+                )
+            self._conn.commit()
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return the state of every feed, for inspection from the CLI."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, etag, modified, entry_ids, last_status, last_checked FROM feeds ORDER BY url"
+            ).fetchall()
+
+        return [
+            {
+                "url": url,
+                "etag": etag,
+                "modified": modified,
+                "seen_entries": len(json.loads(entry_ids)),
+                "last_status": last_status,
+                "last_checked": last_checked,
+            }
+            for url, etag, modified, entry_ids, last_status, last_checked in rows
+        ]
+
+    def clear(self) -> None:
+        """Forget all feed state, forcing full downloads on the next poll."""
+        with self._lock:
+            self._conn.execute("DELETE FROM feeds")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,27 +1,170 @@
+import asyncio
+import hashlib
 import requests
 import logging
 import os
+import threading
 import time
+import zlib
 from typing import Optional
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # Only needed for fetch_markdown_async
+    httpx = None
+
+from src.utils import metrics
+from src.utils.cache import SQLiteCache
+from src.utils.urls import normalize_url
+from src.utils.rate_limit import RateLimiter, RETRYABLE_STATUS_CODES, backoff_delay, parse_retry_after
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+JINA_BASE_URL = "https://r.jina.ai/"
+
+# Keep-alive pool size for r.jina.ai (override with JINA_POOL_SIZE). Should be
+# at least the number of concurrent fetchers (see DEFAULT_FETCH_WORKERS in src.ingest).
+DEFAULT_POOL_SIZE = 16
+
+# Fetched markdown is cached for a week by default (override with
+# JINA_CACHE_TTL, in seconds), capped at 512 MB
+FETCH_CACHE_TTL = 7 * 24 * 3600
+FETCH_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Jina Reader quotas: 20 requests/minute without an API key, 500 with one.
+# Override with JINA_RPM (requests per minute) to match your plan.
+ANONYMOUS_RPM = 20
+API_KEY_RPM = 500
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_cache: Optional[SQLiteCache] = None
+_limiter: Optional[RateLimiter] = None
+
+
+def get_pool_size() -> int:
+    """
+    Return the Jina connection pool size.
+
+    Read on use rather than at import, so JINA_POOL_SIZE from .env is
+    already loaded.
+    """
+    return int(os.getenv("JINA_POOL_SIZE", str(DEFAULT_POOL_SIZE)))
+
+
+def create_session(pool_size: Optional[int] = None) -> requests.Session:
+    """
+    Create a requests Session with a keep-alive connection pool for Jina.
+
+    Connections are reused across calls, so only the first request to
+    r.jina.ai pays for the TCP+TLS handshake. `pool_size` defaults to
+    `get_pool_size()`.
+    """
+    pool_size = pool_size or get_pool_size()
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide Jina session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+def get_limiter() -> RateLimiter:
+    """
+    Return the process-wide Jina rate limiter, creating it on first use.
+
+    Created lazily so JINA_RPM / JINA_API_KEY from .env are already loaded.
+    """
+    global _limiter
+    with _session_lock:
+        if _limiter is None:
+            default_rpm = API_KEY_RPM if os.getenv("JINA_API_KEY") else ANONYMOUS_RPM
+            _limiter = RateLimiter(
+                "Jina Reader",
+                requests_per_minute=float(os.getenv("JINA_RPM", str(default_rpm))),
+                max_concurrency=get_pool_size()
+            )
+        return _limiter
+
+
+def get_cache() -> SQLiteCache:
+    """
+    Return the fetch cache (URL -> compressed markdown), opening it on first use.
+
+    JINA_CACHE_TTL is read here rather than at import, so a value from .env
+    applies.
+    """
+    global _cache
+    with _session_lock:
+        if _cache is None:
+            max_age = int(os.getenv("JINA_CACHE_TTL", str(FETCH_CACHE_TTL)))
+            _cache = SQLiteCache("fetch", max_age=max_age, max_bytes=FETCH_CACHE_MAX_BYTES)
+        return _cache
+
+
+def _cache_key(url: str) -> str:
+    # Keyed by canonical URL, so tracking parameters and the like still hit
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+
+def _cached_markdown(url: str) -> Optional[str]:
+    cached = get_cache().get(_cache_key(url))
+    if cached is None:
+        return None
+    logger.info(f"Using cached Jina Reader content for: {url}")
+    metrics.incr("fetch.cache_hits")
+    return zlib.decompress(cached).decode("utf-8")
+
+
+def _store_markdown(url: str, markdown: str) -> None:
+    if markdown:
+        get_cache().set(_cache_key(url), zlib.compress(markdown.encode("utf-8")))
+
+
+def _build_request(url: str, api_key: Optional[str]) -> tuple[str, dict]:
+    jina_url = f"{JINA_BASE_URL}{url}"
+    headers = {}
+    
+    # Check for API key in args or environment
+    key = api_key or os.getenv("JINA_API_KEY")
+    if key:
+        headers["Authorization"] = f"Bearer {key}"
+
+    return jina_url, headers
+
 
 def fetch_markdown(
     url: str,
     api_key: Optional[str] = None,
-    max_retries: int = 3,
-    initial_timeout: int = 45
+    max_retries: int = 5,
+    initial_timeout: int = 45,
+    session: Optional[requests.Session] = None,
+    use_cache: bool = True
 ) -> str:
     """
     Fetch URL content as Markdown via Jina Reader with retry logic.
+
+    Requests go through the shared Jina rate limiter. Timeouts, connection
+    errors, 429s and 5xx responses are retried with jittered exponential
+    backoff, honouring Retry-After; other HTTP errors are raised at once.
     
     Args:
         url: The article URL to convert.
         api_key: Optional Jina API key for higher rate limits.
-        max_retries: Maximum number of retry attempts (default: 3).
+        max_retries: Maximum number of attempts (default: 5).
         initial_timeout: Initial timeout in seconds, increases with each retry.
+        session: Optional requests Session; defaults to the shared pooled session.
+        use_cache: Serve from / store into the local fetch cache (TTL: JINA_CACHE_TTL).
         
     Returns:
         Markdown string of the article content.
@@ -29,47 +172,163 @@ def fetch_markdown(
     Raises:
         requests.RequestException: If all retry attempts fail.
     """
-    jina_url = f"https://r.jina.ai/{url}"
-    headers = {}
-    
-    # Check for API key in args or environment
-    key = api_key or os.getenv("JINA_API_KEY")
-    if key:
-        headers["Authorization"] = f"Bearer {key}"
+    if use_cache:
+        cached = _cached_markdown(url)
+        if cached is not None:
+            return cached
+
+    jina_url, headers = _build_request(url, api_key)
+    session = session or get_session()
+    limiter = get_limiter()
         
     logger.info(f"Fetching content from Jina Reader for: {url}")
     
     last_error = None
+    retry_after = None
     for attempt in range(max_retries):
-        # Increase timeout with each retry (45s, 60s, 90s)
+        # Increase timeout with each retry (45s, 60s, 75s...)
         timeout = initial_timeout + (attempt * 15)
         
+        if attempt > 0:
+            wait_time = backoff_delay(attempt, retry_after)
+            metrics.incr("fetch.retries")
+            metrics.incr("fetch.backoff_seconds", wait_time)
+            logger.info(f"Retry {attempt}/{max_retries-1} after {wait_time:.1f}s wait (timeout: {timeout}s)")
+            time.sleep(wait_time)
+        
         try:
-            if attempt > 0:
-                # Exponential backoff: 2s, 4s, 8s...
-                wait_time = 2 ** attempt
-                logger.info(f"Retry {attempt}/{max_retries-1} after {wait_time}s wait (timeout: {timeout}s)")
-                time.sleep(wait_time)
-            
-            response = requests.get(jina_url, headers=headers, timeout=timeout)
+            with limiter.slot(), metrics.timer("fetch"):
+                response = session.get(jina_url, headers=headers, timeout=timeout)
             response.raise_for_status()
+            limiter.record_success()
+            metrics.incr("fetch.bytes", len(response.content))
             
             if attempt > 0:
                 logger.info(f"Successfully fetched on retry {attempt}")
             
+            if use_cache:
+                _store_markdown(url, response.text)
             return response.text
             
-        except requests.exceptions.Timeout as e:
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            last_error = e
+            retry_after = None
+            logger.warning(f"{type(e).__name__} on attempt {attempt + 1}/{max_retries}: {e}")
+
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status not in RETRYABLE_STATUS_CODES:
+                logger.error(f"Failed to fetch content from Jina Reader: {e}")
+                raise
             last_error = e
-            logger.warning(f"Timeout on attempt {attempt + 1}/{max_retries}: {e}")
+            retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+            if status in (429, 503):
+                metrics.incr("fetch.throttled")
+                limiter.record_throttle(retry_after)
+            logger.warning(f"HTTP {status} on attempt {attempt + 1}/{max_retries}")
             
         except requests.exceptions.RequestException as e:
-            # For non-timeout errors, don't retry
+            # Anything else (invalid URL, too many redirects...) won't improve on retry
             logger.error(f"Failed to fetch content from Jina Reader: {e}")
             raise
     
     # All retries exhausted
     logger.error(f"All {max_retries} attempts failed for {url}")
+    if isinstance(last_error, requests.exceptions.HTTPError):
+        raise last_error
     raise requests.exceptions.Timeout(
         f"Failed after {max_retries} attempts: {last_error}"
     )
+
+
+
+def create_async_client(pool_size: Optional[int] = None) -> "httpx.AsyncClient":
+    """Create an httpx AsyncClient with a keep-alive pool sized for Jina (default: `get_pool_size()`)."""
+    if httpx is None:
+        raise ImportError("httpx is required for async fetching: pip install httpx")
+
+    pool_size = pool_size or get_pool_size()
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    return httpx.AsyncClient(limits=limits)
+
+
+async def fetch_markdown_async(
+    url: str,
+    client: "httpx.AsyncClient",
+    api_key: Optional[str] = None,
+    max_retries: int = 5,
+    initial_timeout: int = 45,
+    use_cache: bool = True
+) -> str:
+    """
+    Async variant of `fetch_markdown` for concurrent callers.
+
+    The caller owns `client` (see `create_async_client`) so many fetches can
+    share one connection pool, e.g. with `asyncio.gather`. Rate limiting and
+    retry behaviour match `fetch_markdown`.
+
+    Raises:
+        httpx.HTTPError: If all retry attempts fail.
+    """
+    if use_cache:
+        cached = _cached_markdown(url)
+        if cached is not None:
+            return cached
+
+    jina_url, headers = _build_request(url, api_key)
+    limiter = get_limiter()
+
+    logger.info(f"Fetching content from Jina Reader for: {url}")
+
+    last_error = None
+    retry_after = None
+    for attempt in range(max_retries):
+        timeout = initial_timeout + (attempt * 15)
+
+        if attempt > 0:
+            wait_time = backoff_delay(attempt, retry_after)
+            metrics.incr("fetch.retries")
+            metrics.incr("fetch.backoff_seconds", wait_time)
+            logger.info(f"Retry {attempt}/{max_retries-1} after {wait_time:.1f}s wait (timeout: {timeout}s)")
+            await asyncio.sleep(wait_time)
+
+        try:
+            async with limiter.slot_async():
+                with metrics.timer("fetch"):
+                    response = await client.get(jina_url, headers=headers, timeout=timeout)
+            response.raise_for_status()
+            limiter.record_success()
+            metrics.incr("fetch.bytes", len(response.content))
+
+            if attempt > 0:
+                logger.info(f"Successfully fetched on retry {attempt}")
+
+            if use_cache:
+                _store_markdown(url, response.text)
+            return response.text
+
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            last_error = e
+            retry_after = None
+            logger.warning(f"{type(e).__name__} on attempt {attempt + 1}/{max_retries}: {e}")
+
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            if status not in RETRYABLE_STATUS_CODES:
+                logger.error(f"Failed to fetch content from Jina Reader: {e}")
+                raise
+            last_error = e
+            retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+            if status in (429, 503):
+                metrics.incr("fetch.throttled")
+                limiter.record_throttle(retry_after)
+            logger.warning(f"HTTP {status} on attempt {attempt + 1}/{max_retries}")
+
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to fetch content from Jina Reader: {e}")
+            raise
+
+    logger.error(f"All {max_retries} attempts failed for {url}")
+    if isinstance(last_error, httpx.HTTPStatusError):
+        raise last_error
+    raise httpx.TimeoutException(f"Failed after {max_retries} attempts: {last_error}")
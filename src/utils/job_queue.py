@@ -0,0 +1,224 @@
+"""
+Durable ingestion work queue.
+
+Pollers and the ingest CLI can push URLs into `<data_dir>/.airlock/queue.db`
+instead of ingesting them inline; `python -m src.worker` drains it. Jobs are
+claimed under a lease, so a worker that crashes mid-batch leaves its jobs to
+be picked up again once the lease expires. Failed jobs are retried with
+exponential backoff and dead-lettered after MAX_ATTEMPTS, where they stay
+for inspection until retried by hand. A URL is queued at most once under
+any spelling: jobs are unique by canonical URL (see `src.utils.urls`).
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.utils.article_index import state_dir
+from src.utils.urls import canonicalize
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+QUEUE_FILENAME = "queue.db"
+
+# A job is dead-lettered after failing this many times
+MAX_ATTEMPTS = 5
+
+# Failed jobs wait RETRY_BASE_DELAY * 2^(attempts - 1) seconds before a retry
+RETRY_BASE_DELAY = 60
+
+# Claimed jobs not finished within this many seconds are handed out again
+DEFAULT_LEASE_SECONDS = 30 * 60
+
+JOB_COLUMNS = (
+    "id", "url", "canonical_url", "category_hint", "source", "status", "attempts",
+    "available_at", "lease_until", "last_error", "result_path", "created_at", "updated_at"
+)
+
+
+class JobQueue:
+    """SQLite-backed queue of URLs waiting to be ingested."""
+
+    def __init__(self, data_dir: str = "data"):
+        self.db_path = state_dir(data_dir) / QUEUE_FILENAME
+        self._lock = threading.Lock()
+        # Autocommit, with explicit transactions where several workers may race
+        self._conn = sqlite3.connect(
+            str(self.db_path), timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL UNIQUE,
+                canonical_url TEXT NOT NULL UNIQUE,
+                category_hint TEXT,
+                source TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_until REAL,
+                last_error TEXT,
+                result_path TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at)")
+
+    def enqueue(self, url: str, category_hint: Optional[str] = None, source: Optional[str] = None) -> bool:
+        """
+        Add a URL to the queue.
+
+        Returns False if the URL, or another spelling of it, is already
+        queued, being processed, done or dead-lettered.
+        """
+        now = time.time()
+        canonical_url = canonicalize(url)
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                INSERT INTO jobs (url, canonical_url, category_hint, source, available_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT DO NOTHING
+                """,
+                (url, canonical_url, category_hint, source, now, now, now)
+            )
+        return cur.rowcount > 0
+
+    def enqueue_many(self, hints: Dict[str, Optional[str]], source: Optional[str] = None) -> int:
+        """Add many URLs (mapped to their category hints). Returns the number added."""
+        return sum(self.enqueue(url, hint, source) for url, hint in hints.items())
+
+    def claim(self, limit: int, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """
+        Claim up to `limit` runnable jobs for this worker.
+
+        Runnable jobs are pending ones whose retry delay has passed and
+        running ones whose lease expired (their worker died). Jobs whose
+        lease expired on their last attempt are dead-lettered instead.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """
+                    UPDATE jobs SET status = 'dead', last_error = 'lease expired', updated_at = ?
+                    WHERE status = 'running' AND lease_until < ? AND attempts >= ?
+                    """,
+                    (now, now, MAX_ATTEMPTS)
+                )
+                rows = self._conn.execute(
+                    f"""
+                    SELECT {", ".join(JOB_COLUMNS)} FROM jobs
+                    WHERE (status = 'pending' AND available_at <= ?)
+                       OR (status = 'running' AND lease_until < ?)
+                    ORDER BY available_at, id
+                    LIMIT ?
+                    """,
+                    (now, now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    """
+                    UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                                    lease_until = ?, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    [(now + lease_seconds, now, row[0]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        jobs = [dict(zip(JOB_COLUMNS, row)) for row in rows]
+        for job in jobs:
+            job["attempts"] += 1
+        return jobs
+
+    def complete(self, job_id: int, result_path: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = 'done', result_path = ?, last_error = NULL,
+                                lease_until = NULL, updated_at = ?
+                WHERE id = ?
+                """,
+                (result_path, time.time(), job_id)
+            )
+
+    def fail(self, job_id: int, error: str) -> str:
+        """
+        Record a failed attempt: schedule a retry with backoff, or
+        dead-letter the job once it has used up its attempts.
+
+        Returns the job's new status.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            attempts = row[0] if row else MAX_ATTEMPTS
+            if attempts >= MAX_ATTEMPTS:
+                status, available_at = "dead", now
+            else:
+                status, available_at = "pending", now + RETRY_BASE_DELAY * 2 ** (attempts - 1)
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, available_at = ?, last_error = ?,
+                                lease_until = NULL, updated_at = ?
+                WHERE id = ?
+                """,
+                (status, available_at, error[:1000], now, job_id)
+            )
+        return status
+
+    def release(self, job_ids: Iterable[int]) -> None:
+        """Hand claimed jobs back without counting the attempt (e.g. on shutdown)."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0),
+                                lease_until = NULL, updated_at = ?
+                WHERE id = ? AND status = 'running'
+                """,
+                [(now, job_id) for job_id in job_ids]
+            )
+
+    def retry_dead(self) -> int:
+        """Move every dead-lettered job back to pending with fresh attempts."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                UPDATE jobs SET status = 'pending', attempts = 0, available_at = ?, updated_at = ?
+                WHERE status = 'dead'
+                """,
+                (now, now)
+            )
+        return cur.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of jobs in each status."""
+        counts = {"pending": 0, "running": 0, "done": 0, "dead": 0}
+        with self._lock:
+            for status, count in self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+                counts[status] = count
+        return counts
+
+    def dead_jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE status = 'dead' ORDER BY id"
+            ).fetchall()
+        return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
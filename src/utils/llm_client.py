@@ -1,12 +1,50 @@
+import asyncio
+import hashlib
 import os
 import json
 import logging
-from typing import Dict, Any, Optional
-from openai import OpenAI
+import threading
+import time
+import weakref
+from typing import Dict, Any, List, Optional
+import httpx
+from openai import (
+    OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient,
+    APIConnectionError, APIStatusError
+)
+
+from src.utils import metrics
+from src.utils.cache import SQLiteCache
+from src.utils.content_filter import prepare_content, count_tokens, get_token_budget, record_savings
+from src.utils.rate_limit import RateLimiter, RETRYABLE_STATUS_CODES, backoff_delay, parse_retry_after
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Connection pool and timeout settings for the shared OpenAI clients;
+# override with OPENAI_MAX_CONNECTIONS / OPENAI_TIMEOUT
+DEFAULT_MAX_CONNECTIONS = 16
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+# Attempts per chat completion; retries are ours (rate-limit aware), not the SDK's
+MAX_ATTEMPTS = 5
+
+# Default quota (requests and tokens per minute); override with OPENAI_RPM / OPENAI_TPM
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200000
+
+# Output tokens budgeted per article when reserving token-bucket capacity
+EXPECTED_OUTPUT_TOKENS = 300
+
+# Bump whenever the prompt or its output format changes, so cached
+# categorizations made with the old prompt are not reused.
+PROMPT_VERSION = "2"
+
+# Categorization cache: entries expire after 90 days, total size capped at 64 MB
+CACHE_MAX_AGE = 90 * 24 * 3600
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
 # Valid categories for the project - organized like textbook sections
 VALID_CATEGORIES = [
     "ML-Fundamentals",       # Core ML theory, math, algorithms, statistics
@@ -43,39 +81,213 @@ CATEGORY_DESCRIPTIONS = """
 - Other: Content that doesn't fit the above categories
 """
 
-def categorize_article(content: str, model: str = "gpt-4o-mini") -> Dict[str, Any]:
-    """
-    Use LLM to extract metadata from article content.
-    
-    Args:
-        content: The markdown content of the article.
-        model: OpenAI model to use (default: gpt-4o-mini).
-        
-    Returns:
-        Dict with keys: title, category, summary.
-        
-    Raises:
-        Exception: If LLM processing fails.
-    """
+_client: Optional[OpenAI] = None
+_client_lock = threading.Lock()
+_cache: Optional[SQLiteCache] = None
+_limiter: Optional[RateLimiter] = None
+# AsyncOpenAI connections are bound to the event loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+
+def _get_api_key() -> str:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable not set")
-        
-    client = OpenAI(api_key=api_key)
-    
-    # Truncate content specifically for the prompt context window if needed, 
-    # though 4o-mini has a large context. 
-    # Sending first 15k chars is usually enough for categorization/summary.
-    truncated_content = content[:15000]
-    
-    prompt = f"""
-You are categorizing technical articles for a knowledge base, similar to organizing chapters in a CS/AI textbook.
+    return api_key
 
-Analyze the article and provide:
-1. A concise, filesystem-safe title (max 60 chars, alphanumeric and hyphens only).
-2. A category from the list below. Choose the MOST SPECIFIC category that fits.
-3. A one-sentence summary (max 150 chars).
 
+def _max_connections() -> int:
+    # Read on use rather than at import, so .env is already loaded
+    return int(os.getenv("OPENAI_MAX_CONNECTIONS", str(DEFAULT_MAX_CONNECTIONS)))
+
+
+def _request_timeout() -> float:
+    return float(os.getenv("OPENAI_TIMEOUT", str(DEFAULT_TIMEOUT)))
+
+
+def _limits(max_connections: int) -> httpx.Limits:
+    return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+
+def _timeout(timeout: float) -> httpx.Timeout:
+    return httpx.Timeout(timeout, connect=DEFAULT_CONNECT_TIMEOUT)
+
+
+def create_client(
+    max_connections: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> OpenAI:
+    """
+    Create an OpenAI client with a bounded keep-alive connection pool.
+
+    `max_connections` and `timeout` default to OPENAI_MAX_CONNECTIONS and
+    OPENAI_TIMEOUT.
+    """
+    max_connections = max_connections or _max_connections()
+    timeout = timeout or _request_timeout()
+    http_client = DefaultHttpxClient(limits=_limits(max_connections), timeout=_timeout(timeout))
+    # Retries are handled by _create_completion together with the rate limiter
+    return OpenAI(api_key=_get_api_key(), http_client=http_client, timeout=_timeout(timeout), max_retries=0)
+
+
+def get_client() -> OpenAI:
+    """Return the process-wide OpenAI client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = create_client()
+        return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Return the shared AsyncOpenAI client for the running event loop.
+
+    Must be called from inside a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        http_client = DefaultAsyncHttpxClient(
+            limits=_limits(_max_connections()), timeout=_timeout(_request_timeout())
+        )
+        client = AsyncOpenAI(
+            api_key=_get_api_key(), http_client=http_client, timeout=_timeout(_request_timeout()), max_retries=0
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def get_limiter() -> RateLimiter:
+    """Return the process-wide OpenAI rate limiter, creating it on first use."""
+    global _limiter
+    with _client_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                "OpenAI",
+                requests_per_minute=float(os.getenv("OPENAI_RPM", str(DEFAULT_RPM))),
+                tokens_per_minute=float(os.getenv("OPENAI_TPM", str(DEFAULT_TPM))),
+                max_concurrency=_max_connections()
+            )
+        return _limiter
+
+
+def _request_tokens(request: Dict[str, Any], articles: int = 1) -> int:
+    """Estimate the tokens a chat request will use, for the TPM bucket."""
+    prompt = "".join(message["content"] for message in request["messages"])
+    return count_tokens(prompt, request["model"]) + EXPECTED_OUTPUT_TOKENS * articles
+
+
+def _retry_decision(error: Exception, limiter: RateLimiter) -> Optional[float]:
+    """
+    Decide whether a failed request should be retried.
+
+    Returns the server's Retry-After (or 0.0 when there is none) for
+    retryable errors, and None for errors that will not improve on retry.
+    """
+    if isinstance(error, APIConnectionError):  # includes timeouts
+        return 0.0
+    if isinstance(error, APIStatusError) and error.status_code in RETRYABLE_STATUS_CODES:
+        retry_after = parse_retry_after(error.response.headers.get("retry-after"))
+        if error.status_code in (429, 503):
+            metrics.incr("llm.throttled")
+            limiter.record_throttle(retry_after)
+        return retry_after or 0.0
+    return None
+
+
+def _create_completion(request: Dict[str, Any], articles: int = 1):
+    """
+    Send a chat completion through the shared rate limiter.
+
+    429s, 5xx and connection errors are retried up to MAX_ATTEMPTS times
+    with jittered exponential backoff, honouring Retry-After.
+    """
+    client = get_client()
+    limiter = get_limiter()
+    tokens = _request_tokens(request, articles)
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with limiter.slot(tokens), metrics.timer("llm"):
+                response = client.chat.completions.create(**request)
+            limiter.record_success()
+            metrics.incr("llm.articles", articles)
+            metrics.record_usage(response.usage)
+            return response
+        except Exception as e:
+            retry_after = _retry_decision(e, limiter)
+            if retry_after is None or attempt == MAX_ATTEMPTS - 1:
+                raise
+            wait_time = backoff_delay(attempt + 1, retry_after or None)
+            metrics.incr("llm.retries")
+            metrics.incr("llm.backoff_seconds", wait_time)
+            logger.warning(f"LLM request failed ({e}); retry {attempt + 1}/{MAX_ATTEMPTS - 1} in {wait_time:.1f}s")
+            time.sleep(wait_time)
+
+
+async def _create_completion_async(request: Dict[str, Any], articles: int = 1):
+    """Async variant of `_create_completion`."""
+    client = get_async_client()
+    limiter = get_limiter()
+    tokens = _request_tokens(request, articles)
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            async with limiter.slot_async(tokens):
+                with metrics.timer("llm"):
+                    response = await client.chat.completions.create(**request)
+            limiter.record_success()
+            metrics.incr("llm.articles", articles)
+            metrics.record_usage(response.usage)
+            return response
+        except Exception as e:
+            retry_after = _retry_decision(e, limiter)
+            if retry_after is None or attempt == MAX_ATTEMPTS - 1:
+                raise
+            wait_time = backoff_delay(attempt + 1, retry_after or None)
+            metrics.incr("llm.retries")
+            metrics.incr("llm.backoff_seconds", wait_time)
+            logger.warning(f"LLM request failed ({e}); retry {attempt + 1}/{MAX_ATTEMPTS - 1} in {wait_time:.1f}s")
+            await asyncio.sleep(wait_time)
+
+
+def get_cache() -> SQLiteCache:
+    """Return the categorization cache, opening it on first use."""
+    global _cache
+    with _client_lock:
+        if _cache is None:
+            _cache = SQLiteCache("llm", max_age=CACHE_MAX_AGE, max_bytes=CACHE_MAX_BYTES)
+        return _cache
+
+
+def cache_key(content: str, model: str, batched: bool = False) -> str:
+    """
+    Key a categorization by exactly what the LLM saw: the article as prepared
+    for the single-article prompt or, with `batched`, for the batched prompt
+    and its smaller budget. Answers from the two prompts never share a key.
+    """
+    budget = BATCH_TOKEN_BUDGET if batched else get_token_budget()
+    prompt = "batch" if batched else "single"
+    payload = "\0".join([PROMPT_VERSION, model, prompt, prepare_content(content, budget, model)[0]])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cached_result(content: str, model: str, batched: bool = False) -> Optional[Dict[str, Any]]:
+    cached = get_cache().get(cache_key(content, model, batched))
+    if cached is None:
+        return None
+    logger.info("Using cached LLM categorization")
+    metrics.incr("llm.cache_hits")
+    return json.loads(cached)
+
+
+def _store_result(content: str, model: str, data: Dict[str, Any], batched: bool = False) -> None:
+    get_cache().set(cache_key(content, model, batched), json.dumps(data).encode("utf-8"))
+
+
+# Instructions shared by the single-article and batched prompts
+CATEGORIZATION_RULES = f"""
 CATEGORIES:
 {CATEGORY_DESCRIPTIONS}
 
@@ -85,7 +297,30 @@ RULES:
 - Architecture papers (new model designs, attention variants) → "LLM-Architecture".
 - Prompting tips/techniques → "Prompt-Engineering".
 - Only use "Other" if nothing else fits.
+"""
+
+SYSTEM_MESSAGE = "You are a helpful assistant that summarizes technical articles."
+
+# Batched categorization: articles per request and per-article token budget
+DEFAULT_BATCH_SIZE = 5
+BATCH_TOKEN_BUDGET = 1200
+
 
+def build_prompt(content: str, model: str = "gpt-4o-mini") -> str:
+    """Build the categorization prompt for an article."""
+    # Strip Jina boilerplate and keep the most informative spans under the
+    # token budget (LLM_TOKEN_BUDGET) rather than sending a blind prefix.
+    truncated_content, stats = prepare_content(content, get_token_budget(), model)
+    record_savings(stats)
+    
+    return f"""
+You are categorizing technical articles for a knowledge base, similar to organizing chapters in a CS/AI textbook.
+
+Analyze the article and provide:
+1. A concise, filesystem-safe title (max 60 chars, alphanumeric and hyphens only).
+2. A category from the list below. Choose the MOST SPECIFIC category that fits.
+3. A one-sentence summary (max 150 chars).
+{CATEGORIZATION_RULES}
 Respond ONLY with valid JSON:
 {{
   "title": "Compact-Title-Here",
@@ -97,32 +332,234 @@ Article Content:
 {truncated_content}
 """
 
-    logger.info("Sending content to LLM for categorization...")
+
+def build_request(content: str, model: str = "gpt-4o-mini") -> Dict[str, Any]:
+    """Build the chat completion request body used to categorize an article."""
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": build_prompt(content, model)}
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.3,
+    }
+
+
+def build_batch_prompt(contents: List[str], model: str = "gpt-4o-mini") -> str:
+    """Build one prompt that categorizes several trimmed articles at once."""
+    prepared = []
+    for i, content in enumerate(contents):
+        text, stats = prepare_content(content, BATCH_TOKEN_BUDGET, model)
+        record_savings(stats)
+        prepared.append(f"### Article {i}\n{text}")
+    articles = "\n\n".join(prepared)
+
+    return f"""
+You are categorizing technical articles for a knowledge base, similar to organizing chapters in a CS/AI textbook.
+
+Below are {len(contents)} articles, numbered from 0. For EACH article provide:
+1. A concise, filesystem-safe title (max 60 chars, alphanumeric and hyphens only).
+2. A category from the list below. Choose the MOST SPECIFIC category that fits.
+3. A one-sentence summary (max 150 chars).
+{CATEGORIZATION_RULES}
+Respond ONLY with valid JSON containing one element per article, in order:
+{{
+  "articles": [
+    {{"index": 0, "title": "Compact-Title-Here", "category": "LLM-Training", "summary": "This article discusses..."}}
+  ]
+}}
+
+{articles}
+"""
+
+
+def _validate_category(data: Dict[str, Any]) -> Dict[str, Any]:
+    if data.get("category") not in VALID_CATEGORIES:
+        logger.warning(f"LLM returned invalid category '{data.get('category')}'. Defaulting to 'Other'.")
+        data["category"] = "Other"
+    return data
+
+
+def parse_categorization(result_text: Optional[str]) -> Dict[str, Any]:
+    """Parse and validate the LLM's JSON answer."""
+    if not result_text:
+        raise ValueError("Empty response from LLM")
+        
+    data = json.loads(result_text)
     
+    # Validate category
+    return _validate_category(data)
+
+
+def parse_batch_categorization(result_text: Optional[str], count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Parse a batched answer into one result per article.
+
+    Elements that are missing or malformed come back as None so the caller
+    can retry just those articles; invalid categories become "Other".
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * count
+    if not result_text:
+        return results
+
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that summarizes technical articles."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.3
+        data = json.loads(result_text)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Batched LLM response is not valid JSON: {e}")
+        return results
+
+    items = data.get("articles") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        logger.warning("Batched LLM response has no 'articles' array")
+        return results
+
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index", position)
+        if not isinstance(index, int) or not 0 <= index < count:
+            continue
+        if not all(isinstance(item.get(key), str) and item.get(key) for key in ("title", "category", "summary")):
+            continue
+        results[index] = _validate_category(
+            {"title": item["title"], "category": item["category"], "summary": item["summary"]}
         )
+
+    return results
+
+
+def categorize_article(content: str, model: str = "gpt-4o-mini", use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Use LLM to extract metadata from article content.
+
+    Results are cached by a hash of the truncated content, model and prompt
+    version, so re-ingesting identical content skips the LLM entirely.
+    
+    Args:
+        content: The markdown content of the article.
+        model: OpenAI model to use (default: gpt-4o-mini).
+        use_cache: Read and write the local categorization cache.
         
-        result_text = response.choices[0].message.content
-        if not result_text:
-            raise ValueError("Empty response from LLM")
-            
-        data = json.loads(result_text)
+    Returns:
+        Dict with keys: title, category, summary.
         
-        # Validate category
-        if data.get("category") not in VALID_CATEGORIES:
-            logger.warning(f"LLM returned invalid category '{data.get('category')}'. Defaulting to 'Other'.")
-            data["category"] = "Other"
-            
+    Raises:
+        Exception: If LLM processing fails.
+    """
+    if use_cache:
+        cached = _cached_result(content, model)
+        if cached is not None:
+            return cached
+
+    logger.info("Sending content to LLM for categorization...")
+    
+    try:
+        response = _create_completion(build_request(content, model))
+        data = parse_categorization(response.choices[0].message.content)
+        if use_cache:
+            _store_result(content, model, data)
         return data
         
     except Exception as e:
         logger.error(f"LLM processing failed: {e}")
         raise
+
+
+async def categorize_article_async(
+    content: str,
+    model: str = "gpt-4o-mini",
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Async variant of `categorize_article`.
+
+    All calls on the same event loop share one pooled AsyncOpenAI client, so
+    many categorizations can be in flight at once (e.g. with asyncio.gather).
+    """
+    if use_cache:
+        cached = _cached_result(content, model)
+        if cached is not None:
+            return cached
+
+    logger.info("Sending content to LLM for categorization...")
+
+    try:
+        response = await _create_completion_async(build_request(content, model))
+        data = parse_categorization(response.choices[0].message.content)
+        if use_cache:
+            _store_result(content, model, data)
+        return data
+
+    except Exception as e:
+        logger.error(f"LLM processing failed: {e}")
+        raise
+
+
+def categorize_articles(
+    contents: List[str],
+    model: str = "gpt-4o-mini",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    use_cache: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Categorize several articles, packing up to `batch_size` per LLM request.
+
+    The long fixed instructions are sent once per batch instead of once per
+    article. Cached articles are skipped (an answer from either prompt will
+    do here), and any article whose element of the batched answer is missing
+    or invalid falls back to a single-article `categorize_article` call.
+    Batched answers are cached under the batched prompt's key only, so
+    single-article calls never reuse them.
+
+    Returns:
+        One dict with keys title, category, summary per input, in order.
+
+    Raises:
+        Exception: If a fallback single-article call fails.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(contents)
+    pending = []
+    for i, content in enumerate(contents):
+        cached = None
+        if use_cache:
+            cached = _cached_result(content, model) or _cached_result(content, model, batched=True)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    for start in range(0, len(pending), max(1, batch_size)):
+        group = pending[start:start + max(1, batch_size)]
+        if len(group) == 1:
+            continue
+
+        logger.info(f"Sending {len(group)} articles to LLM in one batched request...")
+        try:
+            request = {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": SYSTEM_MESSAGE},
+                    {"role": "user", "content": build_batch_prompt([contents[i] for i in group], model)}
+                ],
+                "response_format": {"type": "json_object"},
+                "temperature": 0.3,
+            }
+            response = _create_completion(request, articles=len(group))
+            parsed = parse_batch_categorization(response.choices[0].message.content, len(group))
+        except Exception as e:
+            logger.warning(f"Batched LLM request failed, falling back to single calls: {e}")
+            parsed = [None] * len(group)
+
+        for i, data in zip(group, parsed):
+            if data is not None:
+                results[i] = data
+                if use_cache:
+                    _store_result(contents[i], model, data, batched=True)
+
+    # Anything not answered by a batch goes through the single-article path
+    for i in pending:
+        if results[i] is None:
+            results[i] = categorize_article(contents[i], model, use_cache=use_cache)
+
+    return results
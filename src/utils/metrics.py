@@ -0,0 +1,200 @@
+"""
+Process-wide run metrics: per-stage timings and counters.
+
+Instrumented code calls `timer("fetch")`, `incr("fetch.retries")` or
+`record_usage(response.usage)`; entry points export the totals at exit with
+`--metrics-json` (a JSON run report) and `--metrics-prom` (Prometheus text
+format, e.g. for node_exporter's textfile collector).
+
+Stages: fetch (Jina requests), llm (chat completions), fingerprint, dedup_scan
+(URL and near-duplicate lookups), save, index_sync and bundle. Stage times
+are summed across threads, so with concurrent workers a stage can add up to
+more than the run's wall time. Long-running commands (the worker, the IMAP
+IDLE daemon) also `flush()` the files after every pass.
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_PREFIX = "airlock"
+
+
+class Metrics:
+    """Thread-safe stage timers and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self._started = time.perf_counter()
+            self.stages: Dict[str, Dict[str, float]] = {}
+            self.counters: Dict[str, float] = {}
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Time the enclosed block as one call of `stage` (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            stats = self.stages.setdefault(stage, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_usage(self, usage: Any) -> None:
+        """Add the token counts of an OpenAI `response.usage` object."""
+        if usage is None:
+            return
+        self.incr("llm.prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+        self.incr("llm.completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) if details is not None else 0
+        if cached:
+            self.incr("llm.cached_prompt_tokens", cached)
+
+    def report(self) -> Dict[str, Any]:
+        """Return the run report as a JSON-serializable dict."""
+        with self._lock:
+            wall = time.perf_counter() - self._started
+            stages = {
+                name: {
+                    "count": int(stats["count"]),
+                    "total_seconds": round(stats["total_seconds"], 6),
+                    "mean_seconds": round(stats["total_seconds"] / stats["count"], 6),
+                    "max_seconds": round(stats["max_seconds"], 6),
+                }
+                for name, stats in sorted(self.stages.items())
+            }
+            counters = {name: _number(value) for name, value in sorted(self.counters.items())}
+
+        prompt = counters.get("llm.prompt_tokens", 0)
+        completion = counters.get("llm.completion_tokens", 0)
+        saved = counters.get("articles.saved", 0)
+        prepared = counters.get("content.articles", 0)
+        tokens_saved = counters.get("content.tokens_saved", 0)
+        return {
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(time.time()),
+            "wall_seconds": round(wall, 3),
+            "stages": stages,
+            "counters": counters,
+            "tokens": {"prompt": prompt, "completion": completion, "total": prompt + completion},
+            "content": {
+                "articles": prepared,
+                "tokens_saved": tokens_saved,
+                "tokens_saved_per_article": round(tokens_saved / prepared, 1) if prepared else 0.0,
+            },
+            "throughput": {
+                "articles_saved": saved,
+                "articles_per_minute": round(saved / wall * 60, 3) if wall > 0 else 0.0,
+            },
+        }
+
+    def prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        report = self.report()
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_run_duration_seconds Wall time of this run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_duration_seconds {report['wall_seconds']}",
+        ]
+
+        if report["stages"]:
+            name = f"{PROMETHEUS_PREFIX}_stage_duration_seconds"
+            lines += [
+                f"# HELP {name} Time spent per pipeline stage, summed across threads.",
+                f"# TYPE {name} summary",
+            ]
+            for stage, stats in report["stages"].items():
+                lines.append(f'{name}_sum{{stage="{stage}"}} {stats["total_seconds"]}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {stats["count"]}')
+            lines += [
+                f"# HELP {name}_max Longest single call per pipeline stage.",
+                f"# TYPE {name}_max gauge",
+            ]
+            for stage, stats in report["stages"].items():
+                lines.append(f'{name}_max{{stage="{stage}"}} {stats["max_seconds"]}')
+
+        for counter, value in report["counters"].items():
+            name = f"{PROMETHEUS_PREFIX}_{re.sub(r'[^a-zA-Z0-9_]', '_', counter)}_total"
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+
+        return "\n".join(lines) + "\n"
+
+
+def _number(value: float):
+    return int(value) if float(value).is_integer() else value
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
+
+
+def _write_atomic(path: str, text: str) -> None:
+    # Write then rename, so scrapers never read a half-written file
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, target)
+
+
+_metrics = Metrics()
+# Where export_on_exit (and flush) write to
+_export_paths: Dict[str, Optional[str]] = {"json_path": None, "prom_path": None}
+
+timer = _metrics.timer
+observe = _metrics.observe
+incr = _metrics.incr
+record_usage = _metrics.record_usage
+report = _metrics.report
+prometheus_text = _metrics.prometheus
+reset = _metrics.reset
+
+
+def write(json_path: Optional[str] = None, prom_path: Optional[str] = None) -> None:
+    """Write the JSON report and/or the Prometheus text file."""
+    try:
+        if json_path:
+            _write_atomic(json_path, json.dumps(report(), indent=2) + "\n")
+        if prom_path:
+            _write_atomic(prom_path, prometheus_text())
+    except OSError as e:
+        logger.error(f"Failed to write metrics: {e}")
+
+
+def export_on_exit(json_path: Optional[str] = None, prom_path: Optional[str] = None) -> None:
+    """Write the metrics when the process exits (including via sys.exit)."""
+    if json_path or prom_path:
+        _export_paths.update(json_path=json_path, prom_path=prom_path)
+        atexit.register(flush)
+
+
+def flush() -> None:
+    """Write the metrics now to the files given to export_on_exit, if any (for daemons)."""
+    if _export_paths["json_path"] or _export_paths["prom_path"]:
+        write(**_export_paths)
@@ -0,0 +1,228 @@
+"""
+Client-side rate limiting shared by the Jina and OpenAI clients.
+
+Each provider gets one `RateLimiter` per process, combining:
+
+- token buckets for requests per minute (and optionally LLM tokens per
+  minute), so concurrent workers stay under the provider quota instead of
+  discovering it through 429s;
+- an AIMD concurrency limit: every success raises the number of requests
+  allowed in flight a little, every throttling response halves it;
+- a shared pause honouring `Retry-After`, so one 429 slows every worker
+  rather than just the one that received it.
+
+`backoff_delay` and `parse_retry_after` implement the retry schedule the
+clients use between attempts (exponential backoff with full jitter).
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: throttling and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Backoff between retries: full jitter over BASE * 2^attempt, capped
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+# Never honour a Retry-After longer than this
+MAX_RETRY_AFTER = 300.0
+
+# Throttling within this many seconds of the last decrease counts as the same event
+DECREASE_COOLDOWN = 2.0
+
+# How often waiting coroutines re-check for a free concurrency slot
+ASYNC_POLL_INTERVAL = 0.05
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (1-based).
+
+    Honours the server's Retry-After when given, plus a little jitter so
+    throttled workers do not all retry in the same instant; otherwise uses
+    exponential backoff with full jitter.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 1 + retry_after * 0.1)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second.
+
+    Callers reserve tokens up front and wait out any deficit, so waiting
+    callers are served roughly in arrival order. A reservation larger than
+    the capacity is charged in full and waited out. A rate of 0 disables
+    the bucket (pauses still apply).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take `tokens` now and return how many seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            pause = max(self._paused_until - now, 0.0)
+            if self.rate <= 0:
+                return pause
+
+            # Nothing is refilled while paused
+            elapsed = max(now - max(self._updated, self._paused_until), 0.0)
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+            # Charge the full amount: a request larger than the bucket leaves a
+            # deficit that later callers wait out, so the long-run rate holds
+            self._tokens -= tokens
+            # Callers queued behind a pause are spaced out after it, not released at once
+            return pause + max(-self._tokens / self.rate, 0.0)
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for `seconds` (e.g. after a Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            # Don't let tokens left over from before the pause turn into a burst
+            self._tokens = min(self._tokens, 0.0)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit adjusted by additive increase / multiplicative decrease.
+
+    Each success adds 1/limit (about +1 per round of requests); each
+    throttling event halves the limit, at most once per DECREASE_COOLDOWN.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: Optional[int] = None):
+        self.minimum = minimum
+        self.maximum = maximum or initial
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self._in_flight < int(self.limit):
+                self._in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self) -> None:
+        with self._cond:
+            if self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self._cond.notify()
+
+    def on_throttle(self) -> bool:
+        """Halve the limit. Returns False if it was just decreased."""
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease < DECREASE_COOLDOWN:
+                return False
+            self._last_decrease = now
+            self.limit = max(float(self.minimum), self.limit / 2)
+            return True
+
+
+class RateLimiter:
+    """Request and token buckets plus adaptive concurrency for one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 8
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute / 60, capacity=max(requests_per_minute / 60, 1.0))
+        self.tokens = TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute / 60) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency, maximum=max_concurrency)
+
+    def _wait(self, tokens: float) -> float:
+        wait = self.requests.reserve()
+        if tokens and self.tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    @contextmanager
+    def slot(self, tokens: float = 0):
+        """Hold a concurrency slot and the rate budget for one request."""
+        self.concurrency.acquire()
+        try:
+            wait = self._wait(tokens)
+            if wait > 0:
+                time.sleep(wait)
+            yield
+        finally:
+            self.concurrency.release()
+
+    @asynccontextmanager
+    async def slot_async(self, tokens: float = 0):
+        """Async variant of `slot` that never blocks the event loop."""
+        while not self.concurrency.try_acquire():
+            await asyncio.sleep(ASYNC_POLL_INTERVAL)
+        try:
+            wait = self._wait(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            self.concurrency.release()
+
+    def record_success(self) -> None:
+        self.concurrency.on_success()
+
+    def record_throttle(self, retry_after: Optional[float] = None) -> None:
+        """React to a 429/503: shrink concurrency and honour Retry-After for everyone."""
+        if self.concurrency.on_throttle():
+            logger.warning(f"{self.name} is throttling; concurrency limit now {int(self.concurrency.limit)}")
+        if retry_after:
+            self.requests.pause(retry_after)
@@ -0,0 +1,198 @@
+"""
+URL canonicalization shared by every entry point.
+
+The same article reaches us under many spellings: with `utm_*` and other
+tracking parameters, over `http` or `https`, with or without `www.`, with
+fragments, trailing slashes, AMP suffixes or behind feed-proxy and link
+shortener redirects. Dedup, the work queue and the fetch cache all key on
+the canonical form instead, so each article is fetched and categorized once.
+
+`normalize_url` applies the rewrite rules and never touches the network.
+`resolve_redirects` follows redirects for known redirector hosts with HEAD
+requests, cached in `.cache/redirects.db`; the article's own server is never
+contacted. `canonicalize` does both.
+
+Rules can be extended with environment variables:
+
+- URL_STRIP_PARAMS: extra query parameters to drop (comma-separated, a
+  trailing `*` matches a prefix)
+- URL_REDIRECT_HOSTS: extra hosts whose links are resolved with HEAD
+- URL_RESOLVE_REDIRECTS: set to 0 to never resolve redirects
+
+They are read on first use rather than at import, so values from .env apply.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import requests
+
+from src.utils.cache import SQLiteCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _env_list(name: str) -> list:
+    return [item.strip().lower() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
+# Query parameters that only track where a click came from (plus URL_STRIP_PARAMS)
+STRIP_PARAMS = [
+    "utm_*", "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_hsenc", "_hsmi", "mkt_tok", "ref", "ref_src", "ref_url", "cmpid", "amp",
+    "ncid", "sr_share", "spm", "guccounter",
+]
+
+# Feed proxies and link shorteners whose links only redirect to the article
+# (plus URL_REDIRECT_HOSTS)
+REDIRECT_HOSTS = {
+    "feedproxy.google.com", "feeds.feedburner.com", "t.co", "bit.ly", "buff.ly", "ow.ly",
+    "lnkd.in", "tinyurl.com", "dlvr.it", "trib.al", "hubs.ly", "apple.news",
+}
+
+# Resolved redirects rarely change; keep them for 30 days
+REDIRECT_CACHE_TTL = 30 * 24 * 3600
+REDIRECT_TIMEOUT = 10
+MAX_REDIRECTS = 5
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_cache: Optional[SQLiteCache] = None
+_cache_lock = threading.Lock()
+# Redirects resolved by this process, so repeated lookups never hit the network
+_resolved: Dict[str, str] = {}
+
+
+@lru_cache(maxsize=None)
+def strip_params() -> Tuple[str, ...]:
+    """Return the tracking parameter rules, including URL_STRIP_PARAMS."""
+    return tuple(STRIP_PARAMS + _env_list("URL_STRIP_PARAMS"))
+
+
+@lru_cache(maxsize=None)
+def redirect_hosts() -> FrozenSet[str]:
+    """Return the redirector hosts, including URL_REDIRECT_HOSTS."""
+    return frozenset(REDIRECT_HOSTS | set(_env_list("URL_REDIRECT_HOSTS")))
+
+
+@lru_cache(maxsize=None)
+def resolving_redirects() -> bool:
+    """Return False if URL_RESOLVE_REDIRECTS=0 turned redirect resolution off."""
+    return os.getenv("URL_RESOLVE_REDIRECTS", "1") != "0"
+
+
+def _strip_param(name: str) -> bool:
+    name = name.lower()
+    return any(
+        name.startswith(rule[:-1]) if rule.endswith("*") else name == rule
+        for rule in strip_params()
+    )
+
+
+def normalize_url(url: str) -> str:
+    """
+    Rewrite a URL into its canonical spelling, without network access.
+
+    Lower-cases the scheme and host, upgrades http to https, drops `www.`,
+    default ports, fragments, tracking parameters, AMP suffixes and trailing
+    slashes, and sorts the remaining query parameters. Idempotent; anything
+    that is not an http(s) URL is returned stripped but otherwise unchanged.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if port and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+
+    path = parts.path
+    if path.endswith("/amp") or path.endswith("/amp/"):
+        path = path[:path.rindex("/amp")]
+    path = path.rstrip("/")
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _strip_param(key)
+    )
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def get_cache() -> SQLiteCache:
+    """Return the redirect cache (URL -> final URL), opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SQLiteCache("redirects", max_age=REDIRECT_CACHE_TTL)
+        return _cache
+
+
+def _cache_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _is_redirector(url: str) -> bool:
+    try:
+        return (urlsplit(url).hostname or "").lower() in redirect_hosts()
+    except ValueError:
+        return False
+
+
+def resolve_redirects(url: str) -> str:
+    """
+    Return where a feed-proxy or shortener link points, or `url` itself.
+
+    Redirects are followed only while they stay on `redirect_hosts()` (at most
+    MAX_REDIRECTS hops). Results are cached; failures are not, and fall
+    back to the original URL.
+    """
+    url = url.strip()
+    if not resolving_redirects() or not _is_redirector(url):
+        return url
+    if url in _resolved:
+        return _resolved[url]
+
+    key = _cache_key(url)
+    cached = get_cache().get(key)
+    if cached is not None:
+        _resolved[url] = cached.decode("utf-8")
+        return _resolved[url]
+
+    target = url
+    try:
+        for _ in range(MAX_REDIRECTS):
+            response = requests.head(target, allow_redirects=False, timeout=REDIRECT_TIMEOUT)
+            location = response.headers.get("Location")
+            if not response.is_redirect or not location:
+                break
+            target = urljoin(target, location)
+            if not _is_redirector(target):
+                break
+    except requests.RequestException as e:
+        logger.warning(f"Could not resolve redirect for {url}: {e}")
+        return url
+
+    if target != url:
+        logger.info(f"Resolved {url} -> {target}")
+    get_cache().set(key, target.encode("utf-8"))
+    _resolved[url] = target
+    return target
+
+
+def canonicalize(url: str) -> str:
+    """Return the canonical form of a URL, following known redirectors first."""
+    return normalize_url(resolve_redirects(url))
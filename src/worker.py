@@ -0,0 +1,193 @@
+"""
+Worker that drains the durable ingestion queue.
+
+`poll_rss`, `email_ingestion` and `ingest` push URLs into the queue with
+`--enqueue`; this command claims them in batches and ingests each batch
+through the pipelined `ingest_batch`. Failed URLs are retried with backoff
+and dead-lettered after repeated failures. Several workers may run at once,
+and jobs held by a worker that crashed are picked up again when their lease
+expires.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.ingest import ingest_batch, DEFAULT_FETCH_WORKERS, DEFAULT_LLM_WORKERS
+from src.utils.article_index import get_index
+from src.utils.job_queue import JobQueue, DEFAULT_LEASE_SECONDS
+from src.utils import cache, classifier, fingerprint, metrics
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Jobs claimed (and ingested as one pipelined batch) at a time
+DEFAULT_CLAIM_SIZE = 20
+
+# Seconds to wait before checking an empty queue again
+DEFAULT_POLL_INTERVAL = 10
+
+
+def process_jobs(
+    job_queue: JobQueue,
+    jobs: list,
+    data_dir: str = "data",
+    fetch_workers: int = DEFAULT_FETCH_WORKERS,
+    llm_workers: int = DEFAULT_LLM_WORKERS,
+    llm_batch_size: int = 1
+) -> int:
+    """
+    Ingest a batch of claimed jobs and record each outcome in the queue.
+
+    Returns the number of jobs completed.
+    """
+    index = get_index(data_dir)
+    to_ingest = {}
+    for job in jobs:
+        with metrics.timer("dedup_scan"):
+            ingested = index.contains(job['canonical_url'] or job['url'])
+        if ingested:
+            logger.info(f"Already ingested, skipping: {job['url']}")
+            job_queue.complete(job['id'])
+        else:
+            to_ingest[job['url']] = job
+
+    errors = {}
+    results = ingest_batch(
+        list(to_ingest),
+        output_root=data_dir,
+        category_hints={url: job['category_hint'] for url, job in to_ingest.items()},
+        fetch_workers=fetch_workers,
+        llm_workers=llm_workers,
+        llm_batch_size=llm_batch_size,
+        errors=errors
+    )
+
+    completed = len(jobs) - len(to_ingest)
+    for url, job in to_ingest.items():
+        if results.get(url):
+            job_queue.complete(job['id'], results[url])
+            completed += 1
+            continue
+        status = job_queue.fail(job['id'], errors.get(url, "unknown error"))
+        if status == "dead":
+            logger.error(f"Dead-lettered after {job['attempts']} attempts: {url}")
+        else:
+            logger.warning(f"Will retry {url} (attempt {job['attempts']} failed)")
+    return completed
+
+
+def run_worker(
+    data_dir: str = "data",
+    claim_size: int = DEFAULT_CLAIM_SIZE,
+    fetch_workers: int = DEFAULT_FETCH_WORKERS,
+    llm_workers: int = DEFAULT_LLM_WORKERS,
+    llm_batch_size: int = 1,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    once: bool = False
+) -> int:
+    """
+    Claim and ingest queued jobs until interrupted, or with `once` until no
+    job is runnable. Returns the number of jobs completed.
+    """
+    job_queue = JobQueue(data_dir)
+    completed = 0
+    logger.info(f"Worker started: {job_queue.counts()}")
+
+    while True:
+        jobs = job_queue.claim(claim_size, lease_seconds)
+        if not jobs:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        logger.info(f"Claimed {len(jobs)} job(s)")
+        try:
+            completed += process_jobs(job_queue, jobs, data_dir, fetch_workers, llm_workers, llm_batch_size)
+            metrics.flush()
+        except KeyboardInterrupt:
+            # Hand unfinished jobs back right away instead of waiting for the lease
+            job_queue.release(job['id'] for job in jobs)
+            logger.info("Worker interrupted, released claimed jobs")
+            break
+
+    logger.info(f"Worker finished: {completed} job(s) completed, queue now {job_queue.counts()}")
+    return completed
+
+
+def show_status(data_dir: str) -> None:
+    """Print job counts and dead-lettered jobs as JSON."""
+    job_queue = JobQueue(data_dir)
+    status = {
+        "counts": job_queue.counts(),
+        "dead": [
+            {"url": job['url'], "attempts": job['attempts'], "error": job['last_error']}
+            for job in job_queue.dead_jobs()
+        ],
+    }
+    print(json.dumps(status, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest URLs from the durable work queue.")
+    parser.add_argument("--data-dir", default="data", help="Root directory for data")
+    parser.add_argument("--once", action="store_true", help="Exit once no job is runnable instead of waiting for more")
+    parser.add_argument("--claim-size", type=int, default=DEFAULT_CLAIM_SIZE, help="Jobs claimed and ingested per batch")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS, help="Concurrent Jina fetches")
+    parser.add_argument("--llm-workers", type=int, default=DEFAULT_LLM_WORKERS, help="Concurrent LLM calls")
+    parser.add_argument("--llm-batch-size", type=int, default=1, help="Articles per LLM request")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between checks of an empty queue")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="Seconds before a claimed job is handed out again")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local fetch and LLM caches")
+    parser.add_argument("--llm-only", action="store_true", help="Categorize every article with the LLM, skipping the local classifier")
+    parser.add_argument("--allow-duplicates", action="store_true", help="Ingest near-duplicates of saved articles instead of skipping them")
+    parser.add_argument("--metrics-json", metavar="FILE", help="Write a JSON run report (stage timings, counters, tokens) to FILE")
+    parser.add_argument("--metrics-prom", metavar="FILE", help="Write run metrics to FILE in Prometheus text format")
+    parser.add_argument("--status", action="store_true", help="Print queue counts and dead-lettered jobs and exit")
+    parser.add_argument("--retry-dead", action="store_true", help="Move dead-lettered jobs back to the queue and exit")
+
+    args = parser.parse_args()
+
+    if args.no_cache:
+        cache.set_enabled(False)
+    if args.llm_only:
+        classifier.set_enabled(False)
+    if args.allow_duplicates:
+        fingerprint.set_enabled(False)
+    metrics.export_on_exit(args.metrics_json, args.metrics_prom)
+
+    if args.status:
+        show_status(args.data_dir)
+        return
+
+    if args.retry_dead:
+        count = JobQueue(args.data_dir).retry_dead()
+        logger.info(f"Requeued {count} dead-lettered job(s)")
+        return
+
+    run_worker(
+        args.data_dir,
+        claim_size=args.claim_size,
+        fetch_workers=args.fetch_workers,
+        llm_workers=args.llm_workers,
+        llm_batch_size=args.llm_batch_size,
+        poll_interval=args.poll_interval,
+        lease_seconds=args.lease,
+        once=args.once
+    )
+
+
+if __name__ == "__main__":
+    main()